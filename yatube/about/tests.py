@@ -1,6 +1,8 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 
+from core.testing import QueryBudgetMixin
+
 ABOUT_AUTHOR_URL = reverse('about:author')
 ABOUT_TECH_URL = reverse('about:tech')
 OK = 200
@@ -29,3 +31,12 @@ class AboutURLTests(TestCase):
         for url in url_list:
             with self.subTest(url=url):
                 self.assertEqual(self.guest.get(url).status_code, OK)
+
+
+class AboutQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def test_about_pages_do_not_query_database(self):
+        """Статические страницы не обращаются к базе."""
+        for url in [ABOUT_AUTHOR_URL, ABOUT_TECH_URL]:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(0):
+                    Client().get(url)
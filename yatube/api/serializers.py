@@ -0,0 +1,106 @@
+from posts.templatetags.post_images import thumbnail_url
+
+
+class InvalidFields(Exception):
+    """В параметре fields запрошены неизвестные поля."""
+
+
+def serialize_image(post):
+    if not post.image:
+        return None
+    return {
+        'url': thumbnail_url(post),
+        'width': post.image_width,
+        'height': post.image_height,
+        'placeholder': post.image_placeholder or None,
+    }
+
+
+# Поле ответа: загружаемые колонки и функция, достающая значение. id и
+# created загружаются всегда, они нужны курсору.
+POST_FIELDS = {
+    'id': ((), lambda post: post.pk),
+    'created': ((), lambda post: post.created.isoformat()),
+    'text': (('text',), lambda post: post.text),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (
+        ('group__slug',),
+        lambda post: post.group.slug if post.group else None,
+    ),
+    'image': (
+        (
+            'image',
+            'image_thumbnail',
+            'image_width',
+            'image_height',
+            'image_placeholder',
+        ),
+        serialize_image,
+    ),
+}
+COMMENT_FIELDS = {
+    'id': ((), lambda comment: comment.pk),
+    'created': ((), lambda comment: comment.created.isoformat()),
+    'post': (('post',), lambda comment: comment.post_id),
+    'text': (('text',), lambda comment: comment.text),
+    'author': (
+        ('author__username',), lambda comment: comment.author.username
+    ),
+}
+
+
+def parse_fields(value, available):
+    """Разбирает параметр fields со списком полей через запятую.
+
+    Args:
+        value (str): значение параметра, пустое - все поля.
+        available (dict): поля модели, например POST_FIELDS.
+
+    Raises:
+        InvalidFields: запрошены неизвестные поля.
+
+    Returns:
+        list: имена полей.
+    """
+
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise InvalidFields(', '.join(unknown))
+    return fields
+
+
+def restrict(queryset, fields, available):
+    """Ограничивает queryset колонками и связями запрошенных полей.
+
+    Args:
+        queryset (QuerySet): объекты.
+        fields (list): имена полей.
+        available (dict): поля модели.
+
+    Returns:
+        QuerySet: объекты без лишних колонок.
+    """
+
+    columns = {'id', 'created'}
+    for name in fields:
+        columns.update(available[name][0])
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    return queryset.select_related(*related).only(*columns)
+
+
+def serialize(obj, fields, available):
+    """Возвращает словарь с запрошенными полями объекта.
+
+    Args:
+        obj (Model): пост или комментарий.
+        fields (list): имена полей.
+        available (dict): поля модели.
+
+    Returns:
+        dict: значения полей.
+    """
+
+    return {name: available[name][1](obj) for name in fields}
@@ -0,0 +1,190 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+INDEX_URL = reverse('api:index')
+FOLLOW_URL = reverse('api:follow_index')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(POSTS_PER_PAGE + 3)
+        )
+        cls.post = Post.objects.latest('created', 'pk')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.follower, text=f'Коммент {i}')
+            for i in range(COMMENTS_PER_PAGE + 1)
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.post_url = reverse('api:post_detail', args=(cls.post.pk,))
+        cls.comments_url = reverse('api:post_comments', args=(cls.post.pk,))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def collect(self, url):
+        results = []
+        while url:
+            response = self.guest_client.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            results.extend(response.json()['results'])
+            url = response.json()['next']
+        return results
+
+    def test_index_pages_through_all_posts(self):
+        """Курсоры главной ленты проходят все посты без повторов от новых
+        к старым."""
+
+        response = self.guest_client.get(INDEX_URL)
+        data = response.json()
+        self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
+        self.assertIsNone(data['previous'])
+        ids = [post['id'] for post in self.collect(INDEX_URL)]
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-created', '-pk').values_list(
+                'pk', flat=True
+            )),
+        )
+
+    def test_post_fields(self):
+        """Пост отдается со всеми полями."""
+
+        response = self.guest_client.get(self.post_url)
+        self.assertEqual(response.json(), {
+            'id': self.post.pk,
+            'created': self.post.created.isoformat(),
+            'text': self.post.text,
+            'author': self.user.username,
+            'group': None,
+            'image': None,
+        })
+
+    def test_fields_limit_loaded_columns(self):
+        """Параметр fields оставляет в ответе и в запросе только нужные
+        поля."""
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(INDEX_URL, {'fields': 'id'})
+        self.assertEqual(
+            response.json()['results'][0], {'id': self.post.pk}
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"posts_post"."text"', sql)
+        self.assertNotIn('"posts_post"."image"', sql)
+
+    def test_unknown_fields(self):
+        """Неизвестное поле в fields возвращает 400."""
+
+        response = self.guest_client.get(INDEX_URL, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_group_and_profile_feeds(self):
+        """Ленты группы и автора содержат только их посты."""
+
+        group_posts = self.collect(
+            reverse('api:group_posts', args=(self.group.slug,))
+        )
+        self.assertEqual(len(group_posts), self.group.posts.count())
+        self.assertTrue(
+            all(post['group'] == self.group.slug for post in group_posts)
+        )
+        profile_posts = self.collect(
+            reverse('api:profile', args=(self.follower.username,))
+        )
+        self.assertEqual(profile_posts, [])
+
+    def test_follow_feed(self):
+        """Лента подписок требует авторизации."""
+
+        self.assertEqual(
+            self.guest_client.get(FOLLOW_URL).status_code,
+            HTTPStatus.UNAUTHORIZED,
+        )
+        response = self.follower_client.get(FOLLOW_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response.json()['results'][0]['id'], self.post.pk
+        )
+
+    def test_comments(self):
+        """Комментарии поста отдаются страницами."""
+
+        comments = self.collect(self.comments_url)
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE + 1)
+        self.assertEqual(
+            {comment['post'] for comment in comments}, {self.post.pk}
+        )
+
+    def test_not_found(self):
+        """Несуществующие объекты возвращают 404 в JSON."""
+
+        urls = (
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:post_comments', args=(0,)),
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:profile', args=('missing',)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_read_only(self):
+        """API не принимает запросы на запись."""
+
+        self.assertEqual(
+            self.follower_client.post(INDEX_URL).status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+    def test_etag(self):
+        """Повторный запрос с ETag получает 304, пока данные не
+        изменились."""
+
+        etag = self.guest_client.get(INDEX_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                INDEX_URL, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    def test_etag_depends_on_user(self):
+        """ETag ответа гостю не подходит авторизованному пользователю."""
+
+        etag = self.guest_client.get(INDEX_URL)['ETag']
+        response = self.follower_client.get(
+            INDEX_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,178 @@
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+from core.cache import get_page_generations
+from core.paginators import CursorPaginator
+from posts.feeds import (AUTHOR_FEED, FOLLOW_FEED, GROUP_FEED, INDEX_FEED,
+                         POST_PAGE, feed_generation, page_generation,
+                         post_page_generations)
+from posts.models import Comment, Group, Post, User
+from posts.timeline import get_follow_feed
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, InvalidFields,
+                          parse_fields, restrict, serialize)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error_response(status, detail):
+    return json_response({'detail': detail}, status=status)
+
+
+def api_view(generations):
+    """Делает представление API доступным для GET и HEAD с условными
+    запросами по ETag.
+
+    ETag считается без обращения к базе: ответ зависит только от адреса,
+    пользователя и данных, а любое их изменение сменяет поколения кеша
+    страниц, как у core.decorators.cache_anonymous_page.
+
+    Args:
+        generations (function): принимает аргументы представления и
+            возвращает имена поколений ответа.
+
+    Returns:
+        function: декоратор представления.
+    """
+
+    def etag(request, *args, **kwargs):
+        version = get_page_generations(*generations(request, *args, **kwargs))
+        key = f'{version}:{request.user.pk}:{request.get_full_path()}'
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def decorator(view):
+        conditional = require_safe(condition(etag_func=etag)(view))
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cursor_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def page_response(request, queryset, available, per_page):
+    """Возвращает страницу объектов курсорной пагинации.
+
+    Args:
+        request (HttpRequest): объект запроса.
+        queryset (QuerySet): объекты ленты.
+        available (dict): поля модели, например POST_FIELDS.
+        per_page (int): количество объектов на странице.
+
+    Returns:
+        JsonResponse: объекты и ссылки на соседние страницы.
+    """
+
+    try:
+        fields = parse_fields(request.GET.get('fields'), available)
+    except InvalidFields as error:
+        return error_response(400, f'Неизвестные поля: {error}')
+    page = CursorPaginator(
+        restrict(queryset, fields, available), per_page
+    ).get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize(obj, fields, available) for obj in page],
+        'next': cursor_url(request, page.next_cursor),
+        'previous': cursor_url(request, page.previous_cursor),
+    })
+
+
+@api_view(lambda request: [page_generation(INDEX_FEED)])
+def index(request):
+    """Возвращает страницу главной ленты."""
+
+    return page_response(
+        request, Post.objects.all(), POST_FIELDS, POSTS_PER_PAGE
+    )
+
+
+@api_view(lambda request, slug: [page_generation(GROUP_FEED, slug)])
+def group_posts(request, slug):
+    """Возвращает страницу ленты группы."""
+
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error_response(404, 'Группа не найдена.')
+    return page_response(
+        request, group.posts.all(), POST_FIELDS, POSTS_PER_PAGE
+    )
+
+
+@api_view(lambda request, username: [
+    page_generation(AUTHOR_FEED, username)
+])
+def profile(request, username):
+    """Возвращает страницу ленты автора."""
+
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error_response(404, 'Пользователь не найден.')
+    return page_response(
+        request, author.posts.all(), POST_FIELDS, POSTS_PER_PAGE
+    )
+
+
+@api_view(lambda request: [
+    feed_generation(FOLLOW_FEED, request.user.pk)
+])
+def follow_index(request):
+    """Возвращает страницу ленты подписок текущего пользователя."""
+
+    if not request.user.is_authenticated:
+        return error_response(401, 'Нужна авторизация.')
+    return page_response(
+        request, get_follow_feed(request.user), POST_FIELDS, POSTS_PER_PAGE
+    )
+
+
+@api_view(lambda request, post_id: post_page_generations(post_id))
+def post_detail(request, post_id):
+    """Возвращает пост."""
+
+    try:
+        fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    except InvalidFields as error:
+        return error_response(400, f'Неизвестные поля: {error}')
+    post = restrict(
+        Post.objects.filter(pk=post_id), fields, POST_FIELDS
+    ).first()
+    if post is None:
+        return error_response(404, 'Пост не найден.')
+    return json_response(serialize(post, fields, POST_FIELDS))
+
+
+@api_view(lambda request, post_id: [
+    page_generation(POST_PAGE, post_id)
+])
+def post_comments(request, post_id):
+    """Возвращает страницу комментариев поста."""
+
+    if not Post.objects.filter(pk=post_id).exists():
+        return error_response(404, 'Пост не найден.')
+    return page_response(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        COMMENTS_PER_PAGE,
+    )
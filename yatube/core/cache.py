@@ -0,0 +1,201 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+FEEDS_CACHE = 'feeds'
+THUMBNAILS_CACHE = 'thumbnails'
+SESSIONS_CACHE = 'sessions'
+PAGES_GENERATION = 'pages'
+FRAGMENTS_GENERATION = 'fragments'
+
+
+def get_cache(namespace):
+    """Возвращает кеш пространства имен.
+
+    Пространства имен - отдельные алиасы settings.CACHES со своим
+    таймаутом. Если алиас не настроен, используется кеш по умолчанию.
+
+    Args:
+        namespace (str): пространство имен, например FEEDS_CACHE.
+
+    Returns:
+        BaseCache: бэкенд кеша.
+    """
+
+    if namespace in settings.CACHES:
+        return caches[namespace]
+    return caches[DEFAULT_CACHE_ALIAS]
+
+
+class CacheProxy:
+    """Обращается к кешу пространства имен текущего потока.
+
+    Как django.core.cache.cache, но для произвольного пространства имен.
+    """
+
+    def __init__(self, namespace):
+        self._namespace = namespace
+
+    def __getattr__(self, name):
+        return getattr(get_cache(self._namespace), name)
+
+
+feeds_cache = CacheProxy(FEEDS_CACHE)
+
+
+def generation_key(name):
+    """Возвращает ключ кеша со счетчиком поколения.
+
+    Args:
+        name (str): имя поколения, например 'feed:index'.
+
+    Returns:
+        str: ключ кеша.
+    """
+
+    return f'generation:{name}'
+
+
+def get_generations(*names):
+    """Возвращает текущие поколения данных.
+
+    Поколение - время последнего изменения данных в миллисекундах. Пока
+    оно не сменилось, закешированные по нему значения актуальны, поэтому
+    хранить их можно без таймаута. Отсутствующее в кеше поколение
+    заводится текущим временем: так после вытеснения счетчика не
+    оживают значения старых поколений.
+
+    Args:
+        *names (str): имена поколений.
+
+    Returns:
+        tuple: поколения в порядке имен.
+    """
+
+    keys = [generation_key(name) for name in names]
+    generations = feeds_cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        now = int(time.time() * 1000)
+        for key in missing:
+            feeds_cache.add(key, now, None)
+        generations.update(feeds_cache.get_many(missing))
+    return tuple(generations.get(key, 0) for key in keys)
+
+
+def bump_generation(*names):
+    """Начинает новые поколения данных, устаревая все значения прежних.
+
+    Args:
+        *names (str): имена поколений.
+    """
+
+    now = int(time.time() * 1000)
+    keys = [generation_key(name) for name in names]
+    previous = feeds_cache.get_many(keys)
+    feeds_cache.set_many({
+        key: max(now, previous.get(key, 0) + 1) for key in keys
+    }, None)
+
+
+def get_page_generations(*names):
+    """Возвращает поколения кеша страниц.
+
+    Общее поколение всех страниц идет первым, за ним - поколения данных,
+    которые показывает страница, например ее ленты.
+
+    Args:
+        *names (str): имена поколений страницы.
+
+    Returns:
+        tuple: поколения кеша страницы.
+    """
+
+    return get_generations(PAGES_GENERATION, *names)
+
+
+def invalidate_page_cache():
+    """Сбрасывает все закешированные страницы сменой поколения."""
+
+    bump_generation(PAGES_GENERATION)
+
+
+def invalidate_fragment_cache():
+    """Сбрасывает все фрагменты, закешированные тегом generation_cache."""
+
+    bump_generation(FRAGMENTS_GENERATION)
+
+
+def get_or_recompute(key, generation, compute, timeout=None):
+    """Возвращает значение из кеша, пересчитывая его не более одного раза.
+
+    Значение хранится вместе с поколением, для которого посчитано. Если
+    поколение устарело, пересчет выполняет только процесс, получивший
+    блокировку, остальные тем временем отдают прежнее значение. Если
+    значения нет вовсе, остальные ждут пересчета не дольше
+    settings.CACHE_RECOMPUTE_WAIT секунд. Значения с таймаутом
+    пересчитываются заранее с вероятностью, растущей к концу срока
+    (probabilistic early expiration), чтобы не истекать одновременно.
+
+    Args:
+        key (str): ключ кеша.
+        generation (tuple): текущее поколение данных.
+        compute (function): функция без аргументов, считающая значение.
+            Если она вернула None, значение не кешируется.
+        timeout (int): время жизни значения, None - до смены поколения.
+
+    Returns:
+        object: значение.
+    """
+
+    entry = feeds_cache.get(key)
+    if entry is not None and not _is_stale(entry, generation):
+        return entry['value']
+    lock_key = f'{key}:lock'
+    locked = feeds_cache.add(
+        lock_key, 1, settings.CACHE_RECOMPUTE_LOCK_TIMEOUT
+    )
+    if not locked:
+        if entry is not None:
+            return entry['value']
+        entry = _wait_for(key, generation)
+        if entry is not None:
+            return entry['value']
+    try:
+        started = time.monotonic()
+        value = compute()
+        if value is not None:
+            feeds_cache.set(key, {
+                'value': value,
+                'generation': generation,
+                'delta': time.monotonic() - started,
+                'expires': None if timeout is None else time.time() + timeout,
+            }, timeout)
+        return value
+    finally:
+        if locked:
+            feeds_cache.delete(lock_key)
+
+
+def _is_stale(entry, generation):
+    if entry['generation'] != generation:
+        return True
+    if entry['expires'] is None:
+        return False
+    early = entry['delta'] * settings.CACHE_EARLY_RECOMPUTE_BETA * math.log(
+        1 - random.random()
+    )
+    return time.time() - early >= entry['expires']
+
+
+def _wait_for(key, generation):
+    deadline = time.monotonic() + settings.CACHE_RECOMPUTE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = feeds_cache.get(key)
+        if entry is not None and entry['generation'] == generation:
+            return entry
+    return None
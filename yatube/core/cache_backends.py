@@ -0,0 +1,114 @@
+import threading
+from contextlib import contextmanager
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+METRICS_KEYS = {
+    'hits': 'cache_metrics:hits',
+    'misses': 'cache_metrics:misses',
+}
+METRICS_FLUSH_EVERY = 100
+MISSING = object()
+
+
+class MeteredCacheMixin:
+    """Считает попадания и промахи кеша.
+
+    Счетчики копятся в процессе и каждые METRICS_FLUSH_EVERY обращений
+    добавляются к счетчикам в самом кеше, поэтому для общего бэкенда
+    (файлы, SQLite) видна сумма по всем процессам.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._pending = dict.fromkeys(METRICS_KEYS, 0)
+        self._local = threading.local()
+
+    @contextmanager
+    def _outer_call(self):
+        """Отличает обращение клиента от вложенных вызовов бэкенда."""
+
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            yield depth == 0
+        finally:
+            self._local.depth = depth
+
+    def get(self, key, default=None, version=None):
+        with self._outer_call() as outer:
+            value = super().get(key, MISSING, version)
+        if outer:
+            self._record(hits=int(value is not MISSING))
+            self._record(misses=int(value is MISSING))
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self._outer_call() as outer:
+            found = super().get_many(keys, version)
+        if outer:
+            self._record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def _record(self, **counts):
+        with self._metrics_lock:
+            for name, count in counts.items():
+                self._pending[name] += count
+            total = sum(self._pending.values())
+            if total < METRICS_FLUSH_EVERY:
+                return
+            pending = self._pending
+            self._pending = dict.fromkeys(METRICS_KEYS, 0)
+        self._flush(pending)
+
+    def _flush(self, pending):
+        with self._outer_call():
+            for name, count in pending.items():
+                if not count:
+                    continue
+                key = METRICS_KEYS[name]
+                if not self.add(key, count, None):
+                    try:
+                        self.incr(key, count)
+                    except ValueError:
+                        self.set(key, count, None)
+
+    def get_metrics(self):
+        """Возвращает попадания и промахи кеша.
+
+        Returns:
+            dict: количество попаданий hits и промахов misses.
+        """
+
+        with self._metrics_lock:
+            pending = self._pending
+            self._pending = dict.fromkeys(METRICS_KEYS, 0)
+        self._flush(pending)
+        with self._outer_call():
+            stored = super().get_many(METRICS_KEYS.values())
+        return {
+            name: stored.get(key, 0) for name, key in METRICS_KEYS.items()
+        }
+
+    def reset_metrics(self):
+        """Обнуляет счетчики попаданий и промахов."""
+
+        with self._metrics_lock:
+            self._pending = dict.fromkeys(METRICS_KEYS, 0)
+        self.delete_many(METRICS_KEYS.values())
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+class MeteredFileBasedCache(MeteredCacheMixin, FileBasedCache):
+    pass
+
+
+class MeteredDatabaseCache(MeteredCacheMixin, DatabaseCache):
+    pass
@@ -0,0 +1,85 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+
+from .cache import get_or_recompute, get_page_generations
+
+
+def cache_anonymous_page(generations):
+    """Кеширует ответ представления целиком для анонимных пользователей.
+
+    Страница хранится вместе с поколениями кеша страниц: общим и
+    поколениями ее лент, которые сменяют сигналы при изменении данных.
+    Изменение в одной ленте не сбрасывает страницы остальных. Пока новое
+    поколение страницы строит один запрос, остальные получают прежнее (см.
+    get_or_recompute). Ответ получает ETag и Last-Modified, повторный
+    запрос с If-None-Match или If-Modified-Since получает 304.
+
+    Args:
+        generations (function): принимает аргументы представления и
+            возвращает имена поколений страницы.
+
+    Returns:
+        function: декоратор представления.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            version = get_page_generations(
+                *generations(request, *args, **kwargs)
+            )
+            path = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            rendered = []
+
+            def render_page():
+                response = view(request, *args, **kwargs)
+                rendered.append(response)
+                if response.status_code != 200 or response.streaming:
+                    return None
+                return (
+                    response.content,
+                    response['Content-Type'],
+                    quote_etag(hashlib.md5(response.content).hexdigest()),
+                    max(version),
+                )
+
+            entry = get_or_recompute(
+                f'page_cache:{path}',
+                version,
+                render_page,
+                settings.ANONYMOUS_PAGE_CACHE_TIMEOUT,
+            )
+            if entry is None:
+                return rendered[0]
+            content, content_type, etag, entry_version = entry
+            if rendered:
+                response = rendered[0]
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            # Поколение в миллисекундах округляется до секунд вверх, чтобы
+            # Last-Modified не оказался раньше изменения данных.
+            last_modified = -(-entry_version // 1000)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Cookie',))
+            return get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=last_modified,
+                response=response,
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,222 @@
+import base64
+import io
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .jobs import JobQueue
+from .storage import ContentAddressedStorage
+
+# Форматы вариантов: расширение, имя кодека Pillow и MIME-тип.
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+VARIANTS_DIR = 'variants'
+PLACEHOLDER_WIDTH = 16
+
+image_jobs = JobQueue('images', 'THUMBNAIL_ASYNC', 'THUMBNAIL_WORKERS')
+
+
+def schedule_image_job(job, *args):
+    """Запускает обработку картинки в фоне после фиксации транзакции.
+
+    Задачи выполняются в пуле из settings.THUMBNAIL_WORKERS потоков, при
+    settings.THUMBNAIL_ASYNC равном False - сразу.
+
+    Args:
+        job (function): функция обработки.
+        *args: ее аргументы, например id объекта.
+    """
+
+    image_jobs.schedule(job, *args)
+
+
+def available_formats(formats=None):
+    """Отбирает форматы, которые умеет кодировать установленный Pillow.
+
+    AVIF поддерживается, если установлен плагин pillow-avif-plugin.
+
+    Args:
+        formats (tuple): расширения форматов, по умолчанию
+            settings.IMAGE_VARIANT_FORMATS.
+
+    Returns:
+        list: поддерживаемые расширения в исходном порядке.
+    """
+
+    if formats is None:
+        formats = settings.IMAGE_VARIANT_FORMATS
+    if 'avif' in formats:
+        try:
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+    Image.init()
+    return [
+        fmt for fmt in formats
+        if fmt in FORMATS
+        and FORMATS[fmt][0] in Image.SAVE
+        and (fmt != 'webp' or features.check('webp'))
+    ]
+
+
+def encode_image(image, fmt, quality=None):
+    """Кодирует картинку в заданный формат.
+
+    Args:
+        image (Image): картинка Pillow.
+        fmt (str): расширение формата из FORMATS.
+        quality (int): качество, по умолчанию settings.IMAGE_VARIANT_QUALITY.
+
+    Returns:
+        tuple: байты картинки и время кодирования в секундах.
+    """
+
+    if quality is None:
+        quality = settings.IMAGE_VARIANT_QUALITY
+    buffer = io.BytesIO()
+    started = time.perf_counter()
+    image.save(buffer, FORMATS[fmt][0], quality=quality, optimize=True)
+    return buffer.getvalue(), time.perf_counter() - started
+
+
+def resize_variants(image, widths, aspect=None):
+    """Нарезает картинку по ширинам.
+
+    Args:
+        image (Image): исходная картинка.
+        widths (tuple): ширины вариантов. Ширины больше исходной
+            пропускаются, кроме самой маленькой.
+        aspect (float): отношение ширины к высоте для обрезки по центру,
+            None - сохранить пропорции.
+
+    Yields:
+        Image: варианты картинки по возрастанию ширины.
+    """
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    widths = sorted(widths)
+    for width in widths:
+        if width > image.width and width != widths[0]:
+            break
+        if aspect:
+            size = (width, max(1, round(width / aspect)))
+            yield ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            height = max(1, round(image.height * width / image.width))
+            yield image.resize((width, height), Image.LANCZOS)
+
+
+def build_variants(field_file, widths, aspect=None, formats=None):
+    """Строит варианты картинки разной ширины и формата.
+
+    Варианты сохраняются в хранилище по умолчанию в каталог VARIANTS_DIR.
+    Для картинок из ContentAddressedStorage имя зависит от содержимого,
+    поэтому уже построенные варианты одинаковых загрузок переиспользуются.
+
+    Args:
+        field_file (FieldFile): картинка из ImageField.
+        widths (tuple): ширины вариантов.
+        aspect (float): отношение ширины к высоте, None - как у исходной.
+        formats (tuple): форматы, по умолчанию
+            settings.IMAGE_VARIANT_FORMATS.
+
+    Returns:
+        list: описания вариантов: format, width, name, size, encode_time.
+    """
+
+    formats = available_formats(formats)
+    stem = os.path.splitext(field_file.name)[0]
+    content_addressed = isinstance(
+        field_file.storage, ContentAddressedStorage
+    )
+    variants = []
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image.load()
+    for variant in resize_variants(image, widths, aspect):
+        for fmt in formats:
+            name = f'{VARIANTS_DIR}/{stem}-{variant.width}w.{fmt}'
+            if content_addressed and default_storage.exists(name):
+                # Вариант такой же картинки уже построен для другой записи.
+                variants.append({
+                    'format': fmt,
+                    'width': variant.width,
+                    'name': name,
+                    'size': default_storage.size(name),
+                    'encode_time': 0,
+                })
+                continue
+            content, encode_time = encode_image(
+                variant.convert('RGB') if fmt == 'jpeg' else variant, fmt
+            )
+            name = default_storage.save(name, ContentFile(content))
+            variants.append({
+                'format': fmt,
+                'width': variant.width,
+                'name': name,
+                'size': len(content),
+                'encode_time': round(encode_time, 4),
+            })
+    return variants
+
+
+def build_placeholder(field_file, aspect=None, width=PLACEHOLDER_WIDTH):
+    """Строит крошечную заглушку картинки (LQIP) в data URI.
+
+    Заглушка в несколько сотен байт встраивается прямо в страницу и
+    растягивается браузером, пока грузится сама картинка.
+
+    Args:
+        field_file (FieldFile): картинка из ImageField.
+        aspect (float): отношение ширины к высоте, None - как у исходной.
+        width (int): ширина заглушки.
+
+    Returns:
+        str: data URI с JPEG.
+    """
+
+    with field_file.open('rb') as source:
+        with Image.open(source) as image:
+            image.draft('RGB', (width * 4, width * 4))
+            placeholder = next(resize_variants(image, (width,), aspect))
+    content, _ = encode_image(placeholder.convert('RGB'), 'jpeg', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(content).decode()
+
+
+def dump_variants(variants):
+    """Сериализует описания вариантов для хранения в TextField."""
+
+    return json.dumps(variants, separators=(',', ':'))
+
+
+def load_variants(value):
+    """Разбирает описания вариантов из TextField.
+
+    Returns:
+        list: описания вариантов, пустой список для пустого значения.
+    """
+
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except ValueError:
+        return []
+
+
+def delete_variants(value):
+    """Удаляет файлы вариантов из хранилища."""
+
+    for variant in load_variants(value):
+        default_storage.delete(variant['name'])
@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_queues = []
+
+
+class JobQueue:
+    """Очередь фоновых задач со своим пулом потоков.
+
+    Задача запускается после фиксации текущей транзакции. Одинаковая
+    задача с теми же аргументами, которая еще ждет в очереди, второй раз
+    не ставится. Настройки читаются при каждой задаче, поэтому их можно
+    менять через override_settings.
+
+    Attributes:
+        name (str): имя очереди, префикс имен потоков.
+        async_setting (str): настройка, при False задачи выполняются
+            сразу в вызывающем потоке.
+        workers_setting (str): настройка с количеством потоков.
+    """
+
+    def __init__(self, name, async_setting, workers_setting):
+        self.name = name
+        self.async_setting = async_setting
+        self.workers_setting = workers_setting
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        _queues.append(self)
+
+    def schedule(self, job, *args):
+        """Ставит задачу в очередь.
+
+        Args:
+            job (function): функция задачи.
+            *args: ее аргументы, например id объекта.
+        """
+
+        if not getattr(settings, self.async_setting):
+            job(*args)
+            return
+        transaction.on_commit(lambda: self._submit(job, args))
+
+    def shutdown(self):
+        """Дожидается задач и останавливает пул.
+
+        Следующая задача заведет новый пул.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _submit(self, job, args):
+        with self._lock:
+            if (job, args) in self._pending:
+                return
+            self._pending.add((job, args))
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, self.workers_setting),
+                    thread_name_prefix=self.name,
+                )
+            self._executor.submit(self._run, job, args)
+
+    def _run(self, job, args):
+        with self._lock:
+            self._pending.discard((job, args))
+        try:
+            job(*args)
+        except Exception:
+            logger.exception(
+                'Фоновая задача %s%s из очереди %s не удалась',
+                job.__name__, args, self.name,
+            )
+        finally:
+            connection.close()
+
+
+def shutdown_queues():
+    """Дожидается задач всех очередей и останавливает их пулы."""
+
+    for queue in _queues:
+        queue.shutdown()
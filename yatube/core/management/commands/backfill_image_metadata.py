@@ -0,0 +1,139 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.cache import invalidate_page_cache
+from core.images import build_placeholder
+from core.uploads import UNREADABLE_HASH, file_hash, image_dimensions
+from posts.models import Post
+from posts.thumbnails import POST_IMAGE_ASPECT
+from users.images import AVATAR_ASPECT
+from users.models import UserProfile
+
+# Модель, поле картинки, пропорции заглушки и поле, заполненное вместе
+# с вариантами: заглушка строится с теми же пропорциями, что и варианты.
+SPECS = {
+    'posts': (Post, 'image', POST_IMAGE_ASPECT, 'image_variants'),
+    'avatars': (UserProfile, 'avatar', AVATAR_ASPECT, 'avatar_variants'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, хеши и заглушки картинок постов и аватаров, '
+        'загруженных до их появления. Отсутствующие и нечитаемые файлы '
+        'отмечаются и при следующих запусках пропускаются, заглушки, '
+        'которые не удалось построить, пробуются снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество объектов в одном UPDATE.',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Снова попробовать файлы, отмеченные нечитаемыми.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+        for kind, spec in SPECS.items():
+            count, failed, no_placeholder = self.backfill(
+                *spec, options['batch_size'], options['retry_failed']
+            )
+            self.stdout.write(
+                f'{kind}: обновлено {count}, из них нечитаемых {failed}, '
+                f'без заглушки {no_placeholder}'
+            )
+            total += count
+        if total:
+            invalidate_page_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено {total} за {time.monotonic() - started:.1f} с.'
+        ))
+
+    def backfill(self, model, field, aspect, variants_field, batch_size,
+                 retry_failed):
+        content_hash = f'{field}_hash'
+        placeholder = f'{field}_placeholder'
+        missing = (
+            Q(**{f'{field}_width__isnull': True})
+            | Q(**{content_hash: ''})
+            | Q(**{placeholder: ''}) & ~Q(**{variants_field: ''})
+        )
+        failed = Q(**{content_hash: UNREADABLE_HASH})
+        queryset = model.objects.exclude(**{field: ''}).exclude(
+            **{f'{field}__isnull': True}
+        ).filter(
+            (missing | failed) if retry_failed else (missing & ~failed)
+        ).order_by('pk')
+        batch = []
+        count = unreadable = no_placeholder = 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            if not self.fill(obj, field):
+                setattr(obj, content_hash, UNREADABLE_HASH)
+                unreadable += 1
+            elif not self.fill_placeholder(obj, field, aspect, variants_field):
+                # Файл читается, поэтому он не отмечается нечитаемым:
+                # заглушка будет построена при следующем запуске.
+                no_placeholder += 1
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                count += self.save(model, batch, field)
+                batch = []
+        return (
+            count + self.save(model, batch, field), unreadable, no_placeholder
+        )
+
+    def fill(self, obj, field):
+        """Заполняет недостающие размеры и хеш картинки объекта.
+
+        Returns:
+            bool: False если файла нет или он не читается.
+        """
+
+        image = getattr(obj, field)
+        width, height = f'{field}_width', f'{field}_height'
+        content_hash = f'{field}_hash'
+        if getattr(obj, width) is None:
+            dimensions = image_dimensions(image)
+            if dimensions[0] is None:
+                return False
+            setattr(obj, width, dimensions[0])
+            setattr(obj, height, dimensions[1])
+        if getattr(obj, content_hash) in ('', UNREADABLE_HASH):
+            setattr(obj, content_hash, file_hash(image))
+            if not getattr(obj, content_hash):
+                return False
+        return True
+
+    def fill_placeholder(self, obj, field, aspect, variants_field):
+        """Строит недостающую заглушку картинки с вариантами.
+
+        Returns:
+            bool: False если заглушку построить не удалось.
+        """
+
+        placeholder = f'{field}_placeholder'
+        if getattr(obj, variants_field) and not getattr(obj, placeholder):
+            try:
+                setattr(
+                    obj, placeholder,
+                    build_placeholder(getattr(obj, field), aspect)
+                )
+            except OSError:
+                return False
+        return True
+
+    def save(self, model, batch, field):
+        model.objects.bulk_update(batch, [
+            f'{field}_width', f'{field}_height', f'{field}_hash',
+            f'{field}_placeholder',
+        ])
+        return len(batch)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from core.images import (FORMATS, available_formats, encode_image,
+                         resize_variants)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время кодирования вариантов картинок '
+        'в разных форматах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы картинок.')
+        parser.add_argument(
+            '--widths',
+            type=int,
+            nargs='+',
+            default=[320, 640, 960],
+            help='Ширины вариантов.',
+        )
+        parser.add_argument(
+            '--formats',
+            nargs='+',
+            default=list(FORMATS),
+            choices=list(FORMATS),
+            help='Форматы, неподдерживаемые Pillow пропускаются.',
+        )
+        parser.add_argument(
+            '--quality', type=int, default=None, help='Качество кодирования.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3, help='Повторов кодирования.'
+        )
+
+    def handle(self, *args, **options):
+        formats = available_formats(options['formats'])
+        if not formats:
+            raise CommandError('Pillow не поддерживает ни один из форматов.')
+        skipped = set(options['formats']) - set(formats)
+        if skipped:
+            self.stdout.write(f'Пропущены форматы: {", ".join(skipped)}')
+        totals = {fmt: [0, 0.0] for fmt in formats}
+        for path in options['paths']:
+            with Image.open(path) as image:
+                image.load()
+                started = time.perf_counter()
+                variants = list(resize_variants(image, options['widths']))
+                resize_time = time.perf_counter() - started
+            self.stdout.write(f'{path}: нарезка {resize_time * 1000:.1f} мс')
+            for variant in variants:
+                for fmt in formats:
+                    source = variant
+                    if fmt == 'jpeg':
+                        source = variant.convert('RGB')
+                    timings = []
+                    for _ in range(options['repeat']):
+                        content, encode_time = encode_image(
+                            source, fmt, options['quality']
+                        )
+                        timings.append(encode_time)
+                    best = min(timings)
+                    totals[fmt][0] += len(content)
+                    totals[fmt][1] += best
+                    self.stdout.write(
+                        f'  {variant.width}w {fmt}: {len(content)} байт, '
+                        f'{best * 1000:.1f} мс'
+                    )
+        baseline = totals.get('jpeg', totals[formats[0]])[0]
+        self.stdout.write('Итого:')
+        for fmt, (size, encode_time) in totals.items():
+            self.stdout.write(
+                f'  {fmt}: {size} байт ({size / baseline:.0%}), '
+                f'{encode_time * 1000:.1f} мс'
+            )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кеша по пространствам имен.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счетчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        for namespace in settings.CACHES:
+            cache = caches[namespace]
+            if not hasattr(cache, 'get_metrics'):
+                self.stdout.write(f'{namespace}: счетчики не ведутся')
+                continue
+            metrics = cache.get_metrics()
+            total = metrics['hits'] + metrics['misses']
+            ratio = metrics['hits'] / total if total else 0
+            self.stdout.write(
+                f'{namespace}: попаданий {metrics["hits"]}, '
+                f'промахов {metrics["misses"]}, доля попаданий {ratio:.1%}'
+            )
+            if options['reset']:
+                cache.reset_metrics()
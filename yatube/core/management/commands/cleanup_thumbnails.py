@@ -0,0 +1,143 @@
+import datetime as dt
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.images import VARIANTS_DIR, load_variants
+from posts.models import Post
+from users.models import UserProfile
+
+
+def walk_storage(storage, path):
+    """Обходит файлы каталога хранилища рекурсивно.
+
+    Args:
+        storage (Storage): хранилище.
+        path (str): каталог.
+
+    Yields:
+        str: имена файлов относительно корня хранилища.
+    """
+
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for directory in directories:
+        yield from walk_storage(storage, os.path.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет миниатюры и варианты картинок, на которые больше ничто '
+        'не ссылается, вместе с их записями sorl-thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60 * 60,
+            help=(
+                'Не трогать файлы моложе стольких секунд: их может '
+                'строить фоновая обработка, еще не записавшая ссылку.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.created_before = timezone.now() - dt.timedelta(
+            seconds=options['grace']
+        )
+        # Сироты находятся одинаково при пробном и обычном запуске, чтобы
+        # отчет пробного запуска совпадал с тем, что будет удалено.
+        thumbnails = self.find_orphans(
+            default.storage,
+            thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/'),
+            self.get_thumbnail_names(),
+        )
+        variants = self.find_orphans(
+            default_storage, VARIANTS_DIR, self.get_variant_names()
+        )
+        kvstore = default.kvstore
+        thumbnail_files = [
+            ImageFile(name, default.storage) for name, _ in thumbnails
+        ]
+        entries = [
+            image_file for image_file in thumbnail_files
+            if kvstore.get(image_file) is not None
+        ]
+        if not options['dry_run']:
+            for image_file in entries:
+                kvstore.delete(image_file, delete_thumbnails=False)
+            for name, _ in thumbnails:
+                default.storage.delete(name)
+            for name, _ in variants:
+                default_storage.delete(name)
+            # Убирает из списков миниатюр источников удаленные записи.
+            kvstore.cleanup()
+        files = len(thumbnails) + len(variants)
+        size = sum(size for _, size in thumbnails + variants)
+        elapsed = time.monotonic() - started
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action}: записей sorl-thumbnail {len(entries)}, файлов '
+            f'{files} ({size / 1024 / 1024:.1f} МБ) за {elapsed:.1f} с.'
+        ))
+
+    def get_thumbnail_names(self):
+        # Адрес готовой миниатюры хранится в посте, см. posts.thumbnails.
+        base_url = default.storage.url('')
+        return {
+            url[len(base_url):]
+            for url in Post.objects.exclude(image_thumbnail='').values_list(
+                'image_thumbnail', flat=True
+            )
+            if url.startswith(base_url)
+        }
+
+    def get_variant_names(self):
+        values = list(
+            Post.objects.exclude(image_variants='').values_list(
+                'image_variants', flat=True
+            )
+        ) + list(
+            UserProfile.objects.exclude(avatar_variants='').values_list(
+                'avatar_variants', flat=True
+            )
+        )
+        return {
+            variant['name']
+            for value in values
+            for variant in load_variants(value)
+        }
+
+    def find_orphans(self, storage, path, referenced):
+        """Находит файлы каталога, на которые нет ссылок.
+
+        Файлы моложе --grace пропускаются.
+
+        Returns:
+            list: пары из имени и размера файла.
+        """
+
+        orphans = []
+        for name in walk_storage(storage, path):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > self.created_before:
+                continue
+            orphans.append((name, storage.size(name)))
+        return orphans
@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_post_thumbnail
+from users.images import generate_avatar_variants
+from users.models import UserProfile
+
+JOBS = {
+    'posts': generate_post_thumbnail,
+    'avatars': generate_avatar_variants,
+}
+
+
+def _init_worker():
+    django.setup()
+    # Дочерний процесс открывает свои соединения с базой.
+    connections.close_all()
+
+
+def _warm_chunk(kind, pks):
+    done = 0
+    for pk in pks:
+        if JOBS[kind](pk):
+            done += 1
+    return kind, len(pks), done
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее строит миниатюры и варианты картинок постов и аватаров '
+        'в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Количество процессов, по умолчанию по числу ядер.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Количество картинок в одном задании процесса.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить и уже обработанные картинки.',
+        )
+        parser.add_argument(
+            '--only',
+            choices=list(JOBS),
+            help='Обработать только посты или только аватары.',
+        )
+
+    def get_pks(self, kind, force):
+        if kind == 'posts':
+            queryset = Post.objects.exclude(image='')
+            if not force:
+                queryset = queryset.filter(image_thumbnail='')
+        else:
+            queryset = UserProfile.objects.exclude(avatar='').exclude(
+                avatar__isnull=True
+            )
+            if not force:
+                queryset = queryset.filter(avatar_variants='')
+        return list(queryset.order_by('pk').values_list('pk', flat=True))
+
+    def handle(self, *args, **options):
+        kinds = [options['only']] if options['only'] else list(JOBS)
+        chunk_size = options['chunk_size']
+        chunks = []
+        for kind in kinds:
+            pks = self.get_pks(kind, options['force'])
+            chunks += [
+                (kind, pks[i:i + chunk_size])
+                for i in range(0, len(pks), chunk_size)
+            ]
+        total = sum(len(pks) for kind, pks in chunks)
+        if not total:
+            self.stdout.write('Все картинки уже обработаны.')
+            return
+        connections.close_all()
+        started = time.monotonic()
+        results = dict.fromkeys(kinds, 0)
+        processed = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(_warm_chunk, *chunk) for chunk in chunks
+            ]
+            for future in futures:
+                kind, count, done = future.result()
+                processed += count
+                results[kind] += done
+                self.stdout.write(f'{processed}/{total}', ending='\r')
+        self.stdout.write('')
+        elapsed = time.monotonic() - started
+        for kind, done in results.items():
+            self.stdout.write(f'{kind}: обработано {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} картинок за {elapsed:.1f} с, '
+            f'{total / elapsed:.1f} в секунду.'
+        ))
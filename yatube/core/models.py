@@ -12,3 +12,32 @@ class CreatedModel(models.Model):
     class Meta:
         abstract = True
         ordering = ('-created',)
+
+
+def bulk_create_with_created(model, objects, batch_size=None):
+    """Сохраняет объекты через bulk_create с заданными датами создания.
+
+    auto_now_add проставляет при добавлении текущее время, поэтому заданные
+    даты возвращаются вторым запросом. Поле модели не меняется, и записи
+    из других потоков получают текущее время. Объекты без даты создания
+    получают текущее время.
+
+    Args:
+        model (CreatedModel): модель объектов.
+        objects (iterable): объекты с заданными id.
+        batch_size (int): количество объектов в одном запросе.
+
+    Returns:
+        list: сохраненные объекты.
+    """
+
+    objects = list(objects)
+    dates = [obj.created for obj in objects]
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    dated = []
+    for obj, date in zip(objects, dates):
+        if date is not None:
+            obj.created = date
+            dated.append(obj)
+    model.objects.bulk_update(dated, ['created'], batch_size=batch_size)
+    return objects
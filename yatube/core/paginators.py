@@ -0,0 +1,268 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .cache import feeds_cache
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(direction, obj):
+    """Кодирует позицию объекта в непрозрачный токен.
+
+    Args:
+        direction (str): направление перехода (NEXT или PREVIOUS).
+        obj (CreatedModel): объект, относительно которого строится страница.
+
+    Returns:
+        str: токен курсора.
+    """
+
+    payload = json.dumps(
+        [direction, obj.created.isoformat(), obj.pk],
+        separators=(',', ':')
+    ).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора.
+
+    Args:
+        token (str): токен курсора.
+
+    Raises:
+        InvalidCursor: токен поврежден или подделан.
+
+    Returns:
+        tuple: направление, дата создания и id объекта.
+    """
+
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, created, pk = json.loads(payload)
+        created = parse_datetime(created)
+    except (binascii.Error, TypeError, ValueError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        raise InvalidCursor(token)
+    if not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return direction, created, pk
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    В отличие от django.core.paginator.Page не знает ни своего номера,
+    ни общего числа страниц: только токены соседних страниц.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor=None,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (created, id) без COUNT(*) и OFFSET.
+
+    Страницы упорядочены так же, как CreatedModel: от новых к старым,
+    id разрешает совпадения дат создания.
+
+    Attributes:
+        object_list (QuerySet): queryset потомка CreatedModel.
+        per_page (int): количество объектов на странице.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, token):
+        """Возвращает страницу по токену курсора.
+
+        Пустой или поврежденный токен ведет на первую страницу, как и
+        Paginator.get_page() для некорректного номера страницы.
+
+        Args:
+            token (str): токен курсора из запроса.
+
+        Returns:
+            CursorPage: объект страницы.
+        """
+
+        if token:
+            try:
+                return self.page(token)
+            except InvalidCursor:
+                pass
+        return self.page(None)
+
+    def page(self, token):
+        """Возвращает страницу по токену курсора.
+
+        Args:
+            token (str): токен курсора или None для первой страницы.
+
+        Raises:
+            InvalidCursor: токен поврежден.
+
+        Returns:
+            CursorPage: объект страницы.
+        """
+
+        queryset = self.object_list
+        direction = NEXT
+        if token:
+            direction, created, pk = decode_cursor(token)
+            if direction == NEXT:
+                queryset = queryset.filter(
+                    Q(created__lt=created) | Q(created=created, pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created__gt=created) | Q(created=created, pk__gt=pk)
+                )
+        if direction == NEXT:
+            queryset = queryset.order_by('-created', '-pk')
+        else:
+            queryset = queryset.order_by('created', 'pk')
+        # Лишний объект показывает, есть ли страница дальше по направлению.
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == PREVIOUS:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(token)
+        return CursorPage(
+            objects,
+            self,
+            cursor=token,
+            next_cursor=(
+                encode_cursor(NEXT, objects[-1])
+                if objects and has_next else None
+            ),
+            previous_cursor=(
+                encode_cursor(PREVIOUS, objects[0])
+                if objects and has_previous else None
+            ),
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с кешируемым общим количеством объектов.
+
+    Количество берется из кеша по ключу count_key и может отставать от
+    базы, пока ключ не сброшен. Поэтому страницы нарезаются без оглядки на
+    count: устаревшее значение влияет только на ссылки в пагинаторе, но не
+    обрезает выдачу.
+
+    Attributes:
+        count_key (str): ключ кеша с количеством, None - считать каждый раз.
+        count_timeout (int): время жизни закешированного количества.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count = feeds_cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            feeds_cache.set(self.count_key, count, self.count_timeout)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1 or self.count_key is None:
+                raise
+        # Количество в кеше могло устареть: проверим саму страницу.
+        return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if number > self.num_pages:
+            if not object_list:
+                raise EmptyPage('That page contains no results')
+            feeds_cache.delete(self.count_key)
+        page = self._get_page(object_list, number, self)
+        page.page_window = self.get_page_window(number)
+        return page
+
+    def get_page_window(self, number, on_each_side=2, on_ends=1):
+        """Возвращает номера страниц для пагинатора.
+
+        Вместо полного page_range отдаются первые и последние on_ends
+        страниц и on_each_side страниц вокруг текущей, пропуски обозначены
+        None.
+
+        Args:
+            number (int): номер текущей страницы.
+            on_each_side (int): количество страниц по сторонам от текущей.
+            on_ends (int): количество страниц в начале и в конце.
+
+        Returns:
+            list: номера страниц и None на месте пропусков.
+        """
+
+        num_pages = max(self.num_pages, number)
+        pages = sorted(
+            set(range(1, on_ends + 1))
+            | set(range(num_pages - on_ends + 1, num_pages + 1))
+            | set(range(number - on_each_side, number + on_each_side + 1))
+        )
+        window = []
+        for i in pages:
+            if i < 1 or i > num_pages:
+                continue
+            if window and i - window[-1] > 1:
+                window.append(None)
+            window.append(i)
+        return window
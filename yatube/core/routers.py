@@ -0,0 +1,25 @@
+class CacheRouter:
+    """Направляет таблицы DatabaseCache в отдельную базу cache.
+
+    Так SQLite-кеш не делит блокировку записи с основной базой.
+    """
+
+    app_label = 'django_cache'
+    database = 'cache'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return self.database
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return self.database
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == self.app_label:
+            return db == self.database
+        if db == self.database:
+            return False
+        return None
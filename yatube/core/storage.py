@@ -0,0 +1,59 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, раскладывающее файлы по хешу содержимого.
+
+    Файл сохраняется как <каталог upload_to>/ab/cd/<sha256><расширение>.
+    Одинаковые загрузки получают одно имя и хранятся один раз, а вместе с
+    именем у них общие миниатюры и варианты. Два уровня подкаталогов по
+    первым символам хеша держат каталоги небольшими.
+
+    Attributes:
+        shard_depth (int): количество уровней подкаталогов.
+        shard_width (int): количество символов хеша в имени подкаталога.
+    """
+
+    shard_depth = 2
+    shard_width = 2
+
+    def hashed_name(self, name, digest):
+        """Возвращает имя файла по хешу его содержимого.
+
+        Args:
+            name (str): исходное имя с каталогом upload_to.
+            digest (str): SHA-256 содержимого в hex.
+
+        Returns:
+            str: имя файла в хранилище.
+        """
+
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        shards = [
+            digest[i * self.shard_width:(i + 1) * self.shard_width]
+            for i in range(self.shard_depth)
+        ]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        name = self.hashed_name(name, digest.hexdigest())
+        if self.exists(name):
+            # Такой файл уже загружен: повторно не записываем.
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,56 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+
+from core.cache import FRAGMENTS_GENERATION, get_generations, get_or_recompute
+
+register = template.Library()
+
+
+class GenerationCacheNode(template.Node):
+    def __init__(self, nodelist, generation, vary_on):
+        self.nodelist = nodelist
+        self.generation = generation
+        self.vary_on = vary_on
+
+    def render(self, context):
+        generation = self.generation.resolve(context)
+        vary_on = ':'.join(str(var.resolve(context)) for var in self.vary_on)
+        key = 'template.generation_cache.{}'.format(
+            hashlib.md5(f'{generation}:{vary_on}'.encode()).hexdigest()
+        )
+        return get_or_recompute(
+            key,
+            get_generations(generation, FRAGMENTS_GENERATION),
+            lambda: self.nodelist.render(context),
+            settings.FRAGMENT_CACHE_TIMEOUT,
+        )
+
+
+@register.tag('generation_cache')
+def do_generation_cache(parser, token):
+    """Кеширует фрагмент шаблона до смены поколения данных.
+
+    Использование::
+
+        {% generation_cache feed_generation page_obj.number %}
+            ...
+        {% endgeneration_cache %}
+
+    Первый аргумент - имя поколения (см. core.cache.get_generations),
+    остальные различают варианты фрагмента, как у тега cache.
+    """
+
+    nodelist = parser.parse(('endgeneration_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 1 argument."
+        )
+    return GenerationCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        [parser.compile_filter(token) for token in tokens[2:]],
+    )
@@ -0,0 +1,77 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from core.images import FORMATS, load_variants
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default_storage.url(variant["name"])} {variant["width"]}w'
+        for variant in sorted(variants, key=lambda v: v['width'])
+    )
+
+
+@register.simple_tag
+def responsive_image(variants, src, sizes='100vw', css_class='', alt='',
+                     width=None, height=None, placeholder=''):
+    """Выводит картинку с вариантами разной ширины и формата.
+
+    Современные форматы (AVIF, WebP) попадают в <source> элемента
+    <picture>, JPEG - в srcset самого <img>. Без вариантов выводится
+    обычный <img>. Известные размеры выводятся в атрибуты width и height,
+    чтобы браузер зарезервировал место до загрузки картинки, а
+    размытая заглушка показывается фоном до ее загрузки.
+
+    Использование::
+
+        {% responsive_image profile.avatar_variants profile.get_avatar
+           sizes="200px" css_class="rounded-circle" width=200 height=200 %}
+
+    Args:
+        variants (str): варианты в JSON (см. core.images.build_variants).
+        src (str): адрес картинки для браузеров без srcset.
+        sizes (str): атрибут sizes.
+        css_class (str): CSS класс <img>.
+        alt (str): альтернативный текст.
+        width (int): ширина картинки.
+        height (int): высота картинки.
+        placeholder (str): data URI заглушки
+            (см. core.images.build_placeholder).
+
+    Returns:
+        str: HTML разметка.
+    """
+
+    by_format = {}
+    for variant in load_variants(variants):
+        by_format.setdefault(variant['format'], []).append(variant)
+    attrs = {
+        'src': src,
+        'class': css_class,
+        'alt': alt,
+        'width': width,
+        'height': height,
+    }
+    if placeholder:
+        attrs['style'] = (
+            f'background: url({placeholder}) center / cover no-repeat'
+        )
+    if not by_format:
+        return format_html('<img{}>', flatatt(attrs))
+    if 'jpeg' in by_format:
+        attrs['srcset'] = _srcset(by_format['jpeg'])
+        attrs['sizes'] = sizes
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">', (
+            (FORMATS[fmt][1], _srcset(by_format[fmt]), sizes)
+            for fmt in FORMATS
+            if fmt != 'jpeg' and fmt in by_format
+        )
+    )
+    return format_html(
+        '<picture>{}<img{}></picture>', sources, flatatt(attrs)
+    )
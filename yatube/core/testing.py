@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase для проверки бюджета SQL-запросов."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, msg=None):
+        """Проверяет, что блок выполняет не больше budget запросов.
+
+        Args:
+            budget (int): максимальное количество запросов.
+            msg (str): пояснение к ошибке.
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(self._formatMessage(
+                msg,
+                f'{executed} queries executed, budget is {budget}\n{queries}'
+            ))
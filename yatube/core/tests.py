@@ -1,4 +1,41 @@
-from django.test import Client, TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connections
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.cache import (FEEDS_CACHE, bump_generation, feeds_cache,
+                        get_cache, get_generations, get_or_recompute)
+from core.cache_backends import METRICS_FLUSH_EVERY, MeteredFileBasedCache
+from core.jobs import JobQueue
+from core.management.commands.cleanup_thumbnails import walk_storage
+from core.storage import ContentAddressedStorage
+from core.uploads import UNREADABLE_HASH
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+BYTE_STRING = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +45,339 @@ class ViewTestClass(TestCase):
             client.get('/unexisting_page/'),
             'core/404.html'
         )
+
+
+class GetOrRecomputeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, value):
+        return get_or_recompute(
+            'test-key', get_generations('test'), lambda: value
+        )
+
+    def test_value_lives_until_generation_changes(self):
+        """Значение пересчитывается только после смены поколения."""
+        self.assertEqual(self.get('first'), 'first')
+        self.assertEqual(self.get('second'), 'first')
+        bump_generation('test')
+        self.assertEqual(self.get('second'), 'second')
+
+    def test_stale_value_served_while_locked(self):
+        """Пока идет чужой пересчет, отдается прежнее значение."""
+        self.get('first')
+        bump_generation('test')
+        feeds_cache.add('test-key:lock', 1)
+        self.assertEqual(self.get('second'), 'first')
+        feeds_cache.delete('test-key:lock')
+        self.assertEqual(self.get('second'), 'second')
+
+
+@override_settings(TIMELINE_JOBS_ASYNC=True, TIMELINE_JOB_WORKERS=1)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.queue = JobQueue(
+            'test', 'TIMELINE_JOBS_ASYNC', 'TIMELINE_JOB_WORKERS'
+        )
+        self.addCleanup(self.queue.shutdown)
+
+    def test_pending_duplicates_skipped(self):
+        """Задача, которая еще ждет в очереди, второй раз не ставится."""
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        self.queue._submit(block, ())
+        started.wait(5)
+        for _ in range(3):
+            self.queue._submit(calls.append, (1,))
+        release.set()
+        self.queue.shutdown()
+        self.queue._submit(calls.append, (1,))
+        self.queue.shutdown()
+        self.assertEqual(calls, [1, 1])
+
+    def test_failure_logged_with_queue_name(self):
+        """Ошибка задачи пишется в лог с именем очереди."""
+        with self.assertLogs('core.jobs') as logs:
+            self.queue._submit(int, ('not a number',))
+            self.queue.shutdown()
+        self.assertIn('из очереди test', logs.output[0])
+
+    @override_settings(TIMELINE_JOBS_ASYNC=False)
+    def test_sync_mode_runs_at_once(self):
+        """Без фонового режима задача выполняется сразу."""
+        calls = []
+        self.queue.schedule(calls.append, 1)
+        self.assertEqual(calls, [1])
+
+
+class CacheNamespacesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_namespaces_do_not_share_keys(self):
+        """Одинаковые ключи разных пространств имен не пересекаются."""
+        feeds = get_cache(FEEDS_CACHE)
+        feeds.set('key', 'feeds')
+        cache.set('key', 'default')
+        self.assertEqual(feeds.get('key'), 'feeds')
+        self.assertEqual(cache.get('key'), 'default')
+
+    def test_unknown_namespace_falls_back_to_default(self):
+        """Ненастроенное пространство имен использует кеш по умолчанию."""
+        self.assertIs(get_cache('unknown'), caches['default'])
+
+
+class CacheMetricsTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.cache = MeteredFileBasedCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_hits_and_misses_counted(self):
+        """Попадания и промахи считаются для get и get_many."""
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('b')
+        self.cache.get_many(['a', 'b', 'c'])
+        self.assertEqual(
+            self.cache.get_metrics(), {'hits': 2, 'misses': 3}
+        )
+        self.cache.reset_metrics()
+        self.assertEqual(
+            self.cache.get_metrics(), {'hits': 0, 'misses': 0}
+        )
+
+    def test_metrics_shared_between_processes(self):
+        """Счетчики общего кеша суммируются по всем его клиентам."""
+        other = MeteredFileBasedCache(self.location, {})
+        for _ in range(METRICS_FLUSH_EVERY):
+            other.get('missing')
+        self.cache.get('missing')
+        self.assertEqual(self.cache.get_metrics(), {
+            'hits': 0, 'misses': METRICS_FLUSH_EVERY + 1,
+        })
+
+
+class ResponsiveImageTests(TestCase):
+    def render(self, variants):
+        return Template(
+            '{% load responsive_images %}'
+            '{% responsive_image variants "/src.jpg" sizes="50vw" %}'
+        ).render(Context({'variants': variants}))
+
+    def test_without_variants(self):
+        """Без вариантов выводится обычная картинка."""
+        self.assertHTMLEqual(
+            self.render(''), '<img src="/src.jpg" class="" alt="">'
+        )
+
+    def test_sources_by_format(self):
+        """Варианты группируются по форматам в srcset."""
+        variants = [
+            {'format': 'webp', 'width': 640, 'name': 'a-640w.webp'},
+            {'format': 'webp', 'width': 320, 'name': 'a-320w.webp'},
+            {'format': 'jpeg', 'width': 320, 'name': 'a-320w.jpeg'},
+        ]
+        self.assertHTMLEqual(
+            self.render(json.dumps(variants)),
+            '<picture>'
+            '<source type="image/webp" sizes="50vw" srcset="'
+            '/media/a-320w.webp 320w, /media/a-640w.webp 640w">'
+            '<img src="/src.jpg" srcset="/media/a-320w.jpeg 320w" '
+            'sizes="50vw" class="" alt="">'
+            '</picture>'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CleanupThumbnailsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        self.post = Post(author=user, text='test text')
+        self.post.image.save('small.gif', ContentFile(BYTE_STRING))
+        self.post.refresh_from_db()
+        self.orphan = default_storage.save(
+            'variants/posts/orphan-320w.jpeg', ContentFile(b'orphan')
+        )
+
+    def cleanup(self, *args):
+        out = StringIO()
+        call_command('cleanup_thumbnails', '--grace', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_keeps_files(self):
+        """Пробный запуск ничего не удаляет."""
+        self.cleanup('--dry-run')
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_orphans_deleted(self):
+        """Удаляются только файлы без ссылок из моделей."""
+        self.cleanup()
+        self.assertFalse(default_storage.exists(self.orphan))
+        for variant in json.loads(self.post.image_variants):
+            with self.subTest(variant=variant['name']):
+                self.assertTrue(default_storage.exists(variant['name']))
+        thumbnail = self.post.image_thumbnail[len(settings.MEDIA_URL):]
+        self.assertTrue(default_storage.exists(thumbnail))
+
+    def test_deleted_post_thumbnails_removed(self):
+        """Миниатюры удаленного поста удаляются вместе с записями."""
+        thumbnail = self.post.image_thumbnail[len(settings.MEDIA_URL):]
+        self.post.delete()
+        self.cleanup()
+        self.assertFalse(default_storage.exists(thumbnail))
+        self.assertIsNone(
+            default.kvstore.get(ImageFile(thumbnail, default.storage))
+        )
+
+    def test_dry_run_reports_what_is_deleted(self):
+        """Пробный запуск сообщает о стольких файлах, сколько удалит
+        обычный."""
+        self.post.delete()
+        before = set(walk_storage(default_storage, ''))
+        report = self.cleanup('--dry-run')
+        self.cleanup()
+        deleted = before - set(walk_storage(default_storage, ''))
+        self.assertIn(f'файлов {len(deleted)} ', report)
+
+    def test_new_files_kept(self):
+        """Файлы моложе --grace не удаляются."""
+        call_command('cleanup_thumbnails', stdout=StringIO())
+        self.assertTrue(default_storage.exists(self.orphan))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BackfillImageMetadataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_missing_metadata_filled(self):
+        """Размеры, хеш и заглушка заполняются для старых картинок."""
+        user = User.objects.create_user(username='auth')
+        post = Post(author=user, text='test text')
+        post.image.save('small.gif', ContentFile(BYTE_STRING))
+        Post.objects.update(
+            image_width=None, image_height=None, image_hash='',
+            image_placeholder=''
+        )
+        call_command('backfill_image_metadata', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertEqual(
+            post.image_hash, hashlib.sha256(BYTE_STRING).hexdigest()
+        )
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+
+    def test_unreadable_files_skipped_later(self):
+        """Отсутствующий файл отмечается и больше не читается, пока не
+        попросят повторить."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(
+            author=user, text='test text', image='posts/missing.gif'
+        )
+        Post.objects.update(image_width=None, image_height=None)
+        for args, report in [
+            [(), 'posts: обновлено 1, из них нечитаемых 1'],
+            [(), 'posts: обновлено 0, из них нечитаемых 0'],
+            [('--retry-failed',), 'posts: обновлено 1, из них нечитаемых 1'],
+        ]:
+            with self.subTest(args=args):
+                out = StringIO()
+                call_command('backfill_image_metadata', *args, stdout=out)
+                self.assertIn(report, out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.image_hash, UNREADABLE_HASH)
+
+    def test_placeholder_failure_keeps_hash(self):
+        """Ошибка заглушки не отмечает читаемый файл нечитаемым, заглушка
+        строится при следующем запуске."""
+        user = User.objects.create_user(username='auth')
+        post = Post(author=user, text='test text')
+        post.image.save('small.gif', ContentFile(BYTE_STRING))
+        Post.objects.update(
+            image_hash='', image_placeholder='', image_variants='[]'
+        )
+        out = StringIO()
+        with mock.patch(
+            'core.management.commands.backfill_image_metadata'
+            '.build_placeholder',
+            side_effect=OSError,
+        ):
+            call_command('backfill_image_metadata', stdout=out)
+        self.assertIn(
+            'posts: обновлено 1, из них нечитаемых 0, без заглушки 1',
+            out.getvalue()
+        )
+        post.refresh_from_db()
+        self.assertEqual(
+            post.image_hash, hashlib.sha256(BYTE_STRING).hexdigest()
+        )
+        self.assertEqual(post.image_placeholder, '')
+        call_command('backfill_image_metadata', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_name_sharded_by_hash(self):
+        """Файл раскладывается по подкаталогам из начала хеша."""
+        digest = hashlib.sha256(BYTE_STRING).hexdigest()
+        name = self.storage.save('posts/Small.GIF', ContentFile(BYTE_STRING))
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
+        )
+        self.assertTrue(self.storage.exists(name))
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые загрузки хранятся одним файлом."""
+        first = self.storage.save('posts/a.gif', ContentFile(BYTE_STRING))
+        second = self.storage.save('posts/b.gif', ContentFile(BYTE_STRING))
+        other = self.storage.save('posts/a.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+
+class SqlitePragmasTests(TestCase):
+    def test_new_connection_uses_pragmas(self):
+        """Новое соединение с файлом SQLite настраивается прагмами."""
+        path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+        default = connections['default']
+        wrapper = type(default)({**default.settings_dict, 'NAME': path})
+        try:
+            with wrapper.cursor() as cursor:
+                for pragma, expected in [
+                    ('journal_mode', 'wal'),
+                    ('synchronous', 1),
+                    ('busy_timeout', settings.SQLITE_PRAGMAS['busy_timeout']),
+                    ('cache_size', settings.SQLITE_PRAGMAS['cache_size']),
+                ]:
+                    with self.subTest(pragma=pragma):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        self.assertEqual(cursor.fetchone()[0], expected)
+        finally:
+            wrapper.close()
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
@@ -0,0 +1,258 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.images import get_image_dimensions
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Параметры сохранения уменьшенного оригинала по форматам.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+# Расширения форматов, в которые перекодируются картинки форматов,
+# которые Pillow читает, но не пишет (XPM, MPO с камер).
+REENCODE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png'}
+# Режимы, которые JPEG сохраняет без потери прозрачности и палитры.
+JPEG_MODES = ('RGB', 'L', 'CMYK')
+PNG_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+# Хеш, которым backfill_image_metadata отмечает отсутствующие и
+# нечитаемые файлы, чтобы не пытаться прочитать их при каждом запуске.
+UNREADABLE_HASH = 'unreadable'
+
+
+class SizeLimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загружаемые файлы на диск, а не в память процесса.
+
+    Данные сверх settings.IMAGE_UPLOAD_MAX_SIZE не записываются: файл
+    остается обрезанным, а size - полным размером загрузки, по которому
+    форма отклонит файл (см. UploadImageField).
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+
+def read_image_header(data):
+    """Читает формат и размеры картинки без декодирования пикселей.
+
+    Args:
+        data (UploadedFile): загруженный файл.
+
+    Returns:
+        tuple: формат Pillow, ширина, высота и признак анимации; None, если
+        это не картинка.
+    """
+
+    if hasattr(data, 'temporary_file_path'):
+        source = data.temporary_file_path()
+    else:
+        source = data
+    try:
+        with Image.open(source) as image:
+            return (
+                image.format, *image.size,
+                getattr(image, 'is_animated', False),
+            )
+    except Exception:
+        return None
+    finally:
+        if hasattr(data, 'seek'):
+            data.seek(0)
+
+
+def downsample_upload(data, image_format, max_dimension):
+    """Уменьшает загруженную картинку до max_dimension по большей стороне.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    память не тратится на полноразмерное изображение. Результат в том же
+    формате записывается поверх загруженного файла. Формат, который Pillow
+    не умеет записывать, перекодируется в JPEG или PNG, и файл
+    переименовывается под новый формат.
+
+    Args:
+        data (UploadedFile): загруженный файл.
+        image_format (str): формат Pillow.
+        max_dimension (int): наибольшая сторона результата.
+
+    Raises:
+        ValidationError: картинку не удалось записать.
+
+    Returns:
+        UploadedFile: тот же файл с уменьшенной картинкой.
+    """
+
+    with Image.open(data) as image:
+        image.draft(image.mode, (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if image_format not in Image.SAVE:
+        image_format = 'JPEG' if image.mode in JPEG_MODES else 'PNG'
+        if image_format == 'PNG' and image.mode not in PNG_MODES:
+            image = image.convert('RGBA')
+        root, _ = os.path.splitext(data.name)
+        data.name = root + REENCODE_EXTENSIONS[image_format]
+        data.content_type = Image.MIME[image_format]
+    data.seek(0)
+    data.truncate()
+    try:
+        image.save(data, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    except (OSError, ValueError):
+        raise ValidationError(
+            'Не удалось уменьшить изображение.', code='invalid_image'
+        )
+    data.size = data.tell()
+    data.seek(0)
+    return data
+
+
+def check_image_upload(data):
+    """Проверяет загруженную картинку до ее декодирования.
+
+    Файл больше settings.IMAGE_UPLOAD_MAX_SIZE и картинка больше
+    settings.IMAGE_UPLOAD_MAX_PIXELS отклоняются по размеру и заголовку.
+    Картинка больше settings.IMAGE_UPLOAD_MAX_DIMENSION по большей стороне
+    один раз уменьшается.
+
+    Args:
+        data (UploadedFile): загруженный файл.
+
+    Raises:
+        ValidationError: файл или картинка слишком большие.
+
+    Returns:
+        UploadedFile: файл, готовый к проверке ImageField.
+    """
+
+    if data.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='too_large',
+            params={'limit': filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)},
+        )
+    header = read_image_header(data)
+    if header is None:
+        # Сообщение о битой картинке выдаст сам ImageField.
+        return data
+    image_format, width, height, animated = header
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(limit)s пикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.IMAGE_UPLOAD_MAX_PIXELS},
+        )
+    max_dimension = settings.IMAGE_UPLOAD_MAX_DIMENSION
+    if max(width, height) > max_dimension and not animated:
+        return downsample_upload(data, image_format, max_dimension)
+    return data
+
+
+class ImageUploadFormMixin:
+    """Проверяет картинки формы до ImageField.to_python.
+
+    ImageField открывает и проверяет весь файл, поэтому слишком большие
+    загрузки отсекаются раньше, в конструкторе формы (см.
+    check_image_upload), а ошибки добавляются к полям в clean().
+
+    Attributes:
+        image_fields (tuple): имена полей с картинками.
+    """
+
+    image_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = {}
+        if not self.files:
+            return
+        self.files = self.files.copy()
+        for name in self.image_fields:
+            key = self.add_prefix(name)
+            upload = self.files.get(key)
+            if not upload:
+                continue
+            try:
+                self.files[key] = check_image_upload(upload)
+            except ValidationError as error:
+                self.upload_errors[name] = error
+                del self.files[key]
+
+    def clean(self):
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return super().clean()
+
+
+def image_dimensions(field_file):
+    """Возвращает размеры картинки по ее заголовку.
+
+    Args:
+        field_file (FieldFile): картинка из ImageField.
+
+    Returns:
+        tuple: ширина и высота, (None, None) если файла нет или он
+        не читается.
+    """
+
+    if not field_file:
+        return None, None
+    try:
+        return get_image_dimensions(field_file.file)
+    except (OSError, SuspiciousFileOperation):
+        return None, None
+
+
+def file_hash(field_file):
+    """Считает SHA-256 содержимого файла, читая его по частям.
+
+    Args:
+        field_file (FieldFile): файл из FileField.
+
+    Returns:
+        str: хеш в hex, пустая строка если файла нет или он не читается.
+    """
+
+    if not field_file:
+        return ''
+    digest = hashlib.sha256()
+    try:
+        field_file.open('rb')
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    except (OSError, SuspiciousFileOperation):
+        return ''
+    # Несохраненную загрузку еще запишет хранилище, ее нельзя закрывать.
+    if field_file._committed:
+        field_file.close()
+    else:
+        field_file.seek(0)
+    return digest.hexdigest()
+
+
+def file_changed(field_file, initial_name):
+    """Проверяет, что в поле новый файл.
+
+    Загрузка, переданная прямо в конструктор модели, еще не сохранена в
+    хранилище и тоже считается новым файлом.
+
+    Args:
+        field_file (FieldFile): файл из FileField.
+        initial_name (str): имя файла при загрузке модели из базы.
+
+    Returns:
+        bool: True если файл сменился.
+    """
+
+    return field_file.name != initial_name or not field_file._committed
@@ -1,9 +1,22 @@
 from django.contrib import admin
 
-from .models import Follow, Group, Post, Comment
+from .models import AuthorStats, Follow, Group, Post, Comment
+from .search import matching_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Ищет по полнотекстовому индексу вместо LIKE по search_fields."""
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = matching_ids(self.model, search_term)
+        if ids is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=ids), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -18,7 +31,7 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('post', 'text', 'created',)
     actions_on_bottom = True
     search_fields = ('text',)
@@ -31,7 +44,20 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('user',)
 
 
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'posts_count',
+        'comments_count',
+        'followers_count',
+        'following_count',
+    )
+    readonly_fields = list_display
+    search_fields = ('user__username',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(AuthorStats, AuthorStatsAdmin)
@@ -0,0 +1,482 @@
+import gzip
+import json
+import re
+from collections import Counter
+from itertools import chain
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from core.cache import invalidate_fragment_cache, invalidate_page_cache
+from core.models import CreatedModel, bulk_create_with_created
+from users.models import UserProfile
+
+from .feeds import invalidate_follow_feed, invalidate_post_feeds
+from .models import Comment, Follow, Group, Post, User
+from .search import rebuild_index
+from .stats import recount_author_stats
+from .timeline import rebuild_timeline
+
+# Модели дампа в порядке зависимостей: объект ссылается только на модели
+# раньше себя.
+DUMP_MODELS = (User, Group, UserProfile, Post, Comment, Follow)
+# Поля пользователя, которые выгружаются и загружаются без
+# include_credentials. Пароль, права, email и время входа остаются в базе.
+USER_FIELDS = ('username', 'first_name', 'last_name', 'date_joined')
+# Поля, по которым объект дампа совпадает с уже существующим в базе.
+NATURAL_KEYS = {User: 'username', Group: 'slug', UserProfile: 'user_id'}
+READ_SIZE = 64 * 1024
+# Сжатие gzip по умолчанию (9) заметно медленнее при почти том же размере.
+COMPRESS_LEVEL = 6
+# Размер пачки INSERT и поиска существующих объектов: SQLite ограничивает
+# количество строк в одном запросе.
+INSERT_SIZE = 500
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def open_dump(path, mode='rt'):
+    """Открывает файл дампа.
+
+    Args:
+        path (str): путь к файлу, с окончанием .gz - сжатому gzip.
+        mode (str): режим открытия в текстовом виде.
+
+    Returns:
+        file: текстовый файл.
+    """
+
+    if path.endswith('.gz'):
+        return gzip.open(
+            path, mode, compresslevel=COMPRESS_LEVEL, encoding='utf-8'
+        )
+    return open(path, mode, encoding='utf-8')
+
+
+def read_objects(stream):
+    """Читает объекты дампа по одному, не загружая файл целиком.
+
+    Поддерживаются JSON-массив, как у dumpdata, и JSONL - объект на
+    строку.
+
+    Args:
+        stream (file): текстовый файл дампа.
+
+    Raises:
+        json.JSONDecodeError: файл поврежден.
+
+    Yields:
+        dict: объект с ключами model, pk и fields.
+    """
+
+    buffer = ''
+    while not buffer:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            return
+        buffer = chunk.lstrip()
+    if buffer.startswith('['):
+        yield from _read_array(buffer, stream)
+    else:
+        yield from _read_lines(buffer + stream.readline(), stream)
+
+
+def _read_lines(buffer, stream):
+    # Прочитанное начало файла заканчивается целой строкой.
+    for line in chain(buffer.splitlines(), stream):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _read_array(buffer, stream):
+    decoder = json.JSONDecoder()
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            obj, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Объект оборван концом прочитанного куска.
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield obj
+
+
+def dump_fields(model, include_credentials=False):
+    """Возвращает поля модели, которые переносятся дампом.
+
+    Args:
+        model (Model): модель из DUMP_MODELS.
+        include_credentials (bool): переносить все поля пользователя,
+            включая пароль и права.
+
+    Returns:
+        list: поля без первичного ключа.
+    """
+
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and (
+            model is not User
+            or include_credentials
+            or field.name in USER_FIELDS
+        )
+    ]
+
+
+def dump_objects(model, since=None, chunk_size=2000,
+                 include_credentials=False):
+    """Выбирает объекты модели в формате дампа dumpdata.
+
+    Строки читаются итератором по chunk_size, в PostgreSQL - серверным
+    курсором, поэтому память не зависит от размера таблицы.
+
+    Args:
+        model (Model): модель из DUMP_MODELS.
+        since (datetime): выбрать только созданные с этого момента, у
+            моделей без даты создания выбираются все объекты.
+        chunk_size (int): количество строк, читаемых за раз.
+        include_credentials (bool): выгружать пароли, права и email
+            пользователей.
+
+    Yields:
+        dict: объект с ключами model, pk и fields.
+    """
+
+    fields = dump_fields(model, include_credentials)
+    names = [field.name for field in fields]
+    queryset = model._default_manager.order_by('pk')
+    if since is not None and issubclass(model, CreatedModel):
+        queryset = queryset.filter(created__gte=since)
+    label = model_label(model)
+    rows = queryset.values_list(
+        'pk', *[field.attname for field in fields]
+    ).iterator(chunk_size)
+    for pk, *values in rows:
+        yield {'model': label, 'pk': pk, 'fields': dict(zip(names, values))}
+
+
+def write_objects(objects, stream):
+    """Пишет объекты в JSONL, по объекту на строку.
+
+    Args:
+        objects (iterable): объекты в формате дампа.
+        stream (file): текстовый файл.
+
+    Returns:
+        int: количество записанных объектов.
+    """
+
+    count = 0
+    for obj in objects:
+        stream.write(
+            json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False)
+        )
+        stream.write('\n')
+        count += 1
+    return count
+
+
+class DumpImporter:
+    """Загружает объекты дампа пачками bulk_create.
+
+    Объекты получают новые id, ссылки переводятся через словари старых id
+    в новые. Пользователи и группы, уже существующие в базе, сопоставляются
+    по username и slug и заново не создаются. Объект, ссылающийся на еще
+    не прочитанный, откладывается до конца загрузки.
+
+    Каждая пачка сохраняется в своей транзакции: прерванная загрузка
+    оставляет в базе сохраненные пачки. Пачка получает id после
+    последнего в базе и блокирует таблицу модели на запись до конца своей
+    транзакции, поэтому загрузка может идти, пока сайт работает. Сигналы
+    при bulk_create не срабатывают, поэтому профили, счетчики, поисковый
+    индекс, ленты подписок и кеш обновляет finish().
+
+    Пароли, права, email и время входа пользователей без
+    include_credentials не загружаются: такие пользователи получают
+    непригодный пароль и входят через восстановление пароля.
+
+    Attributes:
+        batch_size (int): количество объектов модели в одной транзакции.
+        include_credentials (bool): загружать все поля пользователей.
+        created (Counter): созданные объекты по меткам моделей.
+        skipped (Counter): пропущенные объекты по меткам моделей.
+    """
+
+    def __init__(self, batch_size=5000, progress=None,
+                 include_credentials=False):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.include_credentials = include_credentials
+        self.fields = {
+            model: dump_fields(model, include_credentials)
+            for model in DUMP_MODELS
+        }
+        self.created = Counter()
+        self.skipped = Counter()
+        self.models = {model_label(model): model for model in DUMP_MODELS}
+        # Старые id переводятся в новые только у моделей, на которые
+        # ссылаются другие.
+        self.ids = {
+            field.related_model: {}
+            for model in DUMP_MODELS
+            for field in model._meta.concrete_fields
+            if field.is_relation
+        }
+        self.buffers = {model: [] for model in DUMP_MODELS}
+        self.pending = {model: [] for model in DUMP_MODELS}
+        self.first_ids = {
+            model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+            for model in DUMP_MODELS
+        }
+        self.next_ids = dict(self.first_ids)
+        self.users = set()
+        self.authors = set()
+        self.groups = set()
+        self.followers = set()
+
+    def load(self, stream):
+        """Загружает объекты из файла дампа.
+
+        Args:
+            stream (file): текстовый файл дампа.
+        """
+
+        self.add_objects(read_objects(stream))
+
+    def add_objects(self, objects):
+        """Загружает объекты в формате дампа.
+
+        Args:
+            objects (iterable): словари с ключами model, pk и fields.
+        """
+
+        for obj in objects:
+            model = self.models.get(obj.get('model'))
+            if model is None:
+                self.skipped[obj.get('model')] += 1
+                continue
+            buffer = self.buffers[model]
+            buffer.append((obj.get('pk'), obj.get('fields', {})))
+            if len(buffer) >= self.batch_size:
+                self.flush(model)
+
+    def finish(self):
+        """Сохраняет остаток объектов и обновляет производные данные."""
+
+        for model in DUMP_MODELS:
+            self.flush(model)
+        for model in DUMP_MODELS:
+            self.buffers[model], self.pending[model] = self.pending[model], []
+            self.flush(model, final=True)
+        self.create_profiles()
+        user_ids = sorted(self.users)
+        for start in range(0, len(user_ids), INSERT_SIZE):
+            recount_author_stats(
+                User.objects.filter(pk__in=user_ids[start:start + INSERT_SIZE])
+            )
+        rebuild_index()
+        if settings.FOLLOW_FEED_TIMELINE:
+            self.rebuild_timelines()
+        self.invalidate_caches()
+
+    def flush(self, model, final=False):
+        # Сначала сохраняются модели, на которые ссылаются объекты пачки.
+        for field in model._meta.concrete_fields:
+            if field.related_model in self.buffers:
+                self.flush(field.related_model, final)
+        rows, self.buffers[model] = self.buffers[model], []
+        if not rows:
+            return
+        label = model_label(model)
+        collected = self.collect(model, rows, final)
+        with transaction.atomic():
+            self.lock(model)
+            objects = self.assign_ids(model, *collected)
+            if issubclass(model, CreatedModel):
+                bulk_create_with_created(model, objects, INSERT_SIZE)
+            else:
+                model.objects.bulk_create(objects, batch_size=INSERT_SIZE)
+            self.reset_sequence(model)
+        self.remember(model, objects)
+        self.created[label] += len(objects)
+        if self.progress:
+            self.progress(label, len(objects))
+
+    def collect(self, model, rows, final):
+        # Собирает объекты пачки без повторов по естественному ключу.
+        label = model_label(model)
+        objects, old_ids = {}, {}
+        for old_id, fields in rows:
+            obj = self.build(model, fields)
+            if obj is None:
+                if final:
+                    self.skipped[label] += 1
+                else:
+                    self.pending[model].append((old_id, fields))
+                continue
+            if model is Follow and obj.user_id == obj.author_id:
+                self.skipped[label] += 1
+                continue
+            key = self.natural_key(obj)
+            if key is None:
+                key = ('id', old_id)
+            if key in objects:
+                self.skipped[label] += 1
+            else:
+                objects[key] = obj
+            old_ids.setdefault(key, []).append(old_id)
+        return objects, old_ids
+
+    def assign_ids(self, model, objects, old_ids):
+        # Выдает новые id после последнего в базе и убирает объекты, уже
+        # существующие в базе.
+        last_id = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        self.next_ids[model] = max(self.next_ids[model], last_id + 1)
+        existing = self.find_existing(model, objects)
+        created = []
+        for key, obj in objects.items():
+            if key in existing:
+                pk = existing[key]
+                self.skipped[model_label(model)] += 1
+            else:
+                pk = obj.pk = self.next_ids[model]
+                self.next_ids[model] += 1
+                created.append(obj)
+            if model in self.ids:
+                for old_id in old_ids[key]:
+                    self.ids[model][old_id] = pk
+        return created
+
+    def build(self, model, fields):
+        # Возвращает несохраненный объект, None - ссылка еще не известна.
+        values = {}
+        for field in self.fields[model]:
+            if field.name not in fields:
+                continue
+            value = fields[field.name]
+            if field.is_relation and value is not None:
+                value = self.ids[field.related_model].get(value)
+                if value is None:
+                    return None
+            elif not field.is_relation:
+                value = field.to_python(value)
+            values[field.attname] = value
+        obj = model(**values)
+        if model is User and not obj.password:
+            obj.set_unusable_password()
+        return obj
+
+    def natural_key(self, obj):
+        if isinstance(obj, Follow):
+            return obj.user_id, obj.author_id
+        if type(obj) in NATURAL_KEYS:
+            return getattr(obj, NATURAL_KEYS[type(obj)])
+        return None
+
+    def find_existing(self, model, objects):
+        # Возвращает id объектов пачки, уже существующих в базе.
+        if model is Follow:
+            column = 'user_id'
+            values = sorted({user_id for user_id, _ in objects})
+        elif model in NATURAL_KEYS:
+            column = NATURAL_KEYS[model]
+            values = sorted(objects)
+        else:
+            return {}
+        found = {}
+        for start in range(0, len(values), INSERT_SIZE):
+            queryset = model.objects.filter(**{
+                f'{column}__in': values[start:start + INSERT_SIZE]
+            })
+            if model is Follow:
+                found.update(
+                    ((user_id, author_id), pk)
+                    for pk, user_id, author_id in queryset.values_list(
+                        'pk', 'user_id', 'author_id'
+                    )
+                    if (user_id, author_id) in objects
+                )
+            else:
+                found.update(
+                    (value, pk)
+                    for pk, value in queryset.values_list('pk', column)
+                )
+        return found
+
+    def remember(self, model, objects):
+        # Запоминает, чьи счетчики, ленты и кеш обновить в finish().
+        for obj in objects:
+            if model is User:
+                self.users.add(obj.pk)
+            elif model is Post:
+                self.users.add(obj.author_id)
+                self.authors.add(obj.author_id)
+                self.groups.add(obj.group_id)
+            elif model is Comment:
+                self.users.add(obj.author_id)
+            elif model is Follow:
+                self.users.update((obj.user_id, obj.author_id))
+                self.followers.add(obj.user_id)
+
+    def lock(self, model):
+        # Параллельные записи в PostgreSQL не видны до фиксации, поэтому
+        # таблица блокируется на запись до конца транзакции пачки. Чтение
+        # не блокируется. SQLite и так выполняет записи по очереди.
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {connection.ops.quote_name(model._meta.db_table)}'
+                f' IN EXCLUSIVE MODE'
+            )
+
+    def reset_sequence(self, model):
+        # Объекты сохранены с явными id: последовательность PostgreSQL
+        # сдвигается за них в той же транзакции, чтобы следующие записи
+        # сайта не получили занятые id.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [model]
+            ):
+                cursor.execute(sql)
+
+    def create_profiles(self):
+        # Новым пользователям без профиля в дампе заводятся пустые.
+        users = User.objects.filter(
+            pk__gte=self.first_ids[User], userprofile__isnull=True
+        ).values_list('pk', flat=True)
+        UserProfile.objects.bulk_create(
+            (UserProfile(user_id=user_id) for user_id in users.iterator()),
+            batch_size=INSERT_SIZE,
+        )
+
+    def rebuild_timelines(self):
+        users = User.objects.filter(
+            Q(follower__pk__gte=self.first_ids[Follow])
+            | Q(follower__author__posts__pk__gte=self.first_ids[Post])
+        ).distinct()
+        for user in users.iterator():
+            rebuild_timeline(user)
+
+    def invalidate_caches(self):
+        invalidate_page_cache()
+        invalidate_fragment_cache()
+        group_ids = self.groups
+        for author_id in self.authors:
+            invalidate_post_feeds(author_id, group_ids)
+            group_ids = ()
+        for user_id in self.followers:
+            invalidate_follow_feed(user_id)
@@ -0,0 +1,276 @@
+import hashlib
+
+from core.cache import (bump_generation, feeds_cache,
+                        invalidate_fragment_cache)
+
+from .models import Comment, Follow, Group, Post, User
+
+INDEX_FEED = 'index'
+GROUP_FEED = 'group'
+AUTHOR_FEED = 'author'
+FOLLOW_FEED = 'follow'
+POST_PAGE = 'post'
+# Страницы всех постов автора: на них видны его счетчики и имя.
+AUTHOR_POSTS_PAGE = 'author_posts'
+
+
+def feed_name(feed, pk=None):
+    """Возвращает имя ленты.
+
+    Args:
+        feed (str): лента: INDEX_FEED, GROUP_FEED, AUTHOR_FEED или
+            FOLLOW_FEED.
+        pk (int): id группы, автора или подписчика для лент кроме главной.
+
+    Returns:
+        str: имя ленты.
+    """
+
+    if pk is None:
+        return feed
+    return f'{feed}:{pk}'
+
+
+def feed_count_key(feed, pk=None):
+    """Возвращает ключ кеша с количеством постов в ленте.
+
+    Args:
+        feed (str): лента.
+        pk (int): id группы, автора или подписчика.
+
+    Returns:
+        str: ключ кеша.
+    """
+
+    return f'feed_count:{feed_name(feed, pk)}'
+
+
+def feed_generation(feed, pk=None):
+    """Возвращает имя поколения закешированных фрагментов ленты.
+
+    Args:
+        feed (str): лента.
+        pk (int): id группы, автора или подписчика.
+
+    Returns:
+        str: имя поколения для core.cache.get_generations().
+    """
+
+    return f'feed:{feed_name(feed, pk)}'
+
+
+def invalidate_post_feeds(author_id, group_ids=(), counts=True):
+    """Сбрасывает кеш лент, куда попадает пост автора.
+
+    Args:
+        author_id (int): id автора поста.
+        group_ids (iterable): id групп поста, None пропускаются.
+        counts (bool): сбросить и количества постов в лентах.
+    """
+
+    feeds = [(INDEX_FEED, None), (AUTHOR_FEED, author_id)]
+    feeds.extend(
+        (GROUP_FEED, group_id)
+        for group_id in set(group_ids) if group_id is not None
+    )
+    feeds.extend(
+        (FOLLOW_FEED, user_id)
+        for user_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    )
+    if counts:
+        feeds_cache.delete_many([feed_count_key(*feed) for feed in feeds])
+    bump_generation(*[feed_generation(*feed) for feed in feeds])
+
+
+def invalidate_follow_feed(user_id):
+    """Сбрасывает кеш ленты подписок пользователя.
+
+    Args:
+        user_id (int): id подписчика.
+    """
+
+    feeds_cache.delete(feed_count_key(FOLLOW_FEED, user_id))
+    bump_generation(feed_generation(FOLLOW_FEED, user_id))
+
+
+def page_generation(page, key=None):
+    """Возвращает имя поколения закешированных страниц.
+
+    Страницы лент группы и автора различаются по адресу, поэтому их
+    поколения ведутся по slug группы и имени автора, а не по id: так
+    закешированную страницу можно отдать без обращения к базе. Slug и
+    имя берутся из адреса, поэтому в имя поколения входит их хеш: иначе
+    не-ASCII и длинные значения не годились бы для ключа memcached.
+
+    Args:
+        page (str): лента или страница: INDEX_FEED, GROUP_FEED,
+            AUTHOR_FEED, POST_PAGE или AUTHOR_POSTS_PAGE.
+        key (str): slug группы, имя автора, id поста или id автора для
+            AUTHOR_POSTS_PAGE.
+
+    Returns:
+        str: имя поколения для core.cache.get_page_generations().
+    """
+
+    if isinstance(key, str):
+        key = hashlib.md5(key.encode()).hexdigest()
+    return f'page:{feed_name(page, key)}'
+
+
+def post_author_key(post_id):
+    """Возвращает ключ кеша с id автора поста.
+
+    Args:
+        post_id (int): id поста.
+
+    Returns:
+        str: ключ кеша.
+    """
+
+    return f'post_author:{post_id}'
+
+
+def remember_post_author(post):
+    """Сохраняет в кеше id автора поста.
+
+    Автор поста не меняется, поэтому id хранится без таймаута.
+
+    Args:
+        post (Post): пост.
+    """
+
+    feeds_cache.set(post_author_key(post.pk), post.author_id, None)
+
+
+def post_author_id(post_id):
+    """Возвращает id автора поста.
+
+    id берется из кеша, куда его кладет remember_post_author() при
+    создании поста, поэтому закешированную страницу поста можно отдать
+    без обращения к базе.
+
+    Args:
+        post_id (int): id поста.
+
+    Returns:
+        int: id автора, None если поста нет.
+    """
+
+    author_id = feeds_cache.get(post_author_key(post_id))
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            feeds_cache.set(post_author_key(post_id), author_id, None)
+    return author_id
+
+
+def post_page_generations(post_id):
+    """Возвращает поколения страницы поста: самого поста и всех постов
+    его автора.
+
+    Args:
+        post_id (int): id поста.
+
+    Returns:
+        list: имена поколений для core.cache.get_page_generations().
+    """
+
+    generations = [page_generation(POST_PAGE, post_id)]
+    author_id = post_author_id(post_id)
+    if author_id is not None:
+        generations.append(page_generation(AUTHOR_POSTS_PAGE, author_id))
+    return generations
+
+
+def invalidate_pages(*pages):
+    """Сбрасывает закешированные страницы сменой их поколений.
+
+    Args:
+        *pages (tuple): страницы, как аргументы page_generation().
+    """
+
+    bump_generation(*[page_generation(*page) for page in pages])
+
+
+def invalidate_post_pages(post, group_ids=(), author_stats=False):
+    """Сбрасывает закешированные страницы, которые показывают пост.
+
+    Args:
+        post (Post): пост.
+        group_ids (iterable): id групп поста, None пропускаются.
+        author_stats (bool): изменились счетчики автора, которые видны на
+            страницах всех его постов: они сбрасываются поколением
+            AUTHOR_POSTS_PAGE автора.
+    """
+
+    pages = [
+        (INDEX_FEED,),
+        (AUTHOR_FEED, post.author.username),
+        (POST_PAGE, post.pk),
+    ]
+    if author_stats:
+        pages.append((AUTHOR_POSTS_PAGE, post.author_id))
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    # Загруженная группа поста не требует лишнего запроса.
+    if post.group_id in group_ids and Post.group.is_cached(post):
+        group_ids.discard(post.group_id)
+        pages.append((GROUP_FEED, post.group.slug))
+    if group_ids:
+        pages.extend(
+            (GROUP_FEED, slug) for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        )
+    invalidate_pages(*pages)
+
+
+def invalidate_author_pages(author_id, usernames):
+    """Сбрасывает кеш лент, фрагментов и страниц с именем пользователя.
+
+    Args:
+        author_id (int): id пользователя.
+        usernames (iterable): прежнее и новое имя пользователя: страница
+            профиля закеширована по адресу.
+    """
+
+    invalidate_post_feeds(author_id, counts=False)
+    invalidate_fragment_cache()
+    pages = [(INDEX_FEED,), (AUTHOR_POSTS_PAGE, author_id)]
+    pages.extend((AUTHOR_FEED, username) for username in set(usernames))
+    pages.extend(
+        (POST_PAGE, post_id) for post_id in Comment.objects.filter(
+            author_id=author_id
+        ).values_list('post_id', flat=True).distinct()
+    )
+    pages.extend(
+        (GROUP_FEED, slug) for slug in Group.objects.filter(
+            posts__author_id=author_id
+        ).distinct().values_list('slug', flat=True)
+    )
+    invalidate_pages(*pages)
+
+
+def invalidate_profile_page(profile):
+    """Сбрасывает закешированную страницу профиля пользователя.
+
+    Аватар и рассказ о себе видны только на странице профиля, поэтому
+    остальные страницы не сбрасываются.
+
+    Args:
+        profile (UserProfile): профиль пользователя.
+    """
+
+    if profile.user_id is None:
+        return
+    if type(profile).user.is_cached(profile):
+        username = profile.user.username
+    else:
+        username = User.objects.filter(pk=profile.user_id).values_list(
+            'username', flat=True
+        ).first()
+    if username is not None:
+        invalidate_pages((AUTHOR_FEED, username))
@@ -0,0 +1,50 @@
+from .feeds import (AUTHOR_FEED, AUTHOR_POSTS_PAGE, invalidate_follow_feed,
+                    invalidate_pages)
+from .models import Follow
+from .stats import change_author_stats
+from .timeline import refill_follower_timelines, remove_from_timeline
+
+
+def follow_removed(user, author):
+    """Уменьшает счетчики подписок и сбрасывает кеш после отписки.
+
+    Args:
+        user (User): бывший подписчик.
+        author (User): автор, от которого отписались.
+    """
+
+    change_author_stats(author.pk, followers_count=-1)
+    change_author_stats(user.pk, following_count=-1)
+    invalidate_follow_feed(user.pk)
+    invalidate_pages(
+        (AUTHOR_FEED, author.username),
+        (AUTHOR_FEED, user.username),
+        (AUTHOR_POSTS_PAGE, author.pk),
+        (AUTHOR_POSTS_PAGE, user.pk),
+    )
+
+
+def unfollow(user, author):
+    """Отписывает пользователя от автора одним запросом DELETE.
+
+    Подписка удаляется без загрузки и сигналов post_delete, поэтому
+    счетчики, кеш и ленты меняет только запрос, который действительно
+    удалил строку: из двух одновременных отписок - ровно один.
+
+    Args:
+        user (User): подписчик.
+        author (User): автор.
+
+    Returns:
+        bool: подписка была и удалена этим вызовом.
+    """
+
+    deleted = Follow.objects.filter(user=user, author=author)._raw_delete(
+        Follow.objects.db
+    )
+    if not deleted:
+        return False
+    follow_removed(user, author)
+    remove_from_timeline(user, author)
+    refill_follower_timelines(author)
+    return True
@@ -1,11 +1,15 @@
 from django import forms
 
+from core.uploads import ImageUploadFormMixin
+
 from .models import Post, Comment
 
 
-class PostForm(forms.ModelForm):
+class PostForm(ImageUploadFormMixin, forms.ModelForm):
     """Форма для создания и редактирования поста."""
 
+    image_fields = ('image',)
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -0,0 +1,225 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import bulk_create_with_created
+from posts.models import Comment, Follow, Group, Post, User
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+PREFIX = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов лент без составных индексов '
+        'постов и комментариев и с ними. Индексы внешних ключей и '
+        'уникальности остаются в обоих замерах, список индексов таблиц '
+        'выводится перед каждым. Данные генерируются в транзакции и '
+        'откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000, help='Количество авторов.'
+        )
+        parser.add_argument(
+            '--posts', type=int, default=50000, help='Количество постов.'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=20, help='Количество групп.'
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=20000,
+            help='Количество комментариев.',
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=50,
+            help='Количество подписок каждого пользователя.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20, help='Повторов запроса.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Зерно генератора данных.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.generate(rng, options)
+            self.stdout.write(
+                f'Данные сгенерированы за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            queries = self.get_queries(rng)
+            indexes = [
+                (model, index)
+                for model in (Post, Comment)
+                for index in model._meta.indexes
+            ]
+            self.execute_index_sql(indexes, 'remove_sql')
+            before = self.measure(
+                queries, options['repeat'], 'Без составных индексов'
+            )
+            self.execute_index_sql(indexes, 'create_sql')
+            after = self.measure(
+                queries, options['repeat'], 'С составными индексами'
+            )
+            self.stdout.write('Итого, медиана:')
+            for name in queries:
+                self.stdout.write(
+                    f'  {name}: {before[name]:.2f} мс -> '
+                    f'{after[name]:.2f} мс'
+                )
+            transaction.set_rollback(True)
+
+    def generate(self, rng, options):
+        now = timezone.now()
+
+        def created():
+            return now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+        User.objects.bulk_create(
+            (User(username=f'{PREFIX}-{i}') for i in range(options['users'])),
+            batch_size=500,
+        )
+        users = list(
+            User.objects.filter(username__startswith=f'{PREFIX}-')
+            .values_list('pk', flat=True)
+        )
+        Group.objects.bulk_create(
+            Group(title=f'{PREFIX} {i}', slug=f'{PREFIX}-{i}')
+            for i in range(options['groups'])
+        )
+        groups = list(
+            Group.objects.filter(slug__startswith=f'{PREFIX}-')
+            .values_list('pk', flat=True)
+        )
+        # Даты создания сохраняются по id, поэтому id выдаются явно.
+        first_post = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        bulk_create_with_created(
+            Post,
+            (
+                Post(
+                    pk=first_post + i + 1,
+                    author_id=rng.choice(users),
+                    group_id=(
+                        rng.choice(groups)
+                        if groups and rng.random() < 0.5 else None
+                    ),
+                    text=f'{PREFIX} {i}',
+                    created=created(),
+                )
+                for i in range(options['posts'])
+            ),
+            500,
+        )
+        posts = list(
+            Post.objects.filter(text__startswith=f'{PREFIX} ')
+            .values_list('pk', flat=True)
+        )
+        # Комментарии собираются на небольшой доле популярных постов.
+        popular = posts[:max(1, len(posts) // 100)]
+        first_comment = Comment.objects.aggregate(last=Max('pk'))['last'] or 0
+        bulk_create_with_created(
+            Comment,
+            (
+                Comment(
+                    pk=first_comment + i + 1,
+                    post_id=rng.choice(popular),
+                    author_id=rng.choice(users),
+                    text=f'{PREFIX} {i}',
+                    created=created(),
+                )
+                for i in range(options['comments'])
+            ),
+            500,
+        )
+        follows = min(options['follows'], len(users))
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user, author_id=author)
+                for user in users
+                for author in rng.sample(users, follows)
+                if author != user
+            ),
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+    def get_queries(self, rng):
+        users = User.objects.filter(username__startswith=f'{PREFIX}-')
+        author = rng.choice(list(users))
+        reader = rng.choice(list(users))
+        group = Group.objects.filter(slug__startswith=f'{PREFIX}-').first()
+        post = Comment.objects.filter(
+            text__startswith=f'{PREFIX} '
+        ).values_list('post', flat=True).first()
+        return {
+            'profile': lambda: (
+                Post.objects.filter(author=author).select_related('group')
+                .order_by('-created', '-pk')[:POSTS_PER_PAGE]
+            ),
+            'group_posts': lambda: (
+                Post.objects.filter(group=group).select_related('author')
+                .order_by('-created', '-pk')[:POSTS_PER_PAGE]
+            ),
+            'post_detail comments': lambda: (
+                Comment.objects.filter(post=post).select_related('author')
+                [:COMMENTS_PER_PAGE]
+            ),
+            'follow_index': lambda: (
+                Post.objects.filter(author__following__user=reader)
+                .select_related('author', 'group')[:POSTS_PER_PAGE]
+            ),
+        }
+
+    def execute_index_sql(self, indexes, method):
+        # Редактор схемы SQLite нельзя открыть внутри транзакции, поэтому
+        # берется только сгенерированный им SQL.
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(str(getattr(index, method)(model, editor)))
+
+    def measure(self, queries, repeat, title):
+        self.stdout.write(f'{title}:')
+        self.write_indexes()
+        medians = {}
+        for name, query in queries.items():
+            self.stdout.write(f'  {name}:')
+            for line in query().explain().splitlines():
+                self.stdout.write(f'    {line}')
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(query())
+                timings.append(time.perf_counter() - started)
+            medians[name] = statistics.median(timings) * 1000
+            self.stdout.write(f'    медиана {medians[name]:.2f} мс')
+        return medians
+
+    def write_indexes(self):
+        # Подписки выводятся, потому что по ним соединяется follow_index.
+        with connection.cursor() as cursor:
+            for model in (Post, Comment, Follow):
+                table = model._meta.db_table
+                constraints = connection.introspection.get_constraints(
+                    cursor, table
+                )
+                self.stdout.write(f'  индексы {table}:')
+                for name, info in sorted(constraints.items()):
+                    if info['index'] or info['unique']:
+                        columns = ', '.join(info['columns'])
+                        self.stdout.write(f'    {name} ({columns})')
@@ -0,0 +1,87 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, User
+from posts.search import SearchResults, rebuild_index
+from yatube.settings import POSTS_PER_PAGE
+
+PREFIX = 'searchbench'
+SYLLABLES = ('ко', 'ра', 'ми', 'ту', 'ле', 'са', 'но', 'пи', 'ве', 'да')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает полнотекстовый поиск с LIKE по тексту постов. Данные '
+        'генерируются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=100000, help='Количество постов.'
+        )
+        parser.add_argument(
+            '--words', type=int, default=12, help='Слов в посте.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10, help='Повторов запроса.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Зерно генератора данных.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Частоты слов убывают по закону Ципфа: есть и частые, и редкие.
+        vocabulary = [
+            ''.join(syllables)
+            for syllables in itertools.product(SYLLABLES, repeat=3)
+        ]
+        rng.shuffle(vocabulary)
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        with transaction.atomic():
+            started = time.perf_counter()
+            author = User.objects.create(username=PREFIX)
+            Post.objects.bulk_create(
+                (
+                    Post(author=author, text=' '.join(rng.choices(
+                        vocabulary, weights, k=options['words']
+                    )))
+                    for _ in range(options['posts'])
+                ),
+                batch_size=500,
+            )
+            rebuild_index()
+            self.stdout.write(
+                f'Данные и индекс построены за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            for word in (vocabulary[0], vocabulary[50], vocabulary[-1]):
+                self.compare(word, options['repeat'])
+            transaction.set_rollback(True)
+
+    def compare(self, word, repeat):
+        like = Post.objects.filter(text__icontains=word)
+        like_time, like_count = self.measure(
+            lambda: (like.count(), list(like[:POSTS_PER_PAGE])), repeat
+        )
+        results = SearchResults(word)
+        search_time, search_count = self.measure(
+            lambda: (results.count(), results[:POSTS_PER_PAGE]), repeat
+        )
+        self.stdout.write(
+            f'{word}: LIKE {like_count} постов за {like_time:.1f} мс, '
+            f'индекс {search_count} постов за {search_time:.1f} мс'
+        )
+
+    def measure(self, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count, _ = query()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000, count
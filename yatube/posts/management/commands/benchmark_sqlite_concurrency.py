@@ -0,0 +1,119 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from posts.models import Comment, Post, User
+from yatube.settings import POSTS_PER_PAGE
+
+PREFIX = 'sqlitebench'
+# Настройки SQLite по умолчанию: журнал отката и ожидание диска на каждом
+# коммите.
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет чтение ленты во время записи комментариев на SQLite '
+        'с настройками по умолчанию и с settings.SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=4, help='Потоков чтения ленты.'
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=2,
+            help='Потоков записи комментариев.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность замера в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда измеряет только SQLite.')
+        author = User.objects.create(username=PREFIX)
+        post = Post.objects.create(author=author, text=PREFIX)
+        try:
+            for title, pragmas in [
+                ('По умолчанию', DEFAULT_PRAGMAS),
+                ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+            ]:
+                # Режим журнала меняется, только когда других соединений
+                # с базой нет.
+                connections.close_all()
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    connection.ensure_connection()
+                    self.run(title, author, post, options)
+        finally:
+            connections.close_all()
+            author.delete()
+
+    def run(self, title, author, post, options):
+        stop = threading.Event()
+        workers = options['readers'] + options['writers']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reads = [
+                executor.submit(self.loop, stop, self.read_feed)
+                for _ in range(options['readers'])
+            ]
+            writes = [
+                executor.submit(
+                    self.loop, stop, self.write_comment, author, post
+                )
+                for _ in range(options['writers'])
+            ]
+            time.sleep(options['duration'])
+            stop.set()
+            reads = [future.result() for future in reads]
+            writes = [future.result() for future in writes]
+        self.stdout.write(f'{title}:')
+        for name, results in [('чтение', reads), ('запись', writes)]:
+            timings = sorted(t for result in results for t in result[0])
+            errors = sum(result[1] for result in results)
+            line = (
+                f'  {name}: {len(timings) / options["duration"]:.1f} '
+                f'в секунду, ошибок {errors}'
+            )
+            if timings:
+                line += (
+                    f', медиана {statistics.median(timings) * 1000:.1f} мс, '
+                    f'95% {timings[int(len(timings) * 0.95)] * 1000:.1f} мс'
+                )
+            self.stdout.write(line)
+
+    def loop(self, stop, operation, *args):
+        # У каждого потока свое соединение с базой, его нужно закрыть.
+        timings, errors = [], 0
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    operation(*args)
+                except Exception:
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return timings, errors
+
+    def read_feed(self):
+        list(
+            Post.objects.select_related('author', 'group')
+            [:POSTS_PER_PAGE]
+        )
+
+    def write_comment(self, author, post):
+        Comment.objects.create(post=post, author=author, text=PREFIX)
@@ -0,0 +1,96 @@
+import datetime as dt
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts.dumps import (DUMP_MODELS, dump_objects, model_label, open_dump,
+                         write_objects)
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(value)
+        moment = dt.datetime.combine(date, dt.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, профили, группы, посты, комментарии и '
+        'подписки в сжатые JSONL, по файлу на модель. Файлы загружаются '
+        'командой import_dump.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов.')
+        parser.add_argument(
+            '--since',
+            help=(
+                'Выгрузить только посты и комментарии, созданные с этой '
+                'даты или момента, например 2022-01-22T16:00. Остальные '
+                'модели выгружаются целиком, чтобы ссылки на них '
+                'находились.'
+            ),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Количество строк, читаемых из базы за раз.',
+        )
+        parser.add_argument(
+            '--include-credentials',
+            action='store_true',
+            help=(
+                'Выгрузить также пароли, права, email и время входа '
+                'пользователей. Без флага выгружаются только имя, '
+                'фамилия, username и дата регистрации.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_since(options['since'])
+            except ValueError:
+                raise CommandError(
+                    f'Некорректная дата: {options["since"]}'
+                )
+        os.makedirs(options['directory'], exist_ok=True)
+        started = time.perf_counter()
+        total = 0
+        for model in DUMP_MODELS:
+            name = f'{model_label(model)}.jsonl.gz'
+            path = os.path.join(options['directory'], name)
+            # Прерванная выгрузка не оставляет обрезанный файл.
+            temporary = os.path.join(options['directory'], f'.{name}')
+            with open_dump(temporary, 'wt') as stream:
+                count = write_objects(
+                    dump_objects(
+                        model,
+                        since,
+                        options['chunk_size'],
+                        options['include_credentials'],
+                    ),
+                    stream,
+                )
+            os.replace(temporary, path)
+            total += count
+            self.stdout.write(
+                f'{model_label(model)}: {count}, '
+                f'{os.path.getsize(path) / 1024:.0f} КБ'
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено объектов: {total} за {elapsed:.2f} с, '
+            f'{total / elapsed:.0f} в секунду'
+        ))
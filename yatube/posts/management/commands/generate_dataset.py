@@ -0,0 +1,265 @@
+import datetime as dt
+import io
+import itertools
+import random
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core.uploads import file_hash, image_dimensions
+from posts.dumps import (DUMP_MODELS, DumpImporter, model_label, open_dump,
+                         write_objects)
+from posts.models import Post
+
+SYLLABLES = ('ко', 'ра', 'ми', 'ту', 'ле', 'са', 'но', 'пи', 'ве', 'да')
+IMAGE_SIZE = (960, 640)
+
+
+def zipf_weights(count, exponent, rng):
+    """Возвращает накопленные веса закона Ципфа в случайном порядке.
+
+    Args:
+        count (int): количество объектов.
+        exponent (float): показатель, чем больше - тем сильнее перекос.
+        rng (Random): генератор случайных чисел.
+
+    Returns:
+        list: накопленные веса для Random.choices(cum_weights=...).
+    """
+
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует пользователей, профили, группы, посты, комментарии и '
+        'подписки для нагрузочного тестирования. Популярность авторов '
+        'подчиняется закону Ципфа, одно зерно дает одни и те же данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000, help='Пользователей.'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=20, help='Групп.'
+        )
+        parser.add_argument(
+            '--posts', type=int, default=100000, help='Постов.'
+        )
+        parser.add_argument(
+            '--comments', type=int, default=50000, help='Комментариев.'
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20000,
+            help='Подписок, повторы и подписки на себя отбрасываются.',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель закона Ципфа для популярности авторов.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Посты распределяются по этому числу последних дней.',
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0,
+            help='Доля постов с картинками, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--image-pool',
+            type=int,
+            default=16,
+            help='Количество разных картинок, посты используют их повторно.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Префикс имен пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Зерно генератора данных.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество объектов модели в одной транзакции.',
+        )
+        parser.add_argument(
+            '--output',
+            help=(
+                'Записать данные в JSONL (.gz - сжатый) для import_dump '
+                'вместо загрузки в базу.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or not 0 <= options['images'] <= 1:
+            raise CommandError(
+                'Нужен хотя бы один пользователь, доля картинок - от 0 до 1.'
+            )
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.end = timezone.now()
+        self.start = self.end - dt.timedelta(days=options['days'])
+        self.authors = zipf_weights(
+            options['users'], options['zipf'], self.rng
+        )
+        self.vocabulary = [
+            ''.join(syllables)
+            for syllables in itertools.product(SYLLABLES, repeat=3)
+        ]
+        self.rng.shuffle(self.vocabulary)
+        self.words = zipf_weights(len(self.vocabulary), 1, self.rng)
+        self.images = self.make_images()
+        objects = itertools.chain(
+            self.users(),
+            self.groups(),
+            self.profiles(),
+            self.posts(),
+            self.comments(),
+            self.follows(),
+        )
+        started = time.perf_counter()
+        if options['output']:
+            with open_dump(options['output'], 'wt') as stream:
+                total = write_objects(objects, stream)
+        else:
+            importer = DumpImporter(options['batch_size'])
+            importer.add_objects(objects)
+            importer.finish()
+            for model in DUMP_MODELS:
+                label = model_label(model)
+                self.stdout.write(f'{label}: {importer.created[label]}')
+            total = sum(importer.created.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано объектов: {total} за {elapsed:.1f} с, '
+            f'{total / elapsed:.0f} в секунду'
+        ))
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(
+            self.vocabulary,
+            cum_weights=self.words,
+            k=self.rng.randint(low, high),
+        )).capitalize()
+
+    def author(self):
+        return self.rng.choices(
+            range(1, self.options['users'] + 1), cum_weights=self.authors
+        )[0]
+
+    def post_created(self, index):
+        return self.start + (self.end - self.start) * (
+            index / self.options['posts']
+        )
+
+    def make_images(self):
+        # Картинки сохраняются в хранилище один раз и делятся постами.
+        if not self.options['images']:
+            return []
+        rng = random.Random(self.options['seed'])
+        images = []
+        for number in range(self.options['image_pool']):
+            image = Image.new('RGB', IMAGE_SIZE, tuple(
+                rng.randrange(256) for _ in range(3)
+            ))
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                x, y = rng.randrange(IMAGE_SIZE[0]), rng.randrange(
+                    IMAGE_SIZE[1]
+                )
+                draw.ellipse(
+                    (x, y, x + rng.randint(40, 400), y + rng.randint(40, 400)),
+                    fill=tuple(rng.randrange(256) for _ in range(3)),
+                )
+            data = io.BytesIO()
+            image.save(data, 'JPEG', quality=85)
+            post = Post()
+            post.image.save(
+                f'{self.options["prefix"]}-{number}.jpg',
+                ContentFile(data.getvalue()),
+                save=False,
+            )
+            width, height = image_dimensions(post.image)
+            images.append({
+                'image': post.image.name,
+                'image_width': width,
+                'image_height': height,
+                'image_hash': file_hash(post.image),
+            })
+        return images
+
+    def users(self):
+        for pk in range(1, self.options['users'] + 1):
+            yield {'model': 'auth.user', 'pk': pk, 'fields': {
+                'username': f'{self.options["prefix"]}-{pk}',
+                'first_name': self.text(1, 1),
+                'date_joined': self.start,
+            }}
+
+    def groups(self):
+        for pk in range(1, self.options['groups'] + 1):
+            yield {'model': 'posts.group', 'pk': pk, 'fields': {
+                'title': self.text(1, 3),
+                'slug': f'{self.options["prefix"]}-{pk}',
+                'description': self.text(5, 20),
+            }}
+
+    def profiles(self):
+        for pk in range(1, self.options['users'] + 1):
+            yield {'model': 'users.userprofile', 'pk': pk, 'fields': {
+                'user': pk, 'about': self.text(0, 30),
+            }}
+
+    def posts(self):
+        # Даты постов растут вместе с id, как при обычной публикации.
+        groups = self.options['groups']
+        for index in range(self.options['posts']):
+            fields = {
+                'created': self.post_created(index),
+                'text': self.text(5, 60),
+                'author': self.author(),
+                'group': None,
+            }
+            if groups and self.rng.random() < 0.5:
+                fields['group'] = self.rng.randint(1, groups)
+            if self.images and self.rng.random() < self.options['images']:
+                fields.update(self.rng.choice(self.images))
+            yield {'model': 'posts.post', 'pk': index + 1, 'fields': fields}
+
+    def comments(self):
+        if not self.options['posts']:
+            return
+        for pk in range(1, self.options['comments'] + 1):
+            post = self.rng.randrange(self.options['posts'])
+            posted = self.post_created(post + 1)
+            yield {'model': 'posts.comment', 'pk': pk, 'fields': {
+                'created': posted + (self.end - posted) * self.rng.random(),
+                'post': post + 1,
+                'author': self.rng.randint(1, self.options['users']),
+                'text': self.text(1, 20),
+            }}
+
+    def follows(self):
+        # Подписываются на популярных авторов чаще.
+        for pk in range(1, self.options['follows'] + 1):
+            yield {'model': 'posts.follow', 'pk': pk, 'fields': {
+                'user': self.rng.randint(1, self.options['users']),
+                'author': self.author(),
+            }}
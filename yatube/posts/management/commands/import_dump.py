@@ -0,0 +1,77 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.dumps import DUMP_MODELS, DumpImporter, model_label, open_dump
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает дампы JSON или JSONL (.gz - сжатые) с '
+        'пользователями, профилями, группами, постами, комментариями и '
+        'подписками. Объекты получают новые id, остальные модели '
+        'пропускаются. Пачка блокирует таблицу на запись только на время '
+        'своей транзакции, сайт можно не останавливать.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы дампа.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество объектов модели в одной транзакции.',
+        )
+        parser.add_argument(
+            '--include-credentials',
+            action='store_true',
+            help=(
+                'Загрузить также пароли, права, email и время входа '
+                'пользователей. Без флага загружаются только имя, '
+                'фамилия, username и дата регистрации.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        progress = None
+        if options['verbosity'] > 1:
+            progress = self.report_progress
+        importer = DumpImporter(
+            options['batch_size'], progress, options['include_credentials']
+        )
+        started = time.perf_counter()
+        try:
+            for path in options['paths']:
+                try:
+                    with open_dump(path) as stream:
+                        importer.load(stream)
+                except (OSError, json.JSONDecodeError) as error:
+                    raise CommandError(
+                        f'{path}: {error}. Объекты, прочитанные до ошибки, '
+                        f'сохранены.'
+                    )
+        finally:
+            # Сохраненные пачки уже в базе: им нужны профили, счетчики,
+            # поиск и ленты, даже если следующий файл не прочитался.
+            importer.finish()
+        elapsed = time.perf_counter() - started
+        for model in DUMP_MODELS:
+            label = model_label(model)
+            self.stdout.write(
+                f'{label}: создано {importer.created[label]}, '
+                f'пропущено {importer.skipped.pop(label, 0)}'
+            )
+        if importer.skipped:
+            self.stdout.write('Не загружаются: ' + ', '.join(
+                f'{label} ({count})'
+                for label, count in sorted(importer.skipped.items())
+            ))
+        total = sum(importer.created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано объектов: {total} за {elapsed:.2f} с, '
+            f'{total / elapsed:.0f} в секунду'
+        ))
+
+    def report_progress(self, label, count):
+        self.stdout.write(f'{label}: сохранено {count}')
@@ -0,0 +1,97 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import User
+
+PREFIX = 'loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает создание постов параллельными авторами и выводит '
+        'пропускную способность записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Количество параллельных авторов.',
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=50,
+            help='Количество постов каждого автора.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не удалять созданных пользователей и посты.',
+        )
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.get_or_create(username=f'{PREFIX}-{i}')[0]
+            for i in range(options['workers'])
+        ]
+        self.stdout.write(
+            f'База: {connection.vendor}, авторов: {len(users)}, '
+            f'постов у каждого: {options["posts"]}'
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            results = list(executor.map(
+                lambda user: self.post_as(user, options['posts']), users
+            ))
+        elapsed = time.perf_counter() - started
+        timings = [timing for worker in results for timing in worker[0]]
+        errors = [error for worker in results for error in worker[1]]
+        self.stdout.write(
+            f'Создано постов: {len(timings)} за {elapsed:.2f} с, '
+            f'{len(timings) / elapsed:.1f} в секунду'
+        )
+        if timings:
+            timings.sort()
+            self.stdout.write(
+                f'Время запроса: медиана '
+                f'{statistics.median(timings) * 1000:.1f} мс, 95% '
+                f'{timings[int(len(timings) * 0.95)] * 1000:.1f} мс, '
+                f'максимум {timings[-1] * 1000:.1f} мс'
+            )
+        if errors:
+            self.stdout.write(self.style.WARNING(f'Ошибок: {len(errors)}'))
+            for error in sorted(set(errors)):
+                self.stdout.write(f'  {error}')
+        if not options['keep']:
+            User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+
+    def post_as(self, user, count):
+        # У каждого потока свое соединение с базой, его нужно закрыть.
+        timings, errors = [], []
+        try:
+            # Адрес вне INTERNAL_IPS, чтобы не замерять debug toolbar.
+            client = Client(SERVER_NAME='localhost', REMOTE_ADDR='192.0.2.1')
+            client.force_login(user)
+            url = reverse('posts:post_create')
+            for i in range(count):
+                started = time.perf_counter()
+                try:
+                    response = client.post(url, {'text': f'{PREFIX} {i}'})
+                except Exception as error:
+                    errors.append(f'{type(error).__name__}: {error}')
+                    continue
+                if response.status_code != 302:
+                    errors.append(f'HTTP {response.status_code}')
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return timings, errors
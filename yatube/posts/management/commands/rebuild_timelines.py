@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import AuthorStats, User
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Имена пользователей, по умолчанию все подписчики.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.FOLLOW_FEED_TIMELINE:
+            raise CommandError('Лента подписок выключена.')
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        count = 0
+        for user in users.iterator():
+            rebuild_timeline(user)
+            count += 1
+        if not options['usernames']:
+            # Собранные заново ленты содержат посты всех авторов.
+            AuthorStats.objects.filter(timelines_stale=True).update(
+                timelines_stale=False
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Собраны ленты {count} пользователей.'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import recount_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев и подписок авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Имена пользователей, по умолчанию все.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество пользователей в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        count = recount_author_stats(users, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счетчики {count} пользователей.'
+        ))
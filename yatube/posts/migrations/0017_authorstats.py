@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counters = {
+        'posts_count': ('posts', 'Post', 'author_id'),
+        'comments_count': ('posts', 'Comment', 'author_id'),
+        'followers_count': ('posts', 'Follow', 'author_id'),
+        'following_count': ('posts', 'Follow', 'user_id'),
+    }
+    counts = {
+        field: dict(
+            apps.get_model(app_label, model_name).objects
+            .order_by()
+            .values_list(column)
+            .annotate(count=models.Count('pk'))
+        )
+        for field, (app_label, model_name, column) in counters.items()
+    }
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id, **{
+            field: counts[field].get(user_id, 0) for field in counters
+        })
+        for user_id in User.objects.values_list('pk', flat=True).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0016_auto_20220125_2045'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
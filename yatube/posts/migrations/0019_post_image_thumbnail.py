@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_thumbnail',
+            field=models.CharField(blank=True, editable=False, help_text='Заполняется в фоне после загрузки картинки', max_length=255, verbose_name='Адрес миниатюры'),
+        ),
+    ]
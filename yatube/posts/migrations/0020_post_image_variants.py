@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_image_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, help_text='Ширины и форматы для srcset в JSON, заполняются в фоне', verbose_name='Варианты картинки'),
+        ),
+    ]
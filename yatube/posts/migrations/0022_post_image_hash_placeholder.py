@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 содержимого файла', max_length=64, verbose_name='Хеш картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Размытая миниатюра в data URI, заполняется в фоне', verbose_name='Заглушка картинки'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:43
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+def recount_follow_stats(AuthorStats, Follow, user_ids):
+    # Те же агрегаты, что у posts.stats.recount_author_stats.
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), 500):
+        batch = user_ids[start:start + 500]
+        counts = {
+            field: dict(
+                Follow.objects.filter(**{f'{column}__in': batch})
+                .order_by()
+                .values_list(column)
+                .annotate(count=models.Count('pk'))
+            )
+            for field, column in (
+                ('followers_count', 'author_id'),
+                ('following_count', 'user_id'),
+            )
+        }
+        for user_id in batch:
+            AuthorStats.objects.filter(user_id=user_id).update(**{
+                field: values.get(user_id, 0)
+                for field, values in counts.items()
+            })
+
+
+def delete_invalid_follows(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    affected = set()
+    invalid = Follow.objects.filter(user=models.F('author'))
+    affected.update(invalid.values_list('user_id', flat=True))
+    invalid.delete()
+    duplicates = (
+        Follow.objects
+        .order_by()
+        .values('user', 'author')
+        .annotate(keep=models.Min('pk'), count=models.Count('pk'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        Follow.objects.filter(
+            user=duplicate['user'],
+            author=duplicate['author'],
+        ).exclude(pk=duplicate['keep']).delete()
+        affected.update((duplicate['user'], duplicate['author']))
+    # Удаленные подписки учтены в счетчиках подписчиков и подписок.
+    recount_follow_stats(AuthorStats, Follow, affected)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_invalid_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='follow_not_self'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+SQLITE_TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_post_fts '
+            f'USING fts5(text, {SQLITE_TOKENIZER})'
+        )
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_comment_fts '
+            f'USING fts5(text, post_id UNINDEXED, {SQLITE_TOKENIZER})'
+        )
+        schema_editor.execute(
+            'INSERT INTO posts_post_fts (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        schema_editor.execute(
+            'INSERT INTO posts_comment_fts (rowid, text, post_id) '
+            'SELECT id, text, post_id FROM posts_comment'
+        )
+    elif vendor == 'postgresql':
+        for table in ('posts_post', 'posts_comment'):
+            schema_editor.execute(
+                f'CREATE INDEX {table}_text_tsv ON {table} '
+                f"USING GIN (to_tsvector('russian', text))"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+        schema_editor.execute('DROP TABLE posts_comment_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX posts_post_text_tsv')
+        schema_editor.execute('DROP INDEX posts_comment_text_tsv')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
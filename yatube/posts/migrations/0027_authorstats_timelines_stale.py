@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='timelines_stale',
+            field=models.BooleanField(default=False, verbose_name='Ленты подписчиков неполные'),
+        ),
+    ]
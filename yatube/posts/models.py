@@ -1,4 +1,5 @@
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 from django.db import models
 from django.contrib.auth import get_user_model
@@ -41,6 +42,12 @@ class Post(CreatedModel):
         author (int): id автора.
         group (int): id группы.
         image (str): картинка.
+        image_width (int): ширина картинки.
+        image_height (int): высота картинки.
+        image_hash (str): SHA-256 содержимого картинки.
+        image_placeholder (str): размытая заглушка картинки в data URI.
+        image_thumbnail (str): адрес готовой миниатюры картинки.
+        image_variants (str): варианты картинки для srcset в JSON.
     """
 
     text = models.TextField(
@@ -66,13 +73,63 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text='Изображение которое имеет отношение к посту'
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_hash = models.CharField(
+        'Хеш картинки',
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text='SHA-256 содержимого файла'
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Размытая миниатюра в data URI, заполняется в фоне'
+    )
+    image_thumbnail = models.CharField(
+        'Адрес миниатюры',
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Заполняется в фоне после загрузки картинки'
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='Ширины и форматы для srcset в JSON, заполняются в фоне'
+    )
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(
+                fields=('author', 'created'),
+                name='post_author_created_idx',
+            ),
+            models.Index(
+                fields=('group', 'created'),
+                name='post_group_created_idx',
+            ),
+        )
 
     def __str__(self):
         """Возвращает строковое представление модели"""
@@ -112,6 +169,12 @@ class Comment(CreatedModel):
     class Meta(CreatedModel.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
 
 
 class Follow(models.Model):
@@ -138,10 +201,30 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self',
+            ),
+        )
+        # Индекс (user, author) создается уникальным ограничением.
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx',
+            ),
+        )
 
     def clean(self):
         """Проверка создаваемого объекта.
 
+        Те же условия проверяются ограничениями базы, здесь они дают
+        понятные ошибки в формах.
+
         Raises:
             ValidationError: ошибка при попытке подписки на самого себя.
         Raises:
@@ -149,15 +232,100 @@ class Follow(models.Model):
             одного раза.
         """
 
-        if self.user == self.author:
+        if self.user_id == self.author_id:
             raise ValidationError('Вы не можете подписаться на самого себя')
-        if self.author.following.count() > 0:
+        if Follow.objects.filter(
+            user_id=self.user_id,
+            author_id=self.author_id,
+        ).exclude(pk=self.pk).exists():
             raise ValidationError(
                 'Нельзя подписаться на автора более одного раза'
             )
 
-    def save(self, *args, **kwargs):
-        """Вызывает метод full_clean() класса для запуска всех проверок."""
 
-        self.full_clean()
-        return super().save(*args, **kwargs)
+class AuthorStats(models.Model):
+    """Модель для счетчиков автора.
+
+    Денормализованные количества, которые иначе считались бы отдельным
+    COUNT на каждый показ профиля и поста. Поддерживаются сигналами
+    Post, Comment и Follow, пересчитываются командой recount_author_stats.
+
+    Attributes:
+        user (int): id пользователя.
+        posts_count (int): количество постов.
+        comments_count (int): количество комментариев.
+        followers_count (int): количество подписчиков.
+        following_count (int): количество подписок.
+        timelines_stale (bool): посты автора публиковались, пока подписчиков
+            было больше settings.FOLLOW_FEED_FANOUT_LIMIT, и не попали в
+            материализованные ленты.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    timelines_stale = models.BooleanField(
+        'Ленты подписчиков неполные', default=False
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        """Возвращает строковое представление модели"""
+
+        return f'{self.user_id} {self.posts_count} {self.comments_count}'
+
+
+class TimelineEntry(models.Model):
+    """Модель для записи в ленте подписок пользователя.
+
+    Материализованная лента: пост попадает в ленты подписчиков автора при
+    публикации. Дата создания поста скопирована, чтобы сортировать ленту
+    без соединения с постами.
+
+    Attributes:
+        user (int): id владельца ленты.
+        post (int): id поста.
+        created (datetime): дата создания поста.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Владелец ленты',
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        ordering = ('-created',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created'),
+                name='timeline_user_created_idx',
+            ),
+        )
@@ -0,0 +1,217 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+POST_INDEX = 'posts_post_fts'
+COMMENT_INDEX = 'posts_comment_fts'
+# Конфигурация полнотекстового поиска PostgreSQL, в ней же построены
+# GIN-индексы миграции 0026_search_index.
+SEARCH_CONFIG = 'russian'
+# Совпадение в комментарии весит меньше совпадения в тексте поста.
+COMMENT_WEIGHT = 0.5
+
+
+def is_sqlite():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Переводит запрос пользователя в выражение MATCH для FTS5.
+
+    Синтаксис FTS5 из запроса не пропускается: каждое слово берется в
+    кавычки и ищется по префиксу, что отчасти заменяет отсутствующий в
+    SQLite стемминг русского языка.
+
+    Args:
+        query (str): запрос пользователя.
+
+    Returns:
+        str: выражение MATCH, None - в запросе нет слов.
+    """
+
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post):
+    """Добавляет или обновляет текст поста в индексе SQLite.
+
+    Args:
+        post (Post): пост.
+    """
+
+    if not is_sqlite():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {POST_INDEX} (rowid, text) '
+            f'VALUES (%s, %s)',
+            [post.pk, post.text]
+        )
+
+
+def unindex_post(post_id):
+    """Убирает пост из индекса SQLite.
+
+    Args:
+        post_id (int): id поста.
+    """
+
+    if is_sqlite():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {POST_INDEX} WHERE rowid = %s', [post_id]
+            )
+
+
+def index_comment(comment):
+    """Добавляет комментарий в индекс SQLite.
+
+    Args:
+        comment (Comment): комментарий.
+    """
+
+    if not is_sqlite():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {COMMENT_INDEX} (rowid, text, post_id) '
+            f'VALUES (%s, %s, %s)',
+            [comment.pk, comment.text, comment.post_id]
+        )
+
+
+def unindex_comment(comment_id):
+    """Убирает комментарий из индекса SQLite.
+
+    Args:
+        comment_id (int): id комментария.
+    """
+
+    if is_sqlite():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {COMMENT_INDEX} WHERE rowid = %s', [comment_id]
+            )
+
+
+def rebuild_index():
+    """Заполняет индекс SQLite заново по всем постам и комментариям.
+
+    Нужен после bulk_create и правок в обход сигналов. GIN-индексы
+    PostgreSQL строятся по самим таблицам и в перестройке не нуждаются.
+    """
+
+    if not is_sqlite():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {POST_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {POST_INDEX} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        cursor.execute(f'DELETE FROM {COMMENT_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {COMMENT_INDEX} (rowid, text, post_id) '
+            f'SELECT id, text, post_id FROM {Comment._meta.db_table}'
+        )
+
+
+def _matches(model, query):
+    # Возвращает SQL, выбирающий id и ранг (меньше - лучше) совпадений.
+    if is_sqlite():
+        table = POST_INDEX if model is Post else COMMENT_INDEX
+        column = 'rowid' if model is Post else 'post_id'
+        return (
+            f'SELECT {column} AS post_id, bm25({table}) AS rank, '
+            f'rowid AS id FROM {table} WHERE {table} MATCH %s',
+            [match_expression(query)],
+        )
+    column = 'id' if model is Post else 'post_id'
+    vector = f"to_tsvector('{SEARCH_CONFIG}', text)"
+    tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+    return (
+        f'SELECT {column} AS post_id, -ts_rank({vector}, {tsquery}) AS rank, '
+        f'id FROM {model._meta.db_table} WHERE {vector} @@ {tsquery}',
+        [query, query],
+    )
+
+
+def matching_ids(model, query):
+    """Возвращает подзапрос с id постов или комментариев, совпавших с
+    запросом.
+
+    Args:
+        model (Model): Post или Comment.
+        query (str): запрос пользователя.
+
+    Returns:
+        RawSQL: подзапрос для фильтра pk__in, None - в запросе нет слов.
+    """
+
+    if match_expression(query) is None:
+        return None
+    sql, params = _matches(model, query)
+    return RawSQL(f'SELECT id FROM ({sql}) AS matches', params)
+
+
+class SearchResults:
+    """Посты, совпавшие с запросом текстом или комментариями, от
+    лучшего совпадения к худшему.
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator.
+
+    Attributes:
+        query (str): запрос пользователя.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        if match_expression(query) is None:
+            self.sql, self.params = None, []
+            return
+        post_sql, post_params = _matches(Post, query)
+        comment_sql, comment_params = _matches(Comment, query)
+        self.sql = (
+            f'SELECT post_id, MIN(rank) AS rank FROM ('
+            f'SELECT post_id, rank FROM ({post_sql}) AS posts '
+            f'UNION ALL '
+            f'SELECT post_id, rank * {COMMENT_WEIGHT} '
+            f'FROM ({comment_sql}) AS comments'
+            f') AS matches GROUP BY post_id'
+        )
+        self.params = post_params + comment_params
+
+    def count(self):
+        if self.sql is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM ({self.sql}) AS results', self.params
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if (not isinstance(index, slice) or index.step
+                or index.stop is None):
+            raise TypeError('SearchResults поддерживает только срезы.')
+        start = index.start or 0
+        if self.sql is None or index.stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM ({self.sql}) AS results '
+                f'ORDER BY rank, post_id DESC LIMIT %s OFFSET %s',
+                self.params + [index.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,253 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.cache import invalidate_fragment_cache, invalidate_page_cache
+from core.uploads import file_changed, file_hash, image_dimensions
+
+from .feeds import (AUTHOR_FEED, AUTHOR_POSTS_PAGE, POST_PAGE,
+                    invalidate_author_pages, invalidate_follow_feed,
+                    invalidate_pages, invalidate_post_feeds,
+                    invalidate_post_pages, remember_post_author)
+from .follows import follow_removed
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .search import index_comment, index_post, unindex_comment, unindex_post
+from .stats import change_author_stats
+from .thumbnails import schedule_post_thumbnail
+
+# Поля пользователя, которые видны в карточках постов и на страницах.
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw, **kwargs):
+    """Заводит пустые счетчики новому пользователю."""
+
+    if created and not raw:
+        AuthorStats.objects.create(user=instance)
+
+
+@receiver(post_init, sender=User)
+def remember_user_names(sender, instance, **kwargs):
+    """Запоминает имя пользователя, чтобы заметить его смену.
+
+    Отложенные поля считаются неизменными, как у поста.
+    """
+
+    loaded = instance.__dict__
+    instance._initial_names = {
+        name: loaded.get(name, DEFERRED) for name in USER_DISPLAY_FIELDS
+    }
+
+
+@receiver(post_save, sender=User)
+def user_names_changed(sender, instance, created, raw, **kwargs):
+    """Сбрасывает кеш лент, фрагментов и страниц автора при смене его
+    имени."""
+
+    initial = instance._initial_names
+    instance._initial_names = {
+        name: getattr(instance, name) for name in USER_DISPLAY_FIELDS
+    }
+    if created or raw:
+        return
+    changed = any(
+        value is not DEFERRED and value != getattr(instance, name)
+        for name, value in initial.items()
+    )
+    if changed:
+        usernames = [instance.username]
+        if initial['username'] is not DEFERRED:
+            usernames.append(initial['username'])
+        invalidate_author_pages(instance.pk, usernames)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запоминает исходные группу, текст и картинку поста, чтобы заметить
+    их смену.
+
+    Отложенные поля (only, defer) не читаются: их загрузка снова вызвала
+    бы post_init. Такие поля считаются неизменными.
+    """
+
+    loaded = instance.__dict__
+    instance._initial_group_id = loaded.get('group_id', DEFERRED)
+    instance._initial_text = loaded.get('text', DEFERRED)
+    instance._initial_image = (
+        instance.image.name if 'image' in loaded else DEFERRED
+    )
+
+
+def initial_value(instance, name, current):
+    # Возвращает запомненное значение поля, для отложенного - текущее.
+    value = getattr(instance, f'_initial_{name}')
+    return current() if value is DEFERRED else value
+
+
+@receiver(pre_save, sender=Post)
+def post_image_changed(sender, instance, raw, **kwargs):
+    """Запоминает размеры и хеш новой картинки поста и забывает миниатюру
+    прежней."""
+
+    initial_image = initial_value(
+        instance, 'image', lambda: instance.image.name
+    )
+    if not raw and file_changed(instance.image, initial_image):
+        instance.image_width, instance.image_height = image_dimensions(
+            instance.image
+        )
+        instance.image_hash = file_hash(instance.image)
+        instance.image_placeholder = ''
+        instance.image_thumbnail = ''
+        instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Сбрасывает кеш лент и страниц с постом. Количества постов в лентах
+    сбрасываются только при добавлении поста или переносе его в другую
+    группу."""
+
+    if created:
+        change_author_stats(instance.author_id, posts_count=1)
+        remember_post_author(instance)
+    initial_group_id = initial_value(
+        instance, 'group_id', lambda: instance.group_id
+    )
+    group_ids = (instance.group_id, initial_group_id)
+    invalidate_post_feeds(
+        instance.author_id,
+        group_ids,
+        counts=created or instance.group_id != initial_group_id
+    )
+    invalidate_post_pages(instance, group_ids, author_stats=created)
+    instance._initial_group_id = instance.group_id
+    instance._initial_image = instance.image.name
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw, **kwargs):
+    """Ставит в очередь миниатюру новой картинки поста."""
+
+    if not raw and instance.image and not instance.image_thumbnail:
+        schedule_post_thumbnail(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Сбрасывает кеш лент и страниц с постом при его удалении."""
+
+    change_author_stats(instance.author_id, posts_count=-1)
+    group_ids = (
+        instance.group_id,
+        initial_value(instance, 'group_id', lambda: instance.group_id),
+    )
+    invalidate_post_feeds(instance.author_id, group_ids)
+    invalidate_post_pages(instance, group_ids, author_stats=True)
+
+
+@receiver(post_save, sender=Post)
+def post_search_saved(sender, instance, created, **kwargs):
+    """Обновляет текст поста в поисковом индексе."""
+
+    initial_text = initial_value(instance, 'text', lambda: instance.text)
+    if created or instance.text != initial_text:
+        index_post(instance)
+    instance._initial_text = instance.text
+
+
+@receiver(post_delete, sender=Post)
+def post_search_deleted(sender, instance, **kwargs):
+    """Убирает пост из поискового индекса."""
+
+    unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    """Сбрасывает кеш ленты подписок подписчика."""
+
+    invalidate_follow_feed(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Увеличивает счетчики подписок и подписчиков."""
+
+    if created:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчики и сбрасывает кеш при удалении подписки через
+    модель, например в админке. Отписка на сайте обходится без сигнала
+    (см. posts.follows.unfollow)."""
+
+    follow_removed(instance.user, instance.author)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """Увеличивает счетчик комментариев автора."""
+
+    if created:
+        change_author_stats(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчик комментариев автора."""
+
+    change_author_stats(instance.author_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_search_saved(sender, instance, **kwargs):
+    """Добавляет комментарий в поисковый индекс."""
+
+    index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_search_deleted(sender, instance, **kwargs):
+    """Убирает комментарий из поискового индекса."""
+
+    unindex_comment(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    """Сбрасывает фрагменты всех лент и все страницы: название группы есть
+    в карточках постов."""
+
+    invalidate_fragment_cache()
+    invalidate_page_cache()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, **kwargs):
+    """Сбрасывает страницы поста и профиля автора комментария."""
+
+    invalidate_pages(
+        (POST_PAGE, instance.post_id),
+        (AUTHOR_FEED, instance.author.username),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_pages_changed(sender, instance, **kwargs):
+    """Сбрасывает страницы со счетчиками подписок: профили обоих
+    пользователей и страницы их постов."""
+
+    invalidate_pages(
+        (AUTHOR_FEED, instance.author.username),
+        (AUTHOR_FEED, instance.user.username),
+        (AUTHOR_POSTS_PAGE, instance.author_id),
+        (AUTHOR_POSTS_PAGE, instance.user_id),
+    )
@@ -0,0 +1,76 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'comments_count': (Comment, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def change_author_stats(user_id, **deltas):
+    """Изменяет счетчики автора на заданные величины.
+
+    Обновление выполняется одним UPDATE без чтения строки. Если строки со
+    счетчиками еще нет, при увеличении она создается пересчетом с нуля, а
+    уменьшение пропускается: так ведут себя каскадные удаления вместе с
+    пользователем. Счетчики не опускаются ниже нуля: после bulk_create и
+    удалений в обход сигналов они могут отставать от данных.
+
+    Args:
+        user_id (int): id пользователя.
+        **deltas: изменения счетчиков, например posts_count=1.
+    """
+
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        recount_author_stats(User.objects.filter(pk=user_id))
+
+
+def recount_author_stats(users=None, batch_size=1000):
+    """Пересчитывает счетчики авторов по данным в базе.
+
+    Args:
+        users (QuerySet): пользователи, по умолчанию все.
+        batch_size (int): количество пользователей в одной пачке.
+
+    Returns:
+        int: количество пересчитанных пользователей.
+    """
+
+    if users is None:
+        users = User.objects.all()
+    # Пользователи выбираются пачками по возрастанию id, без загрузки
+    # всех id в память.
+    users = users.order_by('pk').values_list('pk', flat=True)
+    count = 0
+    last_id = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return count
+        last_id = batch[-1]
+        count += len(batch)
+        counts = {
+            field: dict(
+                model.objects.filter(**{f'{column}__in': batch})
+                .order_by()
+                .values_list(column)
+                .annotate(count=Count('pk'))
+            )
+            for field, (model, column) in COUNTERS.items()
+        }
+        stats = [
+            AuthorStats(user_id=user_id, **{
+                field: counts[field].get(user_id, 0) for field in COUNTERS
+            })
+            for user_id in batch
+        ]
+        AuthorStats.objects.bulk_create(stats, ignore_conflicts=True)
+        AuthorStats.objects.bulk_update(stats, list(COUNTERS))
@@ -0,0 +1,44 @@
+from django import template
+
+from core.templatetags.responsive_images import responsive_image
+
+from posts.thumbnails import POST_THUMBNAIL_GEOMETRY
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(post):
+    """Возвращает адрес миниатюры картинки поста.
+
+    Пока миниатюра строится в фоне (см. posts.thumbnails), возвращает
+    адрес исходной картинки.
+    """
+
+    return post.image_thumbnail or post.image.url
+
+
+@register.simple_tag
+def post_image(post, sizes='100vw', css_class=''):
+    """Выводит картинку поста с вариантами, размерами и заглушкой.
+
+    Размеры берутся из базы, поэтому показ картинки не обращается к
+    хранилищу файлов.
+
+    Args:
+        post (Post): пост с картинкой.
+        sizes (str): атрибут sizes.
+        css_class (str): CSS класс <img>.
+
+    Returns:
+        str: HTML разметка.
+    """
+
+    if post.image_thumbnail:
+        width, height = map(int, POST_THUMBNAIL_GEOMETRY.split('x'))
+    else:
+        width, height = post.image_width, post.image_height
+    return responsive_image(
+        post.image_variants, thumbnail_url(post), sizes, css_class,
+        width=width, height=height, placeholder=post.image_placeholder,
+    )
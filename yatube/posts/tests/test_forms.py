@@ -1,3 +1,5 @@
+import hashlib
+import io
 import shutil
 import tempfile
 
@@ -6,6 +8,7 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Post, Group, User, Comment
 
@@ -126,7 +129,9 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertEqual(form_data['text'], post.text)
         self.assertEqual(form_data['group'], post.group_id)
-        self.assertIn(image.name, post.image.name)
+        self.assertEqual(post.image.name, Post.image.field.storage.hashed_name(
+            'posts/another_small.gif', hashlib.sha256(BYTE_STRING).hexdigest()
+        ))
         self.assertEqual(self.post.author, post.author)
 
     def test_post_edit_and_create_pages_show_correct_form(self):
@@ -225,3 +230,79 @@ class PostCreateFormTests(TestCase):
                 self.assertEqual(post.group_id, self.post.group_id)
                 self.assertEqual(post.image, self.post.image)
                 self.assertEqual(post.author, self.post.author)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, content, name='image.png'):
+        return self.author.post(POST_CREATE_URL, {
+            'text': 'text with image',
+            'image': SimpleUploadedFile(name, content, 'image/png'),
+        })
+
+    def png(self, width, height):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height)).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_dimensions_recorded(self):
+        """Размеры картинки сохраняются в пост при загрузке."""
+        content = self.png(30, 20)
+        self.upload(content)
+        post = Post.objects.get(text='text with image')
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+        self.assertEqual(post.image_hash, hashlib.sha256(content).hexdigest())
+
+    @override_settings(IMAGE_UPLOAD_MAX_DIMENSION=15)
+    def test_huge_image_downsampled(self):
+        """Слишком большая картинка уменьшается при загрузке."""
+        self.upload(self.png(30, 20))
+        post = Post.objects.get(text='text with image')
+        self.assertEqual((post.image_width, post.image_height), (15, 10))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (15, 10))
+
+    @override_settings(IMAGE_UPLOAD_MAX_DIMENSION=15)
+    def test_huge_image_in_read_only_format(self):
+        """Большая картинка в формате, который Pillow не пишет,
+        перекодируется в PNG."""
+        rows = ''.join(f'"{"ab" * 15}",\n' for _ in range(2))
+        xpm = (
+            '/* XPM */\nstatic char *image[] = {\n"30 2 2 1",\n'
+            f'"a c #000000",\n"b c #FFFFFF",\n{rows}}};\n'
+        )
+        response = self.upload(xpm.encode(), 'image.xpm')
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text='text with image')
+        self.assertTrue(post.image.name.endswith('.png'))
+        with Image.open(post.image) as image:
+            self.assertEqual((image.format, image.size), ('PNG', (15, 1)))
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100)
+    def test_oversize_file_rejected(self):
+        """Файл больше лимита отклоняется."""
+        response = self.upload(self.png(300, 300) + b'\0' * 100)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 100\xa0байт.'
+        )
+        self.assertFalse(Post.objects.filter(text='text with image'))
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_decompression_bomb_rejected(self):
+        """Картинка с лишними пикселями отклоняется по заголовку."""
+        response = self.upload(self.png(20, 20))
+        self.assertFormError(
+            response, 'form', 'image', 'Изображение больше 100 пикселей.'
+        )
@@ -1,6 +1,65 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-from ..models import Follow, Comment, Group, Post, User
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Max
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from users.models import UserProfile
+
+from ..dumps import DumpImporter, open_dump, read_objects
+from ..models import AuthorStats, Follow, Comment, Group, Post, User
+from ..search import SearchResults
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+DUMP = [
+    {'model': 'posts.post', 'pk': 1, 'fields': {
+        'created': '2022-01-22T16:00:10.122Z',
+        'text': 'Пост из дампа',
+        'author': 2,
+        'group': 1,
+        'image': '',
+    }},
+    {'model': 'posts.group', 'pk': 1, 'fields': {
+        'title': 'Группа', 'slug': 'dump-group', 'description': 'Группа'
+    }},
+    {'model': 'contenttypes.contenttype', 'pk': 1, 'fields': {
+        'app_label': 'posts', 'model': 'post'
+    }},
+    {'model': 'auth.user', 'pk': 1, 'fields': {
+        'username': 'existing', 'password': '!'
+    }},
+    {'model': 'auth.user', 'pk': 2, 'fields': {
+        'username': 'leo',
+        'password': 'md5$salt$2d5b95bbb2fa1cfef2ea95a13ff8c7ef',
+        'is_superuser': True,
+        'is_staff': True,
+        'first_name': 'Лев',
+        'date_joined': '2019-10-05T21:37:36.487Z',
+    }},
+    {'model': 'users.userprofile', 'pk': 1, 'fields': {
+        'user': 2, 'avatar': '', 'about': 'О себе'
+    }},
+    {'model': 'posts.comment', 'pk': 1, 'fields': {
+        'created': '2022-01-22T16:10:00Z',
+        'post': 1,
+        'author': 1,
+        'text': 'Комментарий',
+    }},
+    {'model': 'posts.comment', 'pk': 2, 'fields': {
+        'post': 99, 'author': 1, 'text': 'Пост не найден'
+    }},
+    {'model': 'posts.follow', 'pk': 1, 'fields': {'user': 1, 'author': 2}},
+    {'model': 'posts.follow', 'pk': 2, 'fields': {'user': 2, 'author': 2}},
+]
 
 
 class PostModelTest(TestCase):
@@ -95,3 +154,467 @@ class PostModelTest(TestCase):
                     Post._meta.get_field(field).help_text,
                     expected_value
                 )
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def assertStats(self, user, **expected):
+        stats = AuthorStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_stats_follow_changes(self):
+        """Счетчики следуют за постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.author, text='test text')
+        Comment.objects.create(post=post, author=self.author, text='text')
+        Comment.objects.create(post=post, author=self.follower, text='text')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertStats(
+            self.author,
+            posts_count=1,
+            comments_count=1,
+            followers_count=1,
+            following_count=0,
+        )
+        self.assertStats(self.follower, comments_count=1, following_count=1)
+        follow.delete()
+        post.delete()
+        self.assertStats(
+            self.author,
+            posts_count=0,
+            comments_count=0,
+            followers_count=0,
+        )
+        self.assertStats(self.follower, comments_count=0, following_count=0)
+
+    def test_delete_with_stale_stats(self):
+        """Удаление поста и комментария, не учтенных в счетчиках, не
+        уводит счетчики ниже нуля."""
+        Post.objects.bulk_create([Post(author=self.author, text='test text')])
+        post = Post.objects.get(author=self.author)
+        Comment.objects.bulk_create(
+            [Comment(post=post, author=self.follower, text='text')]
+        )
+        Comment.objects.get().delete()
+        post.delete()
+        self.assertStats(self.author, posts_count=0)
+        self.assertStats(self.follower, comments_count=0)
+
+    def test_recount_command_repairs_stats(self):
+        """Команда recount_author_stats восстанавливает счетчики."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'text {i}') for i in range(3)
+        )
+        AuthorStats.objects.filter(user=self.follower).delete()
+        call_command('recount_author_stats', stdout=StringIO())
+        self.assertStats(self.author, posts_count=3)
+        self.assertStats(self.follower, posts_count=0)
+
+
+class FollowConstraintsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_database_rejects_invalid_follows(self):
+        """База не дает подписаться дважды и на самого себя."""
+        Follow.objects.create(user=self.user, author=self.author)
+        for user, author in [
+            (self.user, self.author),
+            (self.user, self.user),
+        ]:
+            with self.subTest(user=user, author=author):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(user=user, author=author)
+
+    def test_clean_allows_other_followers(self):
+        """Подписку на автора с подписчиками не отклоняет валидация."""
+        another = User.objects.create_user(username='another')
+        Follow.objects.create(user=another, author=self.author)
+        Follow(user=self.user, author=self.author).full_clean()
+
+
+class FollowConstraintsMigrationTest(TransactionTestCase):
+    before = [('posts', '0023_post_image_content_addressed')]
+    after = [('posts', '0024_follow_constraints')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_invalid_follows_removed_from_stats(self):
+        """Миграция удаляет повторные подписки и подписки на себя и
+        пересчитывает счетчики подписок."""
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Follow = apps.get_model('posts', 'Follow')
+        AuthorStats = apps.get_model('posts', 'AuthorStats')
+        user = User.objects.create(username='follower')
+        author = User.objects.create(username='author')
+        for _ in range(3):
+            Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=author, author=author)
+        AuthorStats.objects.create(user=user, following_count=3)
+        AuthorStats.objects.create(
+            user=author, followers_count=4, following_count=1
+        )
+        apps = self.migrate(self.after)
+        AuthorStats = apps.get_model('posts', 'AuthorStats')
+        self.assertEqual(
+            sorted(AuthorStats.objects.values_list(
+                'user__username', 'followers_count', 'following_count'
+            )),
+            [('author', 1, 0), ('follower', 0, 1)],
+        )
+
+
+class BenchmarkFeedIndexesTest(TestCase):
+    def test_benchmark_leaves_no_data(self):
+        """Бенчмарк показывает планы с индексами и откатывает данные."""
+        out = StringIO()
+        call_command(
+            'benchmark_feed_indexes',
+            users=5,
+            posts=50,
+            groups=2,
+            comments=20,
+            follows=2,
+            repeat=1,
+            stdout=out,
+        )
+        self.assertIn('post_author_created_idx', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class ImportDumpTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.existing = User.objects.create_user(username='existing')
+        cls.post = Post.objects.create(author=cls.existing, text='Свой пост')
+        cls.dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir.cleanup()
+        super().tearDownClass()
+
+    def import_dump(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as dump:
+            dump.write(content)
+        out = StringIO()
+        call_command('import_dump', path, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def check_imported(self):
+        leo = User.objects.get(username='leo')
+        self.assertEqual(leo.first_name, 'Лев')
+        self.assertFalse(leo.is_superuser or leo.is_staff)
+        self.assertFalse(leo.has_usable_password())
+        self.assertEqual(leo.userprofile.about, 'О себе')
+        self.assertTrue(
+            UserProfile.objects.filter(user=self.existing).exists()
+        )
+        post = Post.objects.get(text='Пост из дампа')
+        self.assertNotEqual(post.pk, 1)
+        self.assertEqual(post.author, leo)
+        self.assertEqual(post.group.slug, 'dump-group')
+        self.assertEqual(post.created.year, 2022)
+        comment = post.comments.get()
+        self.assertEqual(comment.author, self.existing)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(
+            list(Follow.objects.values_list('user', 'author')),
+            [(self.existing.pk, leo.pk)],
+        )
+        self.assertEqual(leo.stats.posts_count, 1)
+        self.assertEqual(leo.stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.existing).comments_count, 1
+        )
+        self.assertEqual(SearchResults('дампа').count(), 1)
+
+    def test_import_json_array(self):
+        """Дамп-массив загружается с новыми id и переводом ссылок, даже
+        если объект ссылается на описанный ниже."""
+        out = self.import_dump('dump.json', json.dumps(DUMP))
+        self.check_imported()
+        self.assertIn('posts.comment: создано 1, пропущено 1', out)
+        self.assertIn('contenttypes.contenttype (1)', out)
+
+    def test_import_compressed_jsonl(self):
+        """Сжатый JSONL загружается так же, как массив."""
+        self.import_dump(
+            'dump.jsonl.gz', '\n'.join(json.dumps(obj) for obj in DUMP)
+        )
+        self.check_imported()
+
+    def test_truncated_file_keeps_imported_consistent(self):
+        """Если следующий файл обрезан, загруженные раньше объекты
+        получают счетчики и поиск."""
+        paths = []
+        for name, content in [
+            ['first.json', json.dumps(DUMP)],
+            ['truncated.json', json.dumps(DUMP)[:50]],
+        ]:
+            paths.append(os.path.join(self.dir.name, name))
+            with open(paths[-1], 'w', encoding='utf-8') as dump:
+                dump.write(content)
+        with self.assertRaisesMessage(CommandError, 'truncated.json'):
+            call_command('import_dump', *paths, stdout=StringIO())
+        self.check_imported()
+
+    def test_import_credentials(self):
+        """С --include-credentials пароль и права пользователей
+        загружаются."""
+        path = os.path.join(self.dir.name, 'credentials.json')
+        with open(path, 'w', encoding='utf-8') as dump:
+            json.dump(DUMP, dump)
+        call_command(
+            'import_dump', path, include_credentials=True, stdout=StringIO()
+        )
+        leo = User.objects.get(username='leo')
+        self.assertTrue(leo.is_superuser and leo.is_staff)
+        self.assertEqual(leo.password, DUMP[4]['fields']['password'])
+
+    def test_site_writes_between_batches(self):
+        """Пост, созданный сайтом во время загрузки, получает текущую дату
+        и не занимает id следующей пачки."""
+        def objects():
+            yield {'model': 'auth.user', 'pk': 1, 'fields': {
+                'username': 'existing'
+            }}
+            for pk in (1, 2):
+                yield {'model': 'posts.post', 'pk': pk, 'fields': {
+                    'created': '2022-01-22T16:00:00Z',
+                    'text': f'Пост из дампа {pk}',
+                    'author': 1,
+                }}
+                if pk == 1:
+                    Post.objects.create(
+                        author=self.existing,
+                        text='Пост сайта',
+                        created='2022-01-22T16:00:00Z',
+                    )
+
+        importer = DumpImporter(batch_size=1)
+        importer.add_objects(objects())
+        importer.finish()
+        self.assertEqual(
+            set(Post.objects.filter(created__year=2022).values_list(
+                'text', flat=True
+            )),
+            {'Пост из дампа 1', 'Пост из дампа 2'},
+        )
+        self.assertGreater(
+            Post.objects.get(text='Пост сайта').created.year, 2022
+        )
+
+    def test_read_objects_across_chunks(self):
+        """Объекты, разорванные границей прочитанного куска, читаются
+        целиком."""
+        with mock.patch('posts.dumps.READ_SIZE', 7):
+            for content in (json.dumps(DUMP, indent=2), json.dumps([])):
+                with self.subTest(content=content[:10]):
+                    self.assertEqual(
+                        list(read_objects(StringIO(content))),
+                        json.loads(content),
+                    )
+
+
+class ExportDumpTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Группа'
+        )
+        cls.old_post = Post.objects.create(
+            author=cls.user, text='Старый пост', group=cls.group
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            created='2020-01-01T00:00:00Z'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Новый пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir.cleanup()
+        super().tearDownClass()
+
+    def export(self, *args):
+        call_command('export_dump', self.dir.name, *args, stdout=StringIO())
+        dump = {}
+        for name in sorted(os.listdir(self.dir.name)):
+            with open_dump(os.path.join(self.dir.name, name)) as stream:
+                dump[name] = list(read_objects(stream))
+        return dump
+
+    def test_export_all(self):
+        """Каждая модель выгружается в свой сжатый JSONL."""
+        dump = self.export()
+        self.assertEqual(sorted(dump), [
+            'auth.user.jsonl.gz',
+            'posts.comment.jsonl.gz',
+            'posts.follow.jsonl.gz',
+            'posts.group.jsonl.gz',
+            'posts.post.jsonl.gz',
+            'users.userprofile.jsonl.gz',
+        ])
+        self.assertEqual(dump['posts.post.jsonl.gz'][0], {
+            'model': 'posts.post',
+            'pk': self.old_post.pk,
+            'fields': {
+                'created': '2020-01-01T00:00:00Z',
+                'text': 'Старый пост',
+                'author': self.user.pk,
+                'group': self.group.pk,
+                'image': '',
+                'image_width': None,
+                'image_height': None,
+                'image_hash': '',
+                'image_placeholder': '',
+                'image_thumbnail': '',
+                'image_variants': '',
+            },
+        })
+        self.assertEqual(len(dump['auth.user.jsonl.gz']), 2)
+        self.assertEqual(len(dump['posts.follow.jsonl.gz']), 1)
+
+    def test_export_credentials(self):
+        """Пароли и права выгружаются только с --include-credentials."""
+        User.objects.filter(pk=self.user.pk).update(
+            password='md5$salt$hash', is_superuser=True, email='a@b.ru'
+        )
+        user = self.export()['auth.user.jsonl.gz'][0]
+        self.assertEqual(sorted(user['fields']), [
+            'date_joined', 'first_name', 'last_name', 'username'
+        ])
+        user = self.export('--include-credentials')['auth.user.jsonl.gz'][0]
+        self.assertEqual(user['fields']['password'], 'md5$salt$hash')
+        self.assertTrue(user['fields']['is_superuser'])
+
+    def test_export_since(self):
+        """С --since выгружаются только новые посты, а модели без даты
+        создания - целиком."""
+        dump = self.export('--since', '2021-01-01')
+        self.assertEqual(
+            [obj['pk'] for obj in dump['posts.post.jsonl.gz']],
+            [self.post.pk],
+        )
+        self.assertEqual(len(dump['posts.comment.jsonl.gz']), 1)
+        self.assertEqual(len(dump['posts.group.jsonl.gz']), 1)
+
+    def test_export_then_import(self):
+        """Выгрузка загружается обратно командой import_dump."""
+        self.export()
+        Post.objects.all().delete()
+        call_command(
+            'import_dump',
+            *[
+                os.path.join(self.dir.name, name)
+                for name in os.listdir(self.dir.name)
+            ],
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', 'author', 'group')),
+            [
+                ('Новый пост', self.user.pk, None),
+                ('Старый пост', self.user.pk, self.group.pk),
+            ],
+        )
+        self.assertEqual(
+            Comment.objects.get().post.text, 'Новый пост'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDatasetTest(TestCase):
+    OPTIONS = {
+        'users': 20,
+        'groups': 3,
+        'posts': 200,
+        'comments': 50,
+        'follows': 40,
+        'seed': 7,
+        'batch_size': 60,
+    }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate(self):
+        """Данные загружаются в базу вместе со счетчиками и профилями,
+        посты популярных авторов встречаются чаще."""
+        call_command(
+            'generate_dataset', images=0.5, image_pool=2, stdout=StringIO(),
+            **self.OPTIONS
+        )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(UserProfile.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__created')
+        ).exists())
+        self.assertEqual(
+            Post.objects.exclude(image='').values('image').distinct().count(),
+            2,
+        )
+        self.assertFalse(
+            Post.objects.exclude(image='').filter(image_width=None).exists()
+        )
+        top = AuthorStats.objects.aggregate(top=Max('posts_count'))['top']
+        self.assertGreater(top, 2 * 200 / 20)
+        self.assertEqual(
+            AuthorStats.objects.filter(posts_count__gt=0).count(),
+            Post.objects.values('author').distinct().count(),
+        )
+
+    def test_seed_is_deterministic(self):
+        """Одно зерно дает одни и те же данные."""
+        dumps = []
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('first.jsonl.gz', 'second.jsonl.gz'):
+                path = os.path.join(directory, name)
+                call_command(
+                    'generate_dataset', output=path, stdout=StringIO(),
+                    **self.OPTIONS
+                )
+                with open_dump(path) as stream:
+                    dumps.append([
+                        (obj['model'], obj['pk'], obj['fields'].get('text'))
+                        for obj in read_objects(stream)
+                    ])
+        self.assertEqual(dumps[0], dumps[1])
+        self.assertEqual(len(dumps[0]), 20 + 3 + 20 + 200 + 50 + 40)
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,158 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, User
+from posts.stats import recount_author_stats
+from users.models import UserProfile
+
+USERNAME = 'author'
+READER_USERNAME = 'reader'
+GROUP_SLUG = 'test-slug'
+USERS_COUNT = 1000
+POSTS_COUNT = 10000
+COMMENTS_COUNT = 300
+FOLLOWING_COUNT = 100
+
+
+class PostsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Бюджеты SQL-запросов для адресов из posts/urls.py.
+
+    Бюджет - максимальное число запросов на холодном кеше. Он не должен
+    зависеть от объема данных, поэтому данных заведомо много.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=READER_USERNAME)
+        User.objects.bulk_create(
+            User(username=f'user {i}') for i in range(USERS_COUNT)
+        )
+        users = list(User.objects.filter(username__startswith='user '))
+        UserProfile.objects.bulk_create(
+            UserProfile(user=user) for user in users
+        )
+        cls.group = Group.objects.create(
+            title='test group',
+            slug=GROUP_SLUG,
+            description='test description',
+        )
+        authors = [cls.user, *users]
+        Post.objects.bulk_create(
+            Post(
+                author=authors[i % len(authors)],
+                group=cls.group if i % 2 else None,
+                text=f'test text {i}',
+            )
+            for i in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.filter(author=cls.user).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=users[i], text=f'comment {i}')
+            for i in range(COMMENTS_COUNT)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in authors[:FOLLOWING_COUNT]
+        )
+        recount_author_stats()
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author = Client()
+        self.author.force_login(self.user)
+        self.follower = Client()
+        self.follower.force_login(self.reader)
+
+    def test_get_budgets(self):
+        """GET-запросы укладываются в бюджет."""
+        post_detail = reverse('posts:post_detail', args=[self.post.id])
+        url_client_budget = [
+            [reverse('posts:index'), self.guest, 2],
+            [reverse('posts:index') + '?page=500', self.guest, 2],
+            [reverse('posts:group_posts', args=[GROUP_SLUG]), self.guest, 3],
+            [reverse('posts:profile', args=[USERNAME]), self.guest, 3],
+            [reverse('posts:profile', args=[USERNAME]), self.follower, 5],
+            # Первый запрос после очистки кеша узнает автора поста для
+            # поколения страницы, дальше автор берется из кеша.
+            [post_detail, self.guest, 4],
+            [post_detail, self.author, 5],
+            [post_detail + '?page=3', self.guest, 3],
+            [reverse('posts:post_edit', args=[self.post.id]), self.author, 5],
+            [reverse('posts:post_create'), self.author, 3],
+            [reverse('posts:follow_index'), self.follower, 4],
+        ]
+        for url, client, budget in url_client_budget:
+            with self.subTest(url=url, client=client):
+                with self.assertMaxQueries(budget):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_budgets(self):
+        """Запросы, изменяющие данные, укладываются в бюджет."""
+        post_detail = reverse('posts:post_detail', args=[self.post.id])
+        url_client_data_budget = [
+            [
+                reverse('posts:post_create'),
+                self.author,
+                {'text': 'new'},
+                6,
+                reverse('posts:profile', args=[USERNAME]),
+                lambda: Post.objects.filter(text='new').exists(),
+            ],
+            [
+                reverse('posts:post_edit', args=[self.post.id]),
+                self.author,
+                {'text': 'edited'},
+                7,
+                post_detail,
+                lambda: Post.objects.filter(
+                    pk=self.post.pk, text='edited'
+                ).exists(),
+            ],
+            [
+                reverse('posts:add_comment', args=[self.post.id]),
+                self.follower,
+                {'text': 'new comment'},
+                6,
+                post_detail,
+                lambda: Comment.objects.filter(text='new comment').exists(),
+            ],
+        ]
+        for url, client, data, budget, redirect, done in (
+            url_client_data_budget
+        ):
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = client.post(url, data)
+                self.assertRedirects(
+                    response, redirect, fetch_redirect_response=False
+                )
+                self.assertTrue(done())
+
+    def test_follow_budgets(self):
+        """Подписка и отписка укладываются в бюджет."""
+        url_budget_following = [
+            [reverse('posts:profile_unfollow', args=[USERNAME]), 7, False],
+            [reverse('posts:profile_follow', args=[USERNAME]), 8, True],
+        ]
+        for url, budget, following in url_budget_following:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = self.follower.get(url)
+                self.assertRedirects(
+                    response,
+                    reverse('posts:profile', args=[USERNAME]),
+                    fetch_redirect_response=False,
+                )
+                self.assertEqual(
+                    Follow.objects.filter(
+                        user=self.reader, author=self.user
+                    ).exists(),
+                    following,
+                )
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 
@@ -51,6 +52,9 @@ class PostsURLTests(TestCase):
         cls.POST_EDIT_URL = reverse('posts:post_edit', args=[cls.post.id])
         cls.POST_EDIT_REDIRECT = f'{LOGIN_URL}?next={cls.POST_EDIT_URL}'
 
+    def setUp(self):
+        cache.clear()
+
     def test_urls_get_correct_templates(self):
         """Провряем что URL-адреса используют соответствующие шаблоны."""
         url_client_template = [
@@ -85,7 +89,7 @@ class PostsURLTests(TestCase):
             [FOLLOW_TO_AUTHOR_URL, self.guest, FOUND],
             [FOLLOW_TO_AUTHOR_URL, self.author, FOUND],
             [UNFOLLOW_TO_AUTHOR_URL, self.another, FOUND],
-            [UNFOLLOW_TO_AUTHOR_URL, self.author, NOT_FOUND],
+            [UNFOLLOW_TO_AUTHOR_URL, self.author, FOUND],
             [UNFOLLOW_TO_AUTHOR_URL, self.guest, FOUND],
         ]
         for url, client, status_code in url_client_status_code:
@@ -104,6 +108,7 @@ class PostsURLTests(TestCase):
             [FOLLOW_TO_AUTHOR_URL, self.author, PROFILE_URL],
             [UNFOLLOW_TO_AUTHOR_URL, self.guest, UNFOLLOW_TO_AUTHOR_REDIRECT],
             [UNFOLLOW_TO_AUTHOR_URL, self.another, PROFILE_URL],
+            [UNFOLLOW_TO_AUTHOR_URL, self.author, PROFILE_URL],
         ]
         for url, client, redirect in url_client_redirect:
             with self.subTest(url=url, redirect=redirect):
@@ -1,14 +1,26 @@
+import json
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
-from posts.models import Follow, Post, Group, User
-from yatube.settings import POSTS_PER_PAGE
+from core.cache import PAGES_GENERATION, feeds_cache, generation_key
+from core.jobs import shutdown_queues
+from core.paginators import CachedCountPaginator
+from posts.feeds import AUTHOR_FEED, INDEX_FEED, page_generation
+from posts.search import rebuild_index
+from posts.models import (AuthorStats, Comment, Follow, Post, Group,
+                          TimelineEntry, User)
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
 USERNAME = 'author'
 USERNAME_NOT_AUTHOR = 'not author'
@@ -23,6 +35,7 @@ POST_CREATE_URL = reverse('posts:post_create')
 FOLLOW_TO_AUTHOR_URL = reverse('posts:profile_follow', args=[USERNAME])
 UNFOLLOW_TO_AUTHOR_URL = reverse('posts:profile_unfollow', args=[USERNAME])
 FOLLOW_INDEX_URL = reverse('posts:follow_index')
+SEARCH_URL = reverse('posts:search')
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 BYTE_STRING = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
@@ -71,6 +84,9 @@ class PostPagesTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_show_correct_context(self):
         """Шаблоны сформированы с правильными контекстами
         и созданный пост корректно отображатся на страницах."""
@@ -132,6 +148,8 @@ class PostPagesTests(TestCase):
                 group=self.group
             ) for i in range(POSTS_PER_PAGE + 4)
         )
+        # bulk_create не посылает сигналов, сбрасывающих кеш страниц.
+        cache.clear()
         posts_count = Post.objects.count()
         second_page_posts_count = posts_count - POSTS_PER_PAGE
         url_posts_on_page = [
@@ -152,11 +170,24 @@ class PostPagesTests(TestCase):
 
     def test_cache_index_page(self):
         """Проверка кеширования главной страницы."""
-        cached = self.guest.get(INDEX_URL).content
-        Post.objects.all().delete()
-        self.assertEqual(self.guest.get(INDEX_URL).content, cached)
+        cached = self.author.get(INDEX_URL).content
+        Post.objects.update(text='changed without signals')
+        self.assertEqual(self.author.get(INDEX_URL).content, cached)
         cache.clear()
-        self.assertNotEqual(self.guest.get(INDEX_URL).content, cached)
+        self.assertNotEqual(self.author.get(INDEX_URL).content, cached)
+
+    def test_cache_index_page_invalidated_on_changes(self):
+        """Кеш главной страницы сбрасывается при изменении постов."""
+        cached = self.author.get(INDEX_URL).content
+        Post.objects.all().delete()
+        self.assertNotEqual(self.author.get(INDEX_URL).content, cached)
+
+    def test_cache_follow_index_is_per_user(self):
+        """Закешированная лента подписок не видна другим пользователям."""
+        self.not_author.get(FOLLOW_TO_AUTHOR_URL)
+        self.not_author.get(FOLLOW_INDEX_URL)
+        response = self.author.get(FOLLOW_INDEX_URL)
+        self.assertNotContains(response, self.post.text)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -194,3 +225,599 @@ class FollowTests(TestCase):
             user=self.follower.id,
             author=self.author_user.id).exists()
         )
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        """Повторные подписка и отписка не падают и не плодят подписок."""
+        for url, count in [
+            (FOLLOW_TO_AUTHOR_URL, 1),
+            (UNFOLLOW_TO_AUTHOR_URL, 0),
+        ]:
+            with self.subTest(url=url):
+                for _ in range(2):
+                    response = self.user_follower.get(url)
+                    self.assertRedirects(response, PROFILE_URL)
+                self.assertEqual(
+                    Follow.objects.filter(user=self.follower).count(), count
+                )
+                self.assertEqual(
+                    AuthorStats.objects.get(user=self.author_user)
+                    .followers_count,
+                    count
+                )
+
+    def test_unfollow_twice_changes_counters_once(self):
+        """Повторная отписка не уменьшает счетчики второй раз, даже если
+        строку уже удалил параллельный запрос."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author_user)
+        Follow.objects.create(user=self.follower, author=self.author_user)
+        self.user_follower.get(UNFOLLOW_TO_AUTHOR_URL)
+        # DELETE второго запроса не находит строку, как и у параллельной
+        # отписки, и побочные действия не выполняются.
+        with mock.patch('posts.follows.follow_removed') as follow_removed:
+            self.user_follower.get(UNFOLLOW_TO_AUTHOR_URL)
+        follow_removed.assert_not_called()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author_user).followers_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.follower).following_count, 0
+        )
+
+
+@override_settings(CURSOR_PAGINATED_VIEWS=('posts:index',))
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Test text {i}')
+            for i in range(POSTS_PER_PAGE * 2 + 3)
+        )
+        # Одинаковая дата создания у всех постов: порядок задает id.
+        Post.objects.update(created=Post.objects.first().created)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_feed_without_gaps(self):
+        """Курсор проходит ленту вперед и назад без пропусков и повторов."""
+        expected = list(Post.objects.order_by('-created', '-id'))
+        seen = []
+        url = INDEX_URL
+        pages = []
+        while url:
+            page = self.guest.get(url).context['page_obj']
+            self.assertTrue(page.is_cursor)
+            pages.append(list(page))
+            seen.extend(page)
+            url = (
+                f'{INDEX_URL}?cursor={page.next_cursor}'
+                if page.has_next() else None
+            )
+        self.assertEqual(seen, expected)
+        previous = self.guest.get(
+            f'{INDEX_URL}?cursor={page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(previous), pages[-2])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Поврежденный токен ведет на первую страницу."""
+        page = self.guest.get(
+            f'{INDEX_URL}?cursor=broken'
+        ).context['page_obj']
+        self.assertFalse(page.has_previous())
+        self.assertEqual(
+            list(page),
+            list(Post.objects.order_by('-created', '-id')[:POSTS_PER_PAGE])
+        )
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Test text {i}')
+            for i in range(POSTS_PER_PAGE * 3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(url)
+        return sum('COUNT(' in query['sql'] for query in queries)
+
+    def test_feed_count_is_cached_until_posts_change(self):
+        """Количество постов в ленте считается один раз до изменения постов."""
+        url = INDEX_URL + '?page=2'
+        self.assertEqual(self.count_queries(url), 1)
+        self.assertEqual(self.count_queries(url), 0)
+        Post.objects.create(author=self.user, text='new post')
+        self.assertEqual(self.count_queries(url), 1)
+
+    def test_stale_count_does_not_hide_posts(self):
+        """Устаревшее количество не обрезает последнюю страницу."""
+        self.guest.get(PROFILE_URL)
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Bulk text {i}')
+            for i in range(POSTS_PER_PAGE)
+        )
+        page = self.guest.get(PROFILE_URL + '?page=4').context['page_obj']
+        self.assertEqual(page.number, 4)
+        self.assertEqual(len(page), POSTS_PER_PAGE)
+
+    def test_page_window(self):
+        """В пагинаторе только края и страницы вокруг текущей."""
+        paginator = CachedCountPaginator(range(200), POSTS_PER_PAGE)
+        self.assertEqual(
+            paginator.page(10).page_window,
+            [1, None, 8, 9, 10, 11, 12, None, 20]
+        )
+        self.assertEqual(paginator.page(1).page_window, [1, 2, 3, None, 20])
+
+
+class PostDetailQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        cls.post = Post.objects.create(author=cls.user, text='test text')
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+
+    def get_queries_count(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(self.POST_DETAIL_URL)
+        return len(queries)
+
+    def test_comments_do_not_add_queries(self):
+        """Число запросов к странице поста не зависит от комментариев."""
+        Comment.objects.create(post=self.post, author=self.user, text='text')
+        expected = self.get_queries_count()
+        User.objects.bulk_create(
+            User(username=f'commenter {i}') for i in range(COMMENTS_PER_PAGE)
+        )
+        authors = list(User.objects.filter(username__startswith='commenter'))
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='text')
+            for author in authors * 2
+        )
+        self.assertEqual(self.get_queries_count(), expected)
+
+    def test_comments_are_paginated(self):
+        """Комментарии выводятся постранично."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'text {i}')
+            for i in range(COMMENTS_PER_PAGE + 1)
+        )
+        response = self.guest.get(self.POST_DETAIL_URL + '?page=2')
+        self.assertEqual(len(response.context['comments']), 1)
+
+
+@override_settings(FOLLOW_FEED_TIMELINE=True, FOLLOW_FEED_FANOUT_LIMIT=1)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='old post')
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+        cls.follower = Client()
+        cls.follower.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_follow_feed(self):
+        return list(self.follower.get(FOLLOW_INDEX_URL).context['page_obj'])
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок заполняется при подписке и публикации."""
+        self.follower.get(FOLLOW_TO_AUTHOR_URL)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=self.post)
+        )
+        self.author.post(POST_CREATE_URL, {'text': 'new post'})
+        new_post = Post.objects.get(text='new post')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=new_post)
+        )
+        self.assertEqual(self.get_follow_feed(), [new_post, self.post])
+        self.follower.get(UNFOLLOW_TO_AUTHOR_URL)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.get_follow_feed(), [])
+
+    def test_popular_author_is_read_on_show(self):
+        """Посты популярного автора не раздаются, но попадают в ленту."""
+        Follow.objects.create(user=self.reader, author=self.user)
+        AuthorStats.objects.filter(user=self.user).update(followers_count=2)
+        self.author.post(POST_CREATE_URL, {'text': 'new post'})
+        new_post = Post.objects.get(text='new post')
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post))
+        self.assertEqual(self.get_follow_feed(), [new_post, self.post])
+
+    @override_settings(FOLLOW_FEED_TIMELINE_LENGTH=2)
+    def test_fan_out_trims_timelines(self):
+        """После раздачи поста ленты подписчиков обрезаются."""
+        self.follower.get(FOLLOW_TO_AUTHOR_URL)
+        for text in ['first', 'second', 'third']:
+            self.author.post(POST_CREATE_URL, {'text': text})
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).order_by(
+                '-created'
+            ).values_list('post__text', flat=True)),
+            ['third', 'second'],
+        )
+
+    def test_author_below_limit_is_fanned_out_again(self):
+        """Посты, написанные пока автор был популярным, возвращаются в
+        ленты, когда подписчиков снова становится не больше порога."""
+        other = User.objects.create_user(username='other')
+        other_client = Client()
+        other_client.force_login(other)
+        self.follower.get(FOLLOW_TO_AUTHOR_URL)
+        other_client.get(FOLLOW_TO_AUTHOR_URL)
+        self.author.post(POST_CREATE_URL, {'text': 'popular post'})
+        popular_post = Post.objects.get(text='popular post')
+        self.assertFalse(TimelineEntry.objects.filter(post=popular_post))
+        other_client.get(UNFOLLOW_TO_AUTHOR_URL)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=popular_post
+        ))
+        self.assertEqual(self.get_follow_feed(), [popular_post, self.post])
+
+    def test_follow_flapping_does_not_refill(self):
+        """Подписки и отписки на пороге без новых постов не дозаполняют
+        ленты, пост популярного автора - дозаполняет один раз."""
+        other = User.objects.create_user(username='other')
+        other_client = Client()
+        other_client.force_login(other)
+        self.follower.get(FOLLOW_TO_AUTHOR_URL)
+        with mock.patch('posts.timeline._refill_follower_timelines') as refill:
+            for _ in range(2):
+                other_client.get(FOLLOW_TO_AUTHOR_URL)
+                other_client.get(UNFOLLOW_TO_AUTHOR_URL)
+            refill.assert_not_called()
+            other_client.get(FOLLOW_TO_AUTHOR_URL)
+            self.author.post(POST_CREATE_URL, {'text': 'popular post'})
+            for _ in range(2):
+                other_client.get(UNFOLLOW_TO_AUTHOR_URL)
+                other_client.get(FOLLOW_TO_AUTHOR_URL)
+            refill.assert_called_once_with(self.user.pk)
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+        cls.post = Post.objects.create(author=cls.user, text='test text')
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_page_skips_database(self):
+        """Повторный запрос анонима отдается из кеша без обращения к базе."""
+        for url in [INDEX_URL, PROFILE_URL, self.POST_DETAIL_URL]:
+            with self.subTest(url=url):
+                content = self.guest.get(url).content
+                with self.assertNumQueries(0):
+                    response = self.guest.get(url)
+                self.assertEqual(response.content, content)
+
+    def test_conditional_requests(self):
+        """ETag и Last-Modified позволяют получить 304."""
+        response = self.guest.get(self.POST_DETAIL_URL)
+        for header, value in [
+            ['HTTP_IF_NONE_MATCH', response['ETag']],
+            ['HTTP_IF_MODIFIED_SINCE', response['Last-Modified']],
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.guest.get(
+                        self.POST_DETAIL_URL, **{header: value}
+                    ).status_code,
+                    304
+                )
+
+    def test_changes_invalidate_cached_page(self):
+        """Новый комментарий сразу виден анониму."""
+        response = self.guest.get(self.POST_DETAIL_URL)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='new comment'
+        )
+        new_response = self.guest.get(
+            self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(new_response.status_code, 200)
+        self.assertContains(new_response, 'new comment')
+
+    def test_changes_keep_other_feeds_cached(self):
+        """Новый пост сбрасывает страницы своих лент, но не чужие."""
+        other = User.objects.create_user(username='other')
+        other_url = reverse('posts:profile', args=[other.username])
+        self.guest.get(other_url)
+        self.guest.get(INDEX_URL)
+        Post.objects.create(author=self.user, text='new post')
+        with self.assertNumQueries(0):
+            self.guest.get(other_url)
+        self.assertContains(self.guest.get(INDEX_URL), 'new post')
+        self.assertContains(self.guest.get(PROFILE_URL), 'new post')
+
+    def test_other_authors_keep_post_page_cached(self):
+        """Посты и подписки других авторов не сбрасывают страницу поста,
+        подписка на автора поста - сбрасывает."""
+        other = User.objects.create_user(username='other')
+        third = User.objects.create_user(username='third')
+        self.guest.get(self.POST_DETAIL_URL)
+        Post.objects.create(author=other, text='other post')
+        Follow.objects.create(user=other, author=third)
+        with self.assertNumQueries(0):
+            self.guest.get(self.POST_DETAIL_URL)
+        Follow.objects.create(user=other, author=self.user)
+        self.assertIsNotNone(self.guest.get(self.POST_DETAIL_URL).context)
+
+    def test_rename_invalidates_cached_pages(self):
+        """Новое имя автора сразу видно в закешированных лентах, на
+        странице поста и в ETag API."""
+        api_url = reverse('api:index')
+        etag = self.guest.get(api_url)['ETag']
+        for url in [INDEX_URL, PROFILE_URL, self.POST_DETAIL_URL]:
+            self.guest.get(url)
+        self.author.get(INDEX_URL)
+        self.user.first_name = 'Новое'
+        self.user.last_name = 'Имя'
+        self.user.save()
+        for client in [self.guest, self.author]:
+            for url in [INDEX_URL, PROFILE_URL, self.POST_DETAIL_URL]:
+                with self.subTest(url=url):
+                    self.assertContains(client.get(url), 'Новое Имя')
+        self.assertEqual(
+            self.guest.get(api_url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_last_login_keeps_cached_pages(self):
+        """Вход пользователя не сбрасывает закешированные страницы."""
+        self.guest.get(INDEX_URL)
+        self.user.last_login = None
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.guest.get(INDEX_URL)
+
+    def test_generation_keys_fit_memcached(self):
+        """Имя автора из адреса не попадает в ключ поколения как есть."""
+        other = User.objects.create_user(username='ё' * 150)
+        key = feeds_cache.make_key(
+            generation_key(page_generation(AUTHOR_FEED, other.username))
+        )
+        self.assertTrue(key.isascii())
+        self.assertLessEqual(len(key), 250)
+        url = reverse('posts:profile', args=[other.username])
+        self.guest.get(url)
+        Post.objects.create(author=other, text='new post')
+        self.assertContains(self.guest.get(url), 'new post')
+
+    def test_last_modified_rounded_up(self):
+        """Last-Modified не раньше изменения данных с точностью до
+        миллисекунд."""
+        feeds_cache.set_many({
+            generation_key(PAGES_GENERATION): 1_600_000_000_000,
+            generation_key(page_generation(INDEX_FEED)): 1_600_000_000_001,
+        }, None)
+        response = self.guest.get(INDEX_URL)
+        self.assertEqual(response['Last-Modified'], http_date(1_600_000_001))
+
+    def test_authorized_pages_are_not_cached(self):
+        """Авторизованному пользователю страница строится заново."""
+        self.author.get(INDEX_URL)
+        self.assertIsNotNone(self.author.get(INDEX_URL).context)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text='test text',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=BYTE_STRING,
+                content_type='image/gif'
+            )
+        )
+
+    @override_settings(THUMBNAIL_ASYNC=True)
+    def test_original_image_shown_while_pending(self):
+        """Пока миниатюра не готова, показывается исходная картинка."""
+        post = self.create_post()
+        self.assertEqual(post.image_thumbnail, '')
+        response = Client().get(INDEX_URL)
+        self.assertContains(response, post.image.url)
+        self.assertContains(response, 'width="2"')
+        self.assertContains(response, 'height="1"')
+
+    def test_thumbnail_url_stored_and_shown(self):
+        """Адрес готовой миниатюры сохраняется и попадает на страницу."""
+        post = self.create_post()
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
+        self.assertNotEqual(post.image_thumbnail, post.image.url)
+        self.assertContains(Client().get(INDEX_URL), post.image_thumbnail)
+
+    def test_image_size_and_placeholder_rendered(self):
+        """Картинка выводится с размерами и заглушкой из базы."""
+        post = self.create_post()
+        post.refresh_from_db()
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+        response = Client().get(INDEX_URL)
+        self.assertContains(response, 'width="960"')
+        self.assertContains(response, 'height="339"')
+        self.assertContains(response, post.image_placeholder)
+
+    def test_image_variants_in_srcset(self):
+        """Варианты картинки попадают в srcset ленты."""
+        post = self.create_post()
+        post.refresh_from_db()
+        variants = json.loads(post.image_variants)
+        self.assertTrue(variants)
+        response = Client().get(INDEX_URL)
+        for variant in variants:
+            with self.subTest(variant=variant['name']):
+                self.assertContains(
+                    response,
+                    f'{settings.MEDIA_URL}{variant["name"]} '
+                    f'{variant["width"]}w'
+                )
+
+    def test_new_image_resets_thumbnail(self):
+        """Смена картинки сбрасывает миниатюру прежней."""
+        post = self.create_post()
+        post.refresh_from_db()
+        old_thumbnail = post.image_thumbnail
+        post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=BYTE_STRING.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00'),
+            content_type='image/gif'
+        )
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
+        self.assertNotEqual(post.image_thumbnail, old_thumbnail)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=True)
+class PostThumbnailAsyncTests(TransactionTestCase):
+    def tearDown(self):
+        shutdown_queues()
+        super().tearDown()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnail_built_in_background(self):
+        """Миниатюра строится в фоне после фиксации транзакции."""
+        cache.clear()
+        user = User.objects.create_user(username=USERNAME)
+        with transaction.atomic():
+            post = Post.objects.create(
+                author=user,
+                text='test text',
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=BYTE_STRING,
+                    content_type='image/gif'
+                )
+            )
+            shutdown_queues()
+            post.refresh_from_db()
+            self.assertEqual(post.image_thumbnail, '')
+        shutdown_queues()
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
+        self.assertTrue(post.image_variants)
+        self.assertContains(Client().get(INDEX_URL), post.image_thumbnail)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.commented = Post.objects.create(author=cls.user, text='Про собак')
+        Comment.objects.create(
+            post=cls.commented, author=cls.user, text='А мой кот спит'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Коты и кошки')
+        Post.objects.create(author=cls.user, text='Про погоду')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        return self.client.get(SEARCH_URL, {'q': query, **params})
+
+    def test_search_ranks_posts_above_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        page_obj = self.search('кот').context['page_obj']
+        self.assertEqual(list(page_obj), [self.post, self.commented])
+
+    def test_search_follows_post_changes(self):
+        """Индекс следует за правкой и удалением постов."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Про лошадей'
+        post.save()
+        self.assertEqual(
+            list(self.search('лошад').context['page_obj']), [post]
+        )
+        self.assertEqual(
+            list(self.search('кошки').context['page_obj']), []
+        )
+        Post.objects.filter(pk=self.commented.pk).delete()
+        self.assertEqual(list(self.search('кот').context['page_obj']), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        for query in ['"кот', 'кот AND (', '*', 'NEAR(кот)']:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+    def test_search_pages_keep_query(self):
+        """Ссылки пагинатора сохраняют запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'кот {i}')
+            for i in range(POSTS_PER_PAGE)
+        )
+        rebuild_index()
+        response = self.search('кот', page=2)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=1')
+
+    def test_search_not_page_cached(self):
+        """Запросы анонимов к поиску не кешируются целой страницей."""
+        self.search('кот')
+        self.assertIsNotNone(self.search('кот').context)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты и комментарии по индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        for url, expected in [
+            (reverse('admin:posts_post_changelist'), 1),
+            (reverse('admin:posts_comment_changelist'), 1),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'q': 'кот'})
+                self.assertEqual(
+                    response.context['cl'].result_count, expected
+                )
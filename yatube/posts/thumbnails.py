@@ -0,0 +1,72 @@
+import logging
+
+from sorl.thumbnail import get_thumbnail
+
+from core.images import (build_placeholder, build_variants, dump_variants,
+                         schedule_image_job)
+
+from .feeds import invalidate_post_feeds, invalidate_post_pages
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_ASPECT = 960 / 339
+
+
+def generate_post_thumbnail(post_id):
+    """Строит миниатюру, варианты и заглушку картинки поста.
+
+    Миниатюра 960x339 нужна браузерам без srcset, варианты разной ширины
+    и формата - остальным (см. тег responsive_image). Результат
+    сохраняется, только если картинка не сменилась, пока шла обработка.
+    После этого сбрасывается кеш страниц с постом, чтобы они показали
+    миниатюру вместо исходной картинки.
+
+    Args:
+        post_id (int): id поста.
+
+    Returns:
+        str: адрес миниатюры или пустая строка, если построить не удалось.
+    """
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return ''
+    try:
+        thumbnail = get_thumbnail(
+            post.image, POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+        )
+        url = thumbnail.url
+        variants = build_variants(
+            post.image, POST_IMAGE_WIDTHS, POST_IMAGE_ASPECT
+        )
+        placeholder = build_placeholder(post.image, POST_IMAGE_ASPECT)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+        return ''
+    updated = Post.objects.filter(
+        pk=post_id, image=post.image.name
+    ).update(
+        image_thumbnail=url,
+        image_variants=dump_variants(variants),
+        image_placeholder=placeholder,
+    )
+    if updated:
+        invalidate_post_feeds(post.author_id, (post.group_id,), counts=False)
+        invalidate_post_pages(post, (post.group_id,))
+    return url
+
+
+def schedule_post_thumbnail(post):
+    """Ставит в очередь обработку картинки поста.
+
+    Пока она идет, шаблоны показывают исходную картинку.
+
+    Args:
+        post (Post): пост с картинкой.
+    """
+
+    schedule_image_job(generate_post_thumbnail, post.pk)
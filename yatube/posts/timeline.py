@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from core.jobs import JobQueue
+
+from .models import AuthorStats, Follow, Post, TimelineEntry, User
+
+timeline_jobs = JobQueue(
+    'timelines', 'TIMELINE_JOBS_ASYNC', 'TIMELINE_JOB_WORKERS'
+)
+
+
+def is_fan_out_author(author_id):
+    """Проверяет, раздаются ли посты автора по лентам подписчиков.
+
+    Посты авторов, у которых подписчиков больше
+    settings.FOLLOW_FEED_FANOUT_LIMIT, не копируются в ленты, а читаются
+    при показе ленты.
+
+    Args:
+        author_id (int): id автора.
+
+    Returns:
+        bool: True если посты автора раздаются при публикации.
+    """
+
+    followers_count = AuthorStats.objects.filter(
+        user_id=author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count is None:
+        followers_count = Follow.objects.filter(author_id=author_id).count()
+    return followers_count <= settings.FOLLOW_FEED_FANOUT_LIMIT
+
+
+def fan_out_post(post):
+    """Раздает пост по лентам подписчиков автора.
+
+    Args:
+        post (Post): опубликованный пост.
+    """
+
+    if not settings.FOLLOW_FEED_TIMELINE:
+        return
+    if not is_fan_out_author(post.author_id):
+        # Пост не попал в ленты: их дозаполнят, когда подписчиков снова
+        # станет не больше порога (см. refill_follower_timelines).
+        AuthorStats.objects.filter(
+            user_id=post.author_id, timelines_stale=False
+        ).update(timelines_stale=True)
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, created=post.created)
+            for user_id in Follow.objects.filter(
+                author_id=post.author_id
+            ).values_list('user_id', flat=True).iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    # Обрезка лент всех подписчиков дороже вставки, поэтому она идет в
+    # фоне.
+    timeline_jobs.schedule(trim_follower_timelines, post.author_id)
+
+
+def backfill_timeline(user, author):
+    """Добавляет в ленту пользователя последние посты нового автора.
+
+    Посты популярного автора тоже добавляются: тогда лента останется
+    полной, когда подписчиков у него станет меньше порога.
+
+    Args:
+        user (User): подписчик.
+        author (User): автор, на которого подписались.
+    """
+
+    if not settings.FOLLOW_FEED_TIMELINE:
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user=user, post_id=post_id, created=created)
+            for post_id, created in author.posts.values_list(
+                'pk', 'created'
+            )[:settings.FOLLOW_FEED_TIMELINE_LENGTH]
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    trim_timeline(user)
+
+
+def remove_from_timeline(user, author):
+    """Убирает из ленты пользователя посты автора.
+
+    Args:
+        user (User): бывший подписчик.
+        author (User): автор, от которого отписались.
+    """
+
+    if not settings.FOLLOW_FEED_TIMELINE:
+        return
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def refill_follower_timelines(author):
+    """Раздает посты автора подписчикам, когда он перестал быть популярным.
+
+    Пока подписчиков больше settings.FOLLOW_FEED_FANOUT_LIMIT, посты
+    автора не попадают в ленты, и автор отмечается timelines_stale. Когда
+    подписчиков становится не больше порога, отметка снимается одним
+    UPDATE, и последние посты автора заново добавляются в ленты всех
+    подписчиков. Дозаполнение запускает только снявший отметку запрос,
+    а подписки и отписки на пороге без новых постов его не повторяют.
+
+    Args:
+        author (User): автор, от которого отписались.
+    """
+
+    if not settings.FOLLOW_FEED_TIMELINE:
+        return
+    claimed = AuthorStats.objects.filter(
+        user_id=author.pk,
+        timelines_stale=True,
+        followers_count__lte=settings.FOLLOW_FEED_FANOUT_LIMIT,
+    ).update(timelines_stale=False)
+    if claimed:
+        timeline_jobs.schedule(_refill_follower_timelines, author.pk)
+
+
+def _refill_follower_timelines(author_id):
+    author = User.objects.get(pk=author_id)
+    for user in User.objects.filter(follower__author_id=author_id):
+        backfill_timeline(user, author)
+
+
+def trim_timeline(user):
+    """Обрезает ленту пользователя до FOLLOW_FEED_TIMELINE_LENGTH записей.
+
+    Args:
+        user (User): владелец ленты.
+    """
+
+    cutoff = TimelineEntry.objects.filter(user=user).order_by(
+        '-created', '-pk'
+    ).values_list('created', flat=True)[
+        settings.FOLLOW_FEED_TIMELINE_LENGTH:
+        settings.FOLLOW_FEED_TIMELINE_LENGTH + 1
+    ].first()
+    if cutoff is not None:
+        TimelineEntry.objects.filter(user=user, created__lte=cutoff).delete()
+
+
+def trim_follower_timelines(author_id, batch_size=100):
+    """Обрезает ленты всех подписчиков автора после раздачи поста.
+
+    Границы лент находятся одним запросом, затем лишние записи удаляются
+    пачками без загрузки в память.
+
+    Args:
+        author_id (int): id автора.
+        batch_size (int): количество лент в одном DELETE.
+    """
+
+    length = settings.FOLLOW_FEED_TIMELINE_LENGTH
+    cutoffs = Follow.objects.filter(author_id=author_id).annotate(
+        cutoff=Subquery(
+            TimelineEntry.objects.filter(
+                user_id=OuterRef('user_id')
+            ).order_by('-created', '-pk').values('created')[
+                length:length + 1
+            ]
+        )
+    ).filter(cutoff__isnull=False).values_list('user_id', 'cutoff')
+    cutoffs = list(cutoffs)
+    for start in range(0, len(cutoffs), batch_size):
+        condition = Q()
+        for user_id, cutoff in cutoffs[start:start + batch_size]:
+            condition |= Q(user_id=user_id, created__lte=cutoff)
+        TimelineEntry.objects.filter(condition).delete()
+
+
+def get_follow_feed(user):
+    """Возвращает посты авторов, на которых подписан пользователь.
+
+    С включенной settings.FOLLOW_FEED_TIMELINE лента собирается из
+    материализованных записей и постов популярных авторов, посты которых
+    не раздаются при публикации. Иначе посты выбираются соединением с
+    подписками.
+
+    Args:
+        user (User): подписчик.
+
+    Returns:
+        QuerySet: посты ленты подписок.
+    """
+
+    if not settings.FOLLOW_FEED_TIMELINE:
+        return Post.objects.filter(author__following__user=user)
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=(
+                settings.FOLLOW_FEED_FANOUT_LIMIT
+            ),
+        ).values('author_id'))
+    )
+
+
+def rebuild_timeline(user):
+    """Собирает ленту пользователя заново по его подпискам.
+
+    Args:
+        user (User): владелец ленты.
+    """
+
+    TimelineEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill_timeline(user, follow.author)
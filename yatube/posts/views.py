@@ -1,30 +1,58 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from django.shortcuts import redirect, render, get_object_or_404
+from django.utils.http import urlencode
 
+from core.decorators import cache_anonymous_page
+from core.paginators import CachedCountPaginator, CursorPaginator
+
+from .feeds import (AUTHOR_FEED, FOLLOW_FEED, GROUP_FEED, INDEX_FEED,
+                    feed_count_key, feed_generation, page_generation,
+                    post_page_generations)
+from .follows import unfollow
 from .forms import CommentForm, PostForm
 from .models import Follow, Post, Group, User
-from users.models import UserProfile
+from .search import SearchResults
+from .timeline import backfill_timeline, fan_out_post, get_follow_feed
 
-from yatube.settings import POSTS_PER_PAGE
+from yatube.settings import (COMMENTS_PER_PAGE, POSTS_PER_PAGE,
+                             SEARCH_QUERY_MAX_LENGTH)
 
 
-def get_paginator_page(request, post_list):
+def get_paginator_page(request, post_list, count_key=None):
     """Возвращает текущую страницу с постами.
 
+    Для представлений из settings.CURSOR_PAGINATED_VIEWS используется
+    курсорная пагинация по (created, id) с токеном в параметре cursor,
+    для остальных - постраничная по номеру в параметре page. Общее
+    количество постов для постраничной пагинации берется из кеша по
+    count_key, если он передан.
+
     Args:
         request (HttpRequest): объект запроса.
         post_list (QuerySet): список постов.
+        count_key (str): ключ кеша с количеством постов в ленте.
 
     Returns:
-        Page: объект текущей страницы.
+        Page: объект текущей страницы, для курсорной пагинации -
+        CursorPage.
     """
 
-    return Paginator(post_list, POSTS_PER_PAGE).get_page(
-        request.GET.get('page')
-    )
+    view_name = request.resolver_match and request.resolver_match.view_name
+    if view_name in settings.CURSOR_PAGINATED_VIEWS:
+        return CursorPaginator(post_list, POSTS_PER_PAGE).get_page(
+            request.GET.get('cursor')
+        )
+    return CachedCountPaginator(
+        post_list,
+        POSTS_PER_PAGE,
+        count_key=count_key,
+        count_timeout=settings.FEED_COUNT_CACHE_TIMEOUT,
+    ).get_page(request.GET.get('page'))
 
 
+@cache_anonymous_page(lambda request: [page_generation(INDEX_FEED)])
 def index(request):
     """Возвращает ответ с главной страницей с постами.
 
@@ -37,11 +65,17 @@ def index(request):
 
     return render(request, 'posts/index.html', {
         'page_obj': get_paginator_page(
-            request, Post.objects.select_related('author', 'group').all()
-        )}
-    )
+            request,
+            Post.objects.select_related('author', 'group').all(),
+            feed_count_key(INDEX_FEED)
+        ),
+        'feed_generation': feed_generation(INDEX_FEED),
+    })
 
 
+@cache_anonymous_page(lambda request, slug: [
+    page_generation(GROUP_FEED, slug)
+])
 def group_posts(request, slug):
     """Возвращает ответ со страницей с постами группы.
 
@@ -57,11 +91,16 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', {
         'group': group,
         'page_obj': get_paginator_page(
-            request, group.posts.select_related('author').all()
+            request,
+            group.posts.select_related('author').all(),
+            feed_count_key(GROUP_FEED, group.pk)
         )}
     )
 
 
+@cache_anonymous_page(lambda request, username: [
+    page_generation(AUTHOR_FEED, username)
+])
 def profile(request, username):
     """Возвращает ответ со страницей с постами пользователя.
 
@@ -73,8 +112,10 @@ def profile(request, username):
         HttpResponse: объект ответа.
     """
 
-    author = get_object_or_404(User, username=username)
-    UserProfile.objects.get_or_create(user=author)
+    author = get_object_or_404(
+        User.objects.select_related('stats', 'userprofile'),
+        username=username
+    )
     following = (
         request.user.is_authenticated and author != request.user
         and Follow.objects.filter(
@@ -85,15 +126,50 @@ def profile(request, username):
     return render(request, 'posts/profile.html', {
         'author': author,
         'page_obj': get_paginator_page(
-            request, author.posts.select_related('group').all()
+            request,
+            author.posts.select_related('group').all(),
+            feed_count_key(AUTHOR_FEED, author.pk)
         ),
         'following': following,
     })
 
 
+def search(request):
+    """Возвращает ответ со страницей поиска по постам и комментариям.
+
+    Посты упорядочены по релевантности, совпадение в тексте поста важнее
+    совпадения в его комментариях. Страница не кешируется: запрос и номер
+    страницы задает клиент, и каждый добавлял бы запись в кеш.
+
+    Args:
+        request (HttpRequest): объект запроса.
+
+    Returns:
+        HttpResponse: объект ответа.
+    """
+
+    query = request.GET.get('q', '').strip()[:SEARCH_QUERY_MAX_LENGTH]
+    page_obj = None
+    if query:
+        page_obj = CachedCountPaginator(
+            SearchResults(query), POSTS_PER_PAGE
+        ).get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    })
+
+
+@cache_anonymous_page(
+    lambda request, post_id: post_page_generations(post_id)
+)
 def post_detail(request, post_id):
     """Возвращает ответ со страницей отдельного поста.
 
+    Комментарии выводятся постранично, их авторы загружаются тем же
+    запросом, что и сами комментарии.
+
     Args:
         request (HttpRequest): объект запроса.
         post_id (int): id поста.
@@ -102,11 +178,21 @@ def post_detail(request, post_id):
         HttpResponse: объект ответа.
     """
 
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related(
+            'group', 'author__stats', 'author__userprofile'
+        ),
+        id=post_id
+    )
     form = CommentForm(request.POST or None)
+    comments = CachedCountPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE
+    ).get_page(request.GET.get('page'))
     return render(request, 'posts/post_detail.html', {
         'post': post,
         'form': form,
+        'comments': comments,
     })
 
 
@@ -133,6 +219,7 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    fan_out_post(post)
     return redirect('posts:profile', username=post.author.username)
 
 
@@ -155,7 +242,9 @@ def post_edit(request, post_id):
         данные внесенные в форму корректны.
     """
 
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author'), id=post_id
+    )
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post.id)
     form = PostForm(
@@ -208,11 +297,14 @@ def follow_index(request):
         HttpResponse: объект ответа.
     """
 
-    post_list = Post.objects.select_related('author', 'group').filter(
-        author__following__user=request.user
+    post_list = get_follow_feed(request.user).select_related(
+        'author', 'group'
     )
     context = {
-        'page_obj': get_paginator_page(request, post_list)
+        'page_obj': get_paginator_page(
+            request, post_list, feed_count_key(FOLLOW_FEED, request.user.pk)
+        ),
+        'feed_generation': feed_generation(FOLLOW_FEED, request.user.pk),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -231,13 +323,16 @@ def profile_follow(request, username):
     """
 
     author = get_object_or_404(User, username=username)
-    if (author != request.user
-        and not Follow.objects.filter(user=request.user,
-                                      author=author).exists()):
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if author != request.user:
+        try:
+            # Повторная подписка упирается в уникальное ограничение,
+            # поэтому гонка двойных кликов не создаст дубликат.
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            pass
+        else:
+            backfill_timeline(request.user, author)
     return redirect('posts:profile', username=username)
 
 
@@ -254,6 +349,6 @@ def profile_unfollow(request, username):
         при успешной отписке от него.
     """
 
-    get_object_or_404(Follow, user=request.user,
-                      author__username=username).delete()
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author)
     return redirect('posts:profile', username=username)
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from core.uploads import ImageUploadFormMixin
+
 from .models import UserProfile
 
 
@@ -13,9 +15,11 @@ class CreationForm(UserCreationForm):
         fields = ('first_name', 'last_name', 'username', 'email')
 
 
-class UserProfileForm(forms.ModelForm):
+class UserProfileForm(ImageUploadFormMixin, forms.ModelForm):
     """Форма для редактирования профиля пользователя."""
 
+    image_fields = ('avatar',)
+
     class Meta:
         model = UserProfile
         fields = ('about', 'avatar')
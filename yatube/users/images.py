@@ -0,0 +1,55 @@
+import logging
+
+from core.images import (build_placeholder, build_variants, dump_variants,
+                         schedule_image_job)
+from posts.feeds import invalidate_profile_page
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+AVATAR_WIDTHS = (100, 200, 400)
+AVATAR_ASPECT = 1
+
+
+def generate_avatar_variants(profile_id):
+    """Строит квадратные варианты и заглушку аватара.
+
+    Args:
+        profile_id (int): id профиля пользователя.
+
+    Returns:
+        list: описания вариантов, пустой список при ошибке.
+    """
+
+    profile = UserProfile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.avatar:
+        return []
+    try:
+        variants = build_variants(
+            profile.avatar, AVATAR_WIDTHS, AVATAR_ASPECT
+        )
+        placeholder = build_placeholder(profile.avatar, AVATAR_ASPECT)
+    except Exception:
+        logger.exception('Не удалось обработать аватар профиля %s',
+                         profile_id)
+        return []
+    updated = UserProfile.objects.filter(
+        pk=profile_id, avatar=profile.avatar.name
+    ).update(
+        avatar_variants=dump_variants(variants),
+        avatar_placeholder=placeholder,
+    )
+    if updated:
+        invalidate_profile_page(profile)
+    return variants
+
+
+def schedule_avatar_variants(profile):
+    """Ставит в очередь обработку аватара.
+
+    Args:
+        profile (UserProfile): профиль с аватаром.
+    """
+
+    schedule_image_job(generate_avatar_variants, profile.pk)
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_auto_20220206_1757'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_variants',
+            field=models.TextField(blank=True, editable=False, help_text='Ширины и форматы для srcset в JSON, заполняются в фоне', verbose_name='Варианты аватара'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='about',
+            field=models.CharField(blank=True, default='Автор еще не заполнил этот раздел', help_text='Напишите немного о себе (не более 300 символов)', max_length=300, verbose_name='О себе'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, help_text='Выберите фото которое вам по душе', null=True, upload_to='avatars', verbose_name='Аватар'),
+        ),
+    ]
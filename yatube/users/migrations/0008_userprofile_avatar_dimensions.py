@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_userprofile_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота аватара'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина аватара'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:39
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_userprofile_avatar_hash_placeholder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, help_text='Выберите фото которое вам по душе', null=True, storage=core.storage.ContentAddressedStorage(), upload_to='avatars', verbose_name='Аватар'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserProfile = apps.get_model('users', 'UserProfile')
+    users = User.objects.filter(userprofile__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserProfile.objects.bulk_create(
+        (UserProfile(user_id=pk) for pk in users.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0010_userprofile_avatar_content_addressed'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_missing_profiles, migrations.RunPython.noop
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from core.storage import ContentAddressedStorage
+
 
 class UserProfile(models.Model):
     """Модель для профиля пользователя.
@@ -8,6 +10,11 @@ class UserProfile(models.Model):
     Attributes:
         user (int): id пользователя.
         avatar (str): аватар.
+        avatar_width (int): ширина аватара.
+        avatar_height (int): высота аватара.
+        avatar_hash (str): SHA-256 содержимого аватара.
+        avatar_placeholder (str): размытая заглушка аватара в data URI.
+        avatar_variants (str): варианты аватара для srcset в JSON.
         about (str): о себе.
     """
 
@@ -22,10 +29,43 @@ class UserProfile(models.Model):
     avatar = models.ImageField(
         verbose_name='Аватар',
         upload_to='avatars',
+        storage=ContentAddressedStorage(),
         help_text='Выберите фото которое вам по душе',
         null=True,
         blank=True
     )
+    avatar_width = models.PositiveIntegerField(
+        'Ширина аватара',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    avatar_height = models.PositiveIntegerField(
+        'Высота аватара',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    avatar_hash = models.CharField(
+        'Хеш аватара',
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text='SHA-256 содержимого файла'
+    )
+    avatar_placeholder = models.TextField(
+        'Заглушка аватара',
+        blank=True,
+        editable=False,
+        help_text='Размытая миниатюра в data URI, заполняется в фоне'
+    )
+    avatar_variants = models.TextField(
+        'Варианты аватара',
+        blank=True,
+        editable=False,
+        help_text='Ширины и форматы для srcset в JSON, заполняются в фоне'
+    )
     about = models.CharField(
         max_length=300,
         verbose_name='О себе',
@@ -0,0 +1,60 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.uploads import file_changed, file_hash, image_dimensions
+from posts.feeds import invalidate_profile_page
+
+from .images import schedule_avatar_variants
+from .models import User, UserProfile
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw, **kwargs):
+    """Заводит профиль новому пользователю, чтобы страницы только читали
+    его."""
+
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, created=False, raw=False, **kwargs):
+    """Сбрасывает закешированную страницу профиля при его изменении.
+
+    Пустой профиль, заведенный при регистрации, страниц не меняет.
+    """
+
+    if not created and not raw:
+        invalidate_profile_page(instance)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_avatar(sender, instance, **kwargs):
+    """Запоминает исходный аватар, чтобы заметить его смену."""
+
+    instance._initial_avatar = instance.avatar.name
+
+
+@receiver(pre_save, sender=UserProfile)
+def avatar_changed(sender, instance, raw, **kwargs):
+    """Запоминает размеры и хеш нового аватара и забывает варианты
+    прежнего."""
+
+    if not raw and file_changed(instance.avatar, instance._initial_avatar):
+        instance.avatar_width, instance.avatar_height = image_dimensions(
+            instance.avatar
+        )
+        instance.avatar_hash = file_hash(instance.avatar)
+        instance.avatar_placeholder = ''
+        instance.avatar_variants = ''
+
+
+@receiver(post_save, sender=UserProfile)
+def avatar_saved(sender, instance, raw, **kwargs):
+    """Ставит в очередь варианты нового аватара."""
+
+    instance._initial_avatar = instance.avatar.name
+    if not raw and instance.avatar and not instance.avatar_variants:
+        schedule_avatar_variants(instance)
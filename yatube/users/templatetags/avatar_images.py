@@ -0,0 +1,36 @@
+from django import template
+
+from core.templatetags.responsive_images import responsive_image
+
+from users.images import AVATAR_WIDTHS
+from users.models import UserProfile
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_image(profile, sizes='100vw', css_class=''):
+    """Выводит аватар с вариантами, размерами и заглушкой.
+
+    Профиль заводится вместе с пользователем, но пользователи из
+    фикстур могут остаться без него: тогда выводится аватар по умолчанию.
+
+    Args:
+        profile (UserProfile): профиль пользователя или пустая строка.
+        sizes (str): атрибут sizes.
+        css_class (str): CSS класс <img>.
+
+    Returns:
+        str: HTML разметка.
+    """
+
+    if not profile:
+        profile = UserProfile()
+    width, height = profile.avatar_width, profile.avatar_height
+    if profile.avatar_variants:
+        # Варианты аватара квадратные.
+        width = height = AVATAR_WIDTHS[-1]
+    return responsive_image(
+        profile.avatar_variants, profile.get_avatar(), sizes, css_class,
+        width=width, height=height, placeholder=profile.avatar_placeholder,
+    )
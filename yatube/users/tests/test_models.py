@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
 
 from ..models import UserProfile, User
 
@@ -8,10 +10,9 @@ class UserProfileModelTest(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='author')
-        cls.profile = UserProfile.objects.create(
-            user=cls.user,
-            about='test description',
-        )
+        cls.profile = cls.user.userprofile
+        cls.profile.about = 'test description'
+        cls.profile.save()
 
     def test_user_profile_model_have_correct_object_names(self):
         """Проверяем, что у модели корректно работает __str__."""
@@ -43,3 +44,44 @@ class UserProfileModelTest(TestCase):
                     UserProfile._meta.get_field(field).help_text,
                     expected_value
                 )
+
+    def test_profile_created_with_user(self):
+        """Профиль заводится вместе с пользователем."""
+        user = User.objects.create_user(username='new_user')
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+
+class ProfilePageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.guest = Client()
+        cls.profile_url = reverse('posts:profile', args=['author'])
+        cls.index_url = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_signup_keeps_cached_pages(self):
+        """Профиль нового пользователя не сбрасывает кеш страниц."""
+        for url in [self.index_url, self.profile_url]:
+            self.guest.get(url)
+        User.objects.create_user(username='new_user')
+        for url in [self.index_url, self.profile_url]:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.guest.get(url)
+
+    def test_profile_edit_resets_only_its_page(self):
+        """Правка профиля видна на его странице, главная остается в
+        кеше."""
+        for url in [self.index_url, self.profile_url]:
+            self.guest.get(url)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.about = 'Новый рассказ о себе'
+        profile.save()
+        self.assertContains(
+            self.guest.get(self.profile_url), 'Новый рассказ о себе'
+        )
+        with self.assertNumQueries(0):
+            self.guest.get(self.index_url)
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from users.models import UserProfile
+
+USERNAME = 'author'
+USERS_COUNT = 1000
+
+
+class UsersQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Бюджеты SQL-запросов для адресов из users/urls.py."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user {i}') for i in range(USERS_COUNT)
+        )
+        cls.user = User.objects.create_user(username=USERNAME)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def test_get_budgets(self):
+        """GET-запросы укладываются в бюджет."""
+        url_client_budget = [
+            [reverse('users:signup'), self.guest, 0],
+            [reverse('users:login'), self.guest, 0],
+            [reverse('users:password_change_form'), self.author, 2],
+            [reverse('users:password_change_done'), self.author, 2],
+            [reverse('users:password_reset_form'), self.author, 2],
+            [reverse('users:password_reset_done'), self.author, 2],
+            [reverse('users:password_reset_complete'), self.author, 2],
+            [
+                reverse('users:user_profile_form', args=[USERNAME]),
+                self.author,
+                5,
+            ],
+        ]
+        for url, client, budget in url_client_budget:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_budgets(self):
+        """Запросы, изменяющие данные, укладываются в бюджет."""
+        url_client_data_budget = [
+            [
+                reverse('users:user_profile_form', args=[USERNAME]),
+                self.author,
+                {'about': 'about'},
+                6,
+                reverse('posts:profile', args=[USERNAME]),
+                lambda: UserProfile.objects.filter(
+                    user=self.user, about='about'
+                ).exists(),
+            ],
+            [
+                reverse('users:signup'),
+                self.guest,
+                {
+                    'username': 'new_user',
+                    'password1': 'Very-Secret-1',
+                    'password2': 'Very-Secret-1',
+                },
+                4,
+                reverse('posts:index'),
+                lambda: User.objects.filter(username='new_user').exists(),
+            ],
+        ]
+        for url, client, data, budget, redirect, done in (
+            url_client_data_budget
+        ):
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = client.post(url, data)
+                self.assertRedirects(
+                    response, redirect, fetch_redirect_response=False
+                )
+                self.assertTrue(done())
@@ -7,7 +7,6 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from users.models import UserProfile
 
 USERNAME = 'author'
 ANOTHER_USERNAME = 'another user'
@@ -77,10 +76,9 @@ class UsersURLTests(TestCase):
             content=BYTE_STRING,
             content_type='image/gif'
         )
-        cls.profile = UserProfile.objects.create(
-            user=cls.user,
-            avatar=image,
-        )
+        cls.profile = cls.user.userprofile
+        cls.profile.avatar = image
+        cls.profile.save()
 
     def setUp(self):
         self.author.force_login(self.user)
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -91,11 +92,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База выбирается переменной окружения DB_ENGINE:
+#   sqlite - файл BASE_DIR/db.sqlite3 (по умолчанию), записи всех
+#     процессов выполняются по очереди;
+#   postgresql - сервер из DB_NAME, DB_USER, DB_PASSWORD, DB_HOST и
+#     DB_PORT, нужен psycopg2-binary<2.9.
+# Соединение с PostgreSQL живет DB_CONN_MAX_AGE секунд и переиспользуется
+# запросами процесса. Для пула соединений между процессами перед базой
+# ставится PgBouncer в режиме transaction, тогда DB_PGBOUNCER=1 отключает
+# серверные курсоры, несовместимые с этим режимом.
+# Тесты используют SQLite из yatube.settings_test.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'DISABLE_SERVER_SIDE_CURSORS': bool(
+                int(os.getenv('DB_PGBOUNCER', 0))
+            ),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
     }
+
+# Прагмы, которыми core.signals настраивает каждое новое соединение с
+# SQLite. WAL позволяет читать во время записи, synchronous=NORMAL в WAL
+# не рискует целостностью и не ждет диска на каждом коммите, busy_timeout
+# (мс) дает записи дождаться блокировки вместо ошибки "database is locked",
+# mmap_size (байты) и cache_size (отрицательное - в КиБ) держат горячие
+# страницы в памяти.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
 }
 
 
@@ -143,18 +186,132 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+SEARCH_QUERY_MAX_LENGTH = 200
+
+# Имена представлений (например 'posts:index'), ленты которых листаются
+# курсором по (created, id) вместо номера страницы: без COUNT(*) и OFFSET,
+# но и без списка номеров страниц в пагинаторе.
+CURSOR_PAGINATED_VIEWS = ()
+
+# Количества постов в лентах кешируются и сбрасываются сигналами при
+# изменении постов и подписок. Таймаут страхует от массовых операций в обход
+# сигналов (bulk_create, update): до его истечения количество приблизительное.
+FEED_COUNT_CACHE_TIMEOUT = 60 * 15
+
+# Страницы лент и постов для анонимных пользователей кешируются целиком до
+# изменения данных, таймаут ограничивает время хранения.
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Фрагменты шаблонов в теге generation_cache живут до смены поколения данных.
+FRAGMENT_CACHE_TIMEOUT = None
+
+# Защита от одновременного пересчета (core.cache.get_or_recompute): время
+# жизни блокировки пересчета, сколько ждать чужого пересчета при пустом
+# кеше и коэффициент раннего пересчета значений с таймаутом.
+CACHE_RECOMPUTE_LOCK_TIMEOUT = 10
+CACHE_RECOMPUTE_WAIT = 0.5
+CACHE_EARLY_RECOMPUTE_BETA = 1.0
+
+# Материализованная лента подписок: посты копируются в ленты подписчиков при
+# публикации. Посты авторов, у которых подписчиков больше
+# FOLLOW_FEED_FANOUT_LIMIT, читаются при показе ленты. В ленте хранится не
+# больше FOLLOW_FEED_TIMELINE_LENGTH последних записей, ленты подписчиков
+# обрезаются в фоне после раздачи поста. После включения
+# ленты нужно заполнить командой rebuild_timelines.
+FOLLOW_FEED_TIMELINE = False
+FOLLOW_FEED_FANOUT_LIMIT = 1000
+FOLLOW_FEED_TIMELINE_LENGTH = 1000
+# Обрезка и дозаполнение лент подписчиков идут в пуле из
+# TIMELINE_JOB_WORKERS потоков после фиксации транзакции, при
+# TIMELINE_JOBS_ASYNC = False - в запросе.
+TIMELINE_JOBS_ASYNC = True
+TIMELINE_JOB_WORKERS = 1
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся во временный файл на диске, а не в память процесса.
+# Файлы больше IMAGE_UPLOAD_MAX_SIZE байт и картинки больше
+# IMAGE_UPLOAD_MAX_PIXELS пикселей отклоняются до декодирования, картинки
+# больше IMAGE_UPLOAD_MAX_DIMENSION по большей стороне уменьшаются один раз
+# при загрузке.
+FILE_UPLOAD_HANDLERS = ['core.uploads.SizeLimitedUploadHandler']
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 10 ** 6
+IMAGE_UPLOAD_MAX_DIMENSION = 2560
+
+# Кеш разбит на пространства имен (алиасы CACHES) со своими таймаутами:
+# ленты и страницы (feeds), миниатюры sorl-thumbnail (thumbnails) и сессии
+# (sessions). Бэкенд выбирается переменной окружения CACHE_BACKEND:
+#   locmem - память процесса (по умолчанию), кеш не общий для процессов;
+#   file - файлы в CACHE_DIR, общий для процессов одной машины;
+#   sqlite - таблицы в отдельной базе CACHE_DIR/cache.sqlite3, перед
+#     запуском выполнить manage.py createcachetable --database cache.
+# Попадания и промахи считаются по пространствам имен, смотреть командой
+# cache_stats.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+CACHE_TIMEOUTS = {
+    'default': int(os.getenv('CACHE_DEFAULT_TIMEOUT', 60 * 5)),
+    'feeds': int(os.getenv('CACHE_FEEDS_TIMEOUT', 60 * 60)),
+    'thumbnails': int(os.getenv('CACHE_THUMBNAILS_TIMEOUT', 60 * 60 * 24 * 30)),
+    'sessions': int(os.getenv('CACHE_SESSIONS_TIMEOUT', 60 * 60 * 24 * 14)),
+}
+CACHE_BACKENDS = {
+    'locmem': 'core.cache_backends.MeteredLocMemCache',
+    'file': 'core.cache_backends.MeteredFileBasedCache',
+    'sqlite': 'core.cache_backends.MeteredDatabaseCache',
+}
+CACHE_LOCATIONS = {
+    # Пространства имен делят одно хранилище в памяти и различаются
+    # префиксом ключей, так cache.clear() очищает их все.
+    'locmem': lambda namespace: 'yatube',
+    'file': lambda namespace: os.path.join(CACHE_DIR, namespace),
+    'sqlite': lambda namespace: f'cache_{namespace}',
+}
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    namespace: {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': CACHE_LOCATIONS[CACHE_BACKEND](namespace),
+        'KEY_PREFIX': namespace,
+        'TIMEOUT': timeout,
     }
+    for namespace, timeout in CACHE_TIMEOUTS.items()
 }
 
+if CACHE_BACKEND == 'sqlite':
+    DATABASES['cache'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+    }
+    DATABASE_ROUTERS = ['core.routers.CacheRouter']
+
+# Сессии читаются из кеша только при общем бэкенде: кеш в памяти у каждого
+# процесса свой, и вышедший пользователь оставался бы в кеше других.
+if CACHE_BACKEND != 'locmem':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+
+THUMBNAIL_CACHE = 'thumbnails'
+THUMBNAIL_CACHE_TIMEOUT = CACHE_TIMEOUTS['thumbnails']
+
+# Миниатюры картинок постов строятся в пуле из THUMBNAIL_WORKERS потоков
+# после сохранения поста, пока готовой миниатюры нет, показывается исходная
+# картинка. При THUMBNAIL_ASYNC = False миниатюра строится в запросе, так
+# работают тесты (см. yatube.settings_test).
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Вместе с миниатюрой строятся варианты картинок постов и аватаров разной
+# ширины в этих форматах для srcset. Форматы, которые не умеет кодировать
+# Pillow, пропускаются; для AVIF нужен пакет pillow-avif-plugin.
+IMAGE_VARIANT_FORMATS = ('avif', 'webp', 'jpeg')
+IMAGE_VARIANT_QUALITY = 80
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
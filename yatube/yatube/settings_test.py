@@ -0,0 +1,22 @@
+"""Настройки для тестов.
+
+manage.py test и pytest подключают их вместо yatube.settings.
+"""
+
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR
+
+# Тесты не зависят от DB_ENGINE окружения и всегда используют SQLite.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
+
+# Миниатюры строятся в запросе: фоновый поток пережил бы временный
+# MEDIA_ROOT теста. Фоновую обработку тесты включают явно.
+THUMBNAIL_ASYNC = False
+TIMELINE_JOBS_ASYNC = False